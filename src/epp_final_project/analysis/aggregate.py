@@ -0,0 +1,218 @@
+"""Streaming summary statistics of the Monte Carlo estimates."""
+
+import numpy as np
+import pandas as pd
+
+SKETCH_SIZE = 256
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+PRECISION_TARGETS = ("bias", "coverage")
+MIN_SIM_PRECISION = 30
+CRITICAL_VALUE = 1.96
+
+
+def _compress_sketch(values, weights, size=SKETCH_SIZE):
+    """A function that compresses weighted values into at most size centroids.
+
+    Args:
+        values (array): the values of the sketch
+        weights (array): the weight of every value
+        size (int): maximum number of centroids
+
+    Returns:
+        The values and weights of the compressed sketch, sorted by value.
+
+    """
+    order = np.argsort(values, kind="stable")
+    values, weights = values[order], weights[order]
+    if len(values) <= size:
+        return values, weights
+    cum_weights = np.cumsum(weights)
+    bins = ((cum_weights - weights / 2) / cum_weights[-1] * size).astype(int)
+    bin_weights = np.bincount(bins, weights=weights, minlength=size)
+    bin_values = np.bincount(bins, weights=values * weights, minlength=size)
+    keep = bin_weights > 0
+    return bin_values[keep] / bin_weights[keep], bin_weights[keep]
+
+
+def _sketch_quantiles(sketch, quantiles=QUANTILES):
+    """A function that approximates quantiles from a sketch.
+
+    Args:
+        sketch (tuple): the values and weights of the sketch
+        quantiles (tuple): the quantiles to compute
+
+    Returns:
+        An array with the approximate quantiles.
+
+    """
+    values, weights = sketch
+    cum_weights = np.cumsum(weights) - weights / 2
+    return np.interp(np.multiply(quantiles, weights.sum()), cum_weights, values)
+
+
+def _chunk_accumulator(beta, sd, true_value):
+    """A function that summarizes the estimates of one chunk of replications.
+
+    Args:
+        beta (array): the estimates of beta_1
+        sd (array): the estimated standard deviations of beta_1
+        true_value (float): the true value of beta_1
+
+    Returns:
+        A dictionary with the count, mean, sum of squared deviations (M2), mean
+        standard deviation, number of covering confidence intervals and the
+        quantile sketch.
+
+    """
+    mean = beta.mean()
+    return {
+        "n": len(beta),
+        "mean": mean,
+        "m2": ((beta - mean) ** 2).sum(),
+        "mean_sd": sd.mean(),
+        "covered": int((np.abs(beta - true_value) <= CRITICAL_VALUE * sd).sum()),
+        "sketch": _compress_sketch(beta, np.ones(len(beta))),
+    }
+
+
+def _merge_accumulators(first, second):
+    """A function that merges two accumulators with the parallel Welford update.
+
+    Args:
+        first (dict): accumulator of the first set of replications, may be None
+        second (dict): accumulator of the second set of replications
+
+    Returns:
+        The accumulator of both sets.
+
+    """
+    if first is None:
+        return second
+    n = first["n"] + second["n"]
+    delta = second["mean"] - first["mean"]
+    sketch = _compress_sketch(
+        np.concatenate([first["sketch"][0], second["sketch"][0]]),
+        np.concatenate([first["sketch"][1], second["sketch"][1]]),
+    )
+    return {
+        "n": n,
+        "mean": first["mean"] + delta * second["n"] / n,
+        "m2": first["m2"] + second["m2"] + delta**2 * first["n"] * second["n"] / n,
+        "mean_sd": first["mean_sd"]
+        + (second["mean_sd"] - first["mean_sd"]) * second["n"] / n,
+        "covered": first["covered"] + second["covered"],
+        "sketch": sketch,
+    }
+
+
+def _update_accumulators(accumulators, estimates, true_value):
+    """A function that adds the estimates of one chunk to the accumulators.
+
+    Args:
+        accumulators (dict): accumulator of every estimator, values may be None
+        estimates (dict): arrays of beta_1 and its standard deviation for every
+            estimator
+        true_value (float): the true value of beta_1
+
+    Returns:
+        The updated accumulators.
+
+    """
+    return {
+        name: _merge_accumulators(
+            accumulators.get(name),
+            _chunk_accumulator(*estimates[name], true_value),
+        )
+        for name in estimates
+    }
+
+
+def _mcse(acc):
+    """A function that computes the Monte Carlo standard errors of an accumulator.
+
+    The standard error of the coverage uses the Agresti-Coull adjusted share,
+    which adds CRITICAL_VALUE^2 / 2 covering and non-covering replications, so it
+    stays positive if all or none of the intervals cover the true value.
+
+    Args:
+        acc (dict): accumulator of one estimator
+
+    Returns:
+        A dictionary with the Monte Carlo standard errors of "bias" and
+        "coverage".
+
+    """
+    n = acc["n"]
+    var = acc["m2"] / (n - 1) if n > 1 else np.nan
+    n_adjusted = n + CRITICAL_VALUE**2
+    coverage = (acc["covered"] + CRITICAL_VALUE**2 / 2) / n_adjusted
+    return {
+        "bias": np.sqrt(var / n),
+        "coverage": np.sqrt(coverage * (1 - coverage) / n_adjusted),
+    }
+
+
+def _summary_table(accumulators, true_value):
+    """A function that builds the summary table of the Monte Carlo simulation.
+
+    Args:
+        accumulators (dict): accumulator of every estimator
+        true_value (float): the true value of beta_1
+
+    Returns:
+        A dataframe with one row per estimator that contains the number of
+        replications, mean, bias, variance, RMSE, mean standard deviation, CI
+        coverage, their Monte Carlo standard errors and quantiles of beta_1.
+
+    """
+    rows = {}
+    for name, acc in accumulators.items():
+        n = acc["n"]
+        var = acc["m2"] / (n - 1) if n > 1 else np.nan
+        bias = acc["mean"] - true_value
+        coverage = acc["covered"] / n
+        mcse = _mcse(acc)
+        rows[name] = {
+            "n_sim": n,
+            "mean": acc["mean"],
+            "bias": bias,
+            "var": var,
+            "rmse": np.sqrt(acc["m2"] / n + bias**2),
+            "mean_sd": acc["mean_sd"],
+            "coverage": coverage,
+            "mcse_bias": mcse["bias"],
+            "mcse_coverage": mcse["coverage"],
+            **{
+                f"q{round(q * 100):02d}": value
+                for q, value in zip(
+                    QUANTILES,
+                    _sketch_quantiles(acc["sketch"]),
+                    strict=True,
+                )
+            },
+        }
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def _precision_reached(accumulators, precision):
+    """A function that checks whether every estimator reached the target precision.
+
+    Only the Monte Carlo standard errors are computed, not the summary table.
+
+    Args:
+        accumulators (dict): accumulator of every estimator
+        precision (dict): upper bound for the Monte Carlo standard error of "bias"
+            and/or "coverage", see PRECISION_TARGETS
+
+    Returns:
+        True if at least MIN_SIM_PRECISION replications are summarized and every
+        Monte Carlo standard error is below its target.
+
+    """
+    if any(acc["n"] < MIN_SIM_PRECISION for acc in accumulators.values()):
+        return False
+    for acc in accumulators.values():
+        mcse = _mcse(acc)
+        if any(mcse[target] > bound for target, bound in precision.items()):
+            return False
+    return True
@@ -0,0 +1,124 @@
+"""Vectorized wild and wild cluster bootstrap of the panel estimators."""
+
+import numpy as np
+
+from epp_final_project.analysis.covariance import (
+    _cluster_correction,
+    _group_sums,
+    _leverage_weight,
+)
+
+BOOT_WEIGHTS = ("rademacher", "webb")
+BOOT_BLOCK = 256
+LEVEL = 0.95
+
+_WEBB = np.sqrt([1.5, 1.0, 0.5])
+_WEBB = np.concatenate([-_WEBB, _WEBB[::-1]])
+
+
+def _boot_weights(rng, size, weights="rademacher"):
+    """A function that draws the auxiliary weights of the wild bootstrap.
+
+    Args:
+        rng (obj): random generator
+        size (tuple): shape of the draws
+        weights (str): "rademacher" for +-1 with equal probability or "webb" for
+            the six-point distribution of Webb (2014)
+
+    Returns:
+        An array of weights with mean zero and variance one.
+
+    """
+    if weights == "rademacher":
+        return rng.integers(0, 2, size=size) * 2.0 - 1.0
+    return _WEBB[rng.integers(0, 6, size=size)]
+
+
+def _score_sums(x_t, resid, bread, cov_type="HC0", codes=None, absorbed=(0.0, 0)):
+    """A function that sums the ingredients of the bootstrap scores per cluster.
+
+    Every observation is its own cluster unless cluster codes are given.
+
+    Args:
+        x_t (array): (transformed) regressors of shape (..., n, k)
+        resid (array): (transformed) residuals of shape (..., n)
+        bread (array): the inverse of X'X of shape (..., k, k)
+        cov_type (str): type of the robust covariance matrix
+        codes (tuple): cluster code of every observation and number of clusters
+        absorbed (tuple): the leverage and the number of the partialled out fixed
+            effects, see _sandwich
+
+    Returns:
+        The (..., G) sums of a * resid with a = X bread[:, 1], the (..., G, k) sums
+        of x * resid and a * x, the (..., G) weights of the scores and the
+        correction of the variance.
+
+    """
+    n, k = x_t.shape[-2:]
+    a = x_t @ bread[..., :, 1:2]
+    if codes is not None:
+        columns = np.concatenate([a * resid[..., None], x_t * resid[..., None]], -1)
+        sums = _group_sums(np.concatenate([columns, a * x_t], axis=-1), *codes)
+        weight = np.ones(sums.shape[:-1])
+        correction = _cluster_correction(codes[1], n, k)
+        return (
+            sums[..., 0],
+            sums[..., 1 : k + 1],
+            sums[..., k + 1 :],
+            weight,
+            correction,
+        )
+    fe_leverage, n_effects = absorbed
+    weight = np.ones(x_t.shape[:-1])
+    if cov_type == "HC2":
+        weight = _leverage_weight(x_t, bread, fe_leverage, 0.5)
+    elif cov_type == "HC3":
+        weight = _leverage_weight(x_t, bread, fe_leverage, 1)
+    correction = n / (n - k - n_effects) if cov_type == "HC1" else 1.0
+    return a[..., 0] * resid, x_t * resid[..., None], a * x_t, weight, correction
+
+
+def _wild_bootstrap(x_t, resid, bread, beta, null, rng, n_boot, **kwargs):
+    """A function that computes the wild (cluster) bootstrap-t inference on beta_1.
+
+    The bootstrap outcomes are X beta + resid * v for weights v that are drawn
+    per observation, or per cluster. Since the bread and the transformed
+    regressors are shared by all draws, the bootstrap estimates and their robust
+    standard errors follow from matrix products of the cluster sums with the
+    (G, B) matrix of weights, without refitting.
+
+    Args:
+        x_t (array): (transformed) regressors of shape (..., n, k)
+        resid (array): (transformed) residuals y - X beta of shape (..., n)
+        bread (array): the inverse of X'X of shape (..., k, k)
+        beta (array): the estimated beta_1 of shape (...)
+        null (float): the value of beta_1 under the null hypothesis
+        rng (obj): random generator of the weights
+        n_boot (int): number of bootstrap draws
+        **kwargs: "cov_type", "codes" of the clusters and the "absorbed" fixed
+            effects, see _score_sums, and the type of the "weights", see
+            _boot_weights
+
+    Returns:
+        The (...) upper and lower bounds of the symmetric bootstrap-t confidence
+        interval and the bootstrap p-value of the null hypothesis.
+
+    """
+    weights = kwargs.pop("weights", "rademacher")
+    s_a, s_x, s_ax, weight, correction = _score_sums(x_t, resid, bread, **kwargs)
+    sd = np.sqrt(correction * ((weight * s_a) ** 2).sum(axis=-1))
+
+    t_boot = []
+    for start in range(0, n_boot, BOOT_BLOCK):
+        n_draws = min(BOOT_BLOCK, n_boot - start)
+        v = _boot_weights(rng, (*s_a.shape, n_draws), weights)
+        delta_beta = bread @ (np.swapaxes(s_x, -1, -2) @ v)
+        scores = s_a[..., None] * v - s_ax @ delta_beta
+        sd_boot = np.sqrt(correction * ((weight[..., None] * scores) ** 2).sum(-2))
+        t_boot.append(np.abs(delta_beta[..., 1, :]) / sd_boot)
+    t_boot = np.concatenate(t_boot, axis=-1)
+
+    t_stat = np.abs(beta - null) / sd
+    p_value = (t_boot >= t_stat[..., None]).mean(axis=-1)
+    critical = np.quantile(t_boot, LEVEL, axis=-1)
+    return beta + critical * sd, beta - critical * sd, p_value
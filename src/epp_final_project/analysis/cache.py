@@ -0,0 +1,224 @@
+"""Content-addressed on-disk cache of the Monte Carlo results."""
+
+import hashlib
+import inspect
+import json
+import os
+import pkgutil
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from epp_final_project.analysis.model import compare_est
+
+# Modules that run, store or stream the simulation without changing its results
+UNHASHED_MODULES = ("cache", "chunked", "grid", "storage", "task_analysis")
+SOURCE_MODULES = tuple(
+    sorted(
+        module.name
+        for module in pkgutil.iter_modules([str(Path(__file__).parent)])
+        if module.name not in UNHASHED_MODULES
+    ),
+)
+UNCACHED_ARGS = ("n_sim", "n_jobs", "scenarios", "chunks")
+MAX_CACHE_BYTES = 2**30
+
+
+def _source_hash():
+    """A function that hashes the source code of the simulation.
+
+    Returns:
+        The hex digest of the modules that determine the results of compare_est.
+
+    """
+    digest = hashlib.sha256()
+    for module in SOURCE_MODULES:
+        digest.update(Path(__file__).with_name(f"{module}.py").read_bytes())
+    return digest.hexdigest()
+
+
+def _to_json(value):
+    """A function that converts numpy values for the JSON encoder.
+
+    Args:
+        value (obj): an array or a numpy scalar
+
+    Returns:
+        The value as a list or Python scalar.
+
+    """
+    if isinstance(value, np.ndarray | np.generic):
+        return value.tolist()
+    msg = f"Cannot hash arguments of type {type(value).__name__}."
+    raise TypeError(msg)
+
+
+def _cache_key(params):
+    """A function that computes the cache key of a single scenario.
+
+    The number of replications is not part of the key, because the results of a
+    run are a prefix of the results of every longer run with the same arguments.
+
+    Args:
+        params (dict): all arguments of compare_est
+
+    Returns:
+        The hex digest of the arguments and the source code.
+
+    """
+    args = {name: value for name, value in params.items() if name not in UNCACHED_ARGS}
+    payload = json.dumps([args, _source_hash()], sort_keys=True, default=_to_json)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _covered(path):
+    """A function that counts the full chunks that are stored without a gap.
+
+    Args:
+        path (Path): directory of the cache entry
+
+    Returns:
+        The number of leading chunks of the run that are stored.
+
+    """
+    stop = 0
+    for file in sorted(path.glob("chunks-*.pkl")):
+        start, end = map(int, file.stem.split("-")[1:])
+        if start == stop:
+            stop = end
+    return stop
+
+
+def _write(table, file):
+    """A function that stores a table atomically.
+
+    Args:
+        table (DataFrame): the results of a range of chunks
+        file (Path): the target file
+
+    """
+    file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = file.with_name(f".{file.name}.{os.getpid()}")
+    table.to_pickle(tmp)
+    os.replace(tmp, file)
+
+
+def _load(path, n_full, n_rows, tail):
+    """A function that reads the results of the first replications of a run.
+
+    Args:
+        path (Path): directory of the cache entry
+        n_full (int): number of full chunks
+        n_rows (int): number of replications in the full chunks
+        tail (int): size of the last, partial chunk
+
+    Returns:
+        A dataframe with the results of every replication.
+
+    """
+    tables = [
+        pd.read_pickle(file)
+        for file in sorted(path.glob("chunks-*.pkl"))
+        if int(file.stem.split("-")[1]) < n_full
+    ]
+    tables = [pd.concat(tables, ignore_index=True).iloc[:n_rows]] if tables else []
+    if tail:
+        tables.append(pd.read_pickle(path / f"tail-{n_full:08d}-{tail}.pkl"))
+    return pd.concat(tables, ignore_index=True)
+
+
+def _evict(cache_dir, max_bytes, keep):
+    """A function that removes the least recently used entries above a size limit.
+
+    Args:
+        cache_dir (Path): directory of the cache
+        max_bytes (int): maximum size of the cache
+        keep (list): entries that are never removed
+
+    """
+    entries = []
+    for path in cache_dir.iterdir():
+        if path.is_dir():
+            size = sum(file.stat().st_size for file in path.iterdir())
+            entries.append((path.stat().st_mtime, size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+def cached_compare_est(cache_dir, max_bytes=MAX_CACHE_BYTES, **kwargs):
+    """A function that runs compare_est with an on-disk cache of the results.
+
+    Every scenario is stored under a hash of its arguments and of the source code
+    of the simulation, chunked by ranges of replications. A run with a larger
+    n_sim only simulates the missing chunks and appends them, a run with a smaller
+    n_sim is read from the cache. Least recently used entries are evicted once the
+    cache is larger than max_bytes.
+
+    Args:
+        cache_dir (str or Path): directory of the cache
+        max_bytes (int): maximum size of the cache in bytes
+        **kwargs: arguments of compare_est
+
+    Returns:
+        The result of compare_est.
+
+    """
+    bound = inspect.signature(compare_est).bind(**kwargs)
+    bound.apply_defaults()
+    params = dict(bound.arguments)
+    chunks = params.pop("chunks")
+    uncached = params["stream"] or params["precision"] is not None or params["profile"]
+    if uncached or params["full"] or chunks is not None:
+        msg = (
+            "Only complete, unprofiled runs that store the beta_1 table of every "
+            "replication are cached."
+        )
+        raise ValueError(msg)
+
+    cache_dir = Path(cache_dir)
+    scenarios = params.pop("scenarios")
+    overrides = [{}] if scenarios is None else scenarios
+    paths = [cache_dir / _cache_key({**params, **override}) for override in overrides]
+    n_sim, batch_size = params["n_sim"], params["batch_size"]
+    n_full, tail = divmod(n_sim, batch_size or 1)
+
+    # Simulate the missing full chunks, scenarios that miss the same ones together
+    missing = {}
+    for index, path in enumerate(paths):
+        start = _covered(path)
+        if start < n_full:
+            missing.setdefault(start, []).append(index)
+    for start, indices in missing.items():
+        tables = compare_est(
+            **params,
+            scenarios=[overrides[index] for index in indices],
+            chunks=(start, n_full),
+        )
+        for index, table in zip(indices, tables, strict=True):
+            _write(table, paths[index] / f"chunks-{start:08d}-{n_full:08d}.pkl")
+
+    # Simulate the last chunk if it is not full
+    tail_name = f"tail-{n_full:08d}-{tail}.pkl"
+    indices = [i for i, path in enumerate(paths) if not (path / tail_name).exists()]
+    if tail and indices:
+        tables = compare_est(
+            **params,
+            scenarios=[overrides[index] for index in indices],
+            chunks=(n_full, n_full + 1),
+        )
+        for index, table in zip(indices, tables, strict=True):
+            _write(table, paths[index] / tail_name)
+
+    results = []
+    for path in paths:
+        results.append(_load(path, n_full, n_full * (batch_size or 1), tail))
+        os.utime(path)
+    _evict(cache_dir, max_bytes, keep=paths)
+    return results if scenarios is not None else results[0]
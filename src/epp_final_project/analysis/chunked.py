@@ -0,0 +1,363 @@
+"""Out-of-core estimation of the panel estimators on data stored on disk."""
+
+from pathlib import Path
+
+import numpy as np
+
+from epp_final_project.analysis.covariance import (
+    COV_TYPES,
+    _cluster_correction,
+    _clip_psd,
+    _gram,
+    _group_sums,
+    _leverage_weight,
+    _meat,
+)
+from epp_final_project.analysis.estimation import _solve_normal
+from epp_final_project.analysis.model import ESTIMATORS
+
+BLOCK_ROWS = 2**20
+LABELS = ("obs", "time")
+
+
+def _row_blocks(source, columns, block_rows=BLOCK_ROWS):
+    """A function that streams columns of a long panel in blocks of rows.
+
+    Args:
+        source (Path or array): a .parquet file, a .npy file with a structured
+            array or a (memory-mapped) structured array
+        columns (list): the columns to read
+        block_rows (int): number of rows per block
+
+    Yields:
+        A dictionary with the values of every column in the next block of rows.
+
+    """
+    if not isinstance(source, np.ndarray):
+        suffix = Path(source).suffix
+        if suffix == ".parquet":
+            from pyarrow import parquet
+
+            batches = parquet.ParquetFile(source).iter_batches(
+                batch_size=block_rows,
+                columns=list(columns),
+            )
+            for batch in batches:
+                yield {
+                    name: batch.column(name).to_numpy(zero_copy_only=False)
+                    for name in columns
+                }
+            return
+        if suffix != ".npy":
+            msg = f"The panel must be stored as .parquet or .npy, got {suffix}."
+            raise ValueError(msg)
+        source = np.load(source, mmap_mode="r")
+    for start in range(0, len(source), block_rows):
+        block = source[start : start + block_rows]
+        yield {name: np.asarray(block[name]) for name in columns}
+
+
+def _merge_labels(groups, block_labels):
+    """A function that adds the labels of a block to the groups seen so far.
+
+    The labels are kept sorted, so the code of a label is its position.
+
+    Args:
+        groups (tuple): the sorted labels, the (n_groups, k + 1) sums and the
+            counts of every group seen so far
+        block_labels (array): the label of every row of the block
+
+    Returns:
+        The groups with zero sums and counts for the new labels and the code of
+        every row of the block.
+
+    """
+    labels, sums, counts = groups
+    block_unique, block_codes = np.unique(block_labels, return_inverse=True)
+    merged = np.union1d(labels, block_unique)
+    if len(merged) > len(labels):
+        position = np.searchsorted(merged, labels)
+        grown_sums = np.zeros((len(merged), sums.shape[1]))
+        grown_sums[position] = sums
+        grown_counts = np.zeros(len(merged), dtype=np.int64)
+        grown_counts[position] = counts
+        sums, counts = grown_sums, grown_counts
+    codes = np.searchsorted(merged, block_unique)[block_codes.reshape(-1)]
+    return (merged, sums, counts), codes
+
+
+def _first_pass(source, columns, block_rows):
+    """A function that accumulates the pooled cross-products and the group sums.
+
+    Args:
+        source (Path or array): the panel in long format, see _row_blocks
+        columns (list): the regressors followed by the outcome
+        block_rows (int): number of rows per block
+
+    Returns:
+        The (k + 1, k + 1) pooled cross-products, a dictionary with the labels,
+        sums and counts of the units and periods and the number of rows.
+
+    """
+    cross, groups, n_rows = 0, {}, 0
+    for block in _row_blocks(source, [*LABELS, *columns], block_rows):
+        xy = np.column_stack([block[name] for name in columns]).astype(np.float64)
+        cross = cross + _gram(xy, xy)
+        n_rows += len(xy)
+        for name in LABELS:
+            empty = (block[name][:0], np.zeros((0, len(columns))), np.zeros(0, int))
+            groups[name], codes = _merge_labels(groups.get(name, empty), block[name])
+            labels, sums, counts = groups[name]
+            sums += _group_sums(xy, codes, len(labels))
+            counts += np.bincount(codes, minlength=len(labels))
+    return cross, groups, n_rows
+
+
+def _group_means(groups, n_rows):
+    """A function that derives the unit, time and grand means from the group sums.
+
+    Args:
+        groups (dict): labels, sums and counts of the units and periods
+        n_rows (int): number of rows of the panel
+
+    Returns:
+        A dictionary with the unit, time and grand means of the regressors and
+        outcome.
+
+    """
+    _, unit_sums, unit_counts = groups["obs"]
+    _, time_sums, time_counts = groups["time"]
+    return {
+        "obs": unit_sums / unit_counts[:, None],
+        "time": time_sums / time_counts[:, None],
+        "grand": unit_sums.sum(axis=0) / n_rows,
+    }
+
+
+def _transformed_block(xy, codes, means, name):
+    """A function that applies the within transformation of an estimator to a block.
+
+    Args:
+        xy (array): regressors and outcome of the block of shape (n, k + 1)
+        codes (dict): unit and period code of every row of the block
+        means (dict): unit, time and grand means of the regressors and outcome
+        name (str): one of ESTIMATORS
+
+    Returns:
+        The (n, k + 1) transformed regressors and outcome.
+
+    """
+    if name == "OLS":
+        return xy
+    xy_t = xy - means["obs"][codes["obs"]]
+    if name == "two_way":
+        xy_t -= means["time"][codes["time"]]
+        xy_t += means["grand"]
+    return xy_t
+
+
+def _fe_leverage(codes, groups, name):
+    """A function that computes the leverage of the fixed effects of an estimator
+    for the rows of a block.
+
+    Args:
+        codes (dict): unit and period code of every row of the block
+        groups (dict): labels, sums and counts of the units and periods
+        name (str): one of ESTIMATORS, the two-way estimator requires a balanced
+            panel
+
+    Returns:
+        The leverage of the dummies for every row of the block, 0.0 for the
+        pooled estimator.
+
+    """
+    if name == "OLS":
+        return 0.0
+    leverage = 1 / groups["obs"][2][codes["obs"]]
+    if name == "two_way":
+        n_units, n_periods = len(groups["obs"][0]), len(groups["time"][0])
+        leverage = leverage + 1 / n_units - 1 / (n_units * n_periods)
+    return leverage
+
+
+def _within_pass(source, columns, groups, means, estimators, block_rows):
+    """A function that accumulates the cross-products of the transformed blocks.
+
+    Subtracting the pooled cross-products of the means from the pooled ones
+    cancels catastrophically if the levels are large relative to the within
+    variation, so every block is demeaned before its cross-products are added.
+
+    Args:
+        source (Path or array): the panel in long format, see _row_blocks
+        columns (list): the regressors followed by the outcome
+        groups (dict): labels, sums and counts of the units and periods
+        means (dict): unit, time and grand means of the regressors and outcome
+        estimators (list): the fixed effects estimators
+        block_rows (int): number of rows per block
+
+    Returns:
+        A dictionary with the (k + 1, k + 1) cross-products of every estimator.
+
+    """
+    cross = {name: 0 for name in estimators}
+    for block in _row_blocks(source, [*LABELS, *columns], block_rows):
+        xy = np.column_stack([block[name] for name in columns]).astype(np.float64)
+        codes = {dim: np.searchsorted(groups[dim][0], block[dim]) for dim in LABELS}
+        for name in estimators:
+            xy_t = _transformed_block(xy, codes, means, name)
+            cross[name] = cross[name] + _gram(xy_t, xy_t)
+    return cross
+
+
+def _meat_pass(source, columns, fits, groups, means, cov_type, names, block_rows):
+    """A function that accumulates the meat of every estimator.
+
+    Args:
+        source (Path or array): the panel in long format, see _row_blocks
+        columns (list): the regressors followed by the outcome
+        fits (dict): the estimated parameters and the inverse of X'X of every
+            estimator
+        groups (dict): labels, sums and counts of the units and periods
+        means (dict): unit, time and grand means of the regressors and outcome
+        cov_type (str): type of the robust covariance matrix
+        names (list): the cluster dimensions if cov_type is "cluster"
+        block_rows (int): number of rows per block
+
+    Returns:
+        A dictionary with the (k, k) meat sum of every estimator and, if cov_type
+        is "cluster", the (n_groups, k) score sums of every cluster dimension.
+
+    """
+    meats = {name: 0 for name in fits}
+    sums = {
+        name: {dim: np.zeros((len(groups[dim][0]), len(columns) - 1)) for dim in names}
+        for name in fits
+    }
+    for block in _row_blocks(source, [*LABELS, *columns], block_rows):
+        xy = np.column_stack([block[name] for name in columns]).astype(np.float64)
+        codes = {dim: np.searchsorted(groups[dim][0], block[dim]) for dim in LABELS}
+        for name, (beta_est, bread) in fits.items():
+            xy_t = _transformed_block(xy, codes, means, name)
+            x_t = xy_t[:, :-1]
+            e_est = x_t @ beta_est - xy_t[:, -1]
+            fe_leverage = _fe_leverage(codes, groups, name)
+            if cov_type == "HC2":
+                e_est = e_est * _leverage_weight(x_t, bread, fe_leverage, 0.5)
+            elif cov_type == "HC3":
+                e_est = e_est * _leverage_weight(x_t, bread, fe_leverage, 1)
+            if cov_type != "cluster" or len(names) == 2:
+                meats[name] = meats[name] + _meat(x_t, e_est)
+            scores = x_t * e_est[:, None]
+            for dim in names:
+                sums[name][dim] += _group_sums(scores, codes[dim], len(sums[name][dim]))
+    return meats, sums
+
+
+def _cluster_names(cluster):
+    """A function that checks the cluster dimensions of the out-of-core estimation.
+
+    Args:
+        cluster (str or list): "obs", "time" or both of them
+
+    Returns:
+        A list with the cluster dimensions.
+
+    """
+    names = [cluster] if isinstance(cluster, str) else list(cluster)
+    if not names or not set(names) <= set(LABELS) or len(set(names)) < len(names):
+        msg = f"cluster must be one or both of {LABELS}, got {cluster!r}."
+        raise ValueError(msg)
+    return names
+
+
+def estimate_chunked(
+    source,
+    x_columns,
+    y_column,
+    cov_type="HC0",
+    cluster="obs",
+    estimators=ESTIMATORS,
+    block_rows=BLOCK_ROWS,
+):
+    """A function that applies the panel estimators to a panel stored on disk.
+
+    The panel is streamed in blocks of rows up to three times. The first pass
+    accumulates X'X, X'y and the unit and period sums, from which the pooled
+    coefficients and the means follow. The second pass accumulates the
+    cross-products of the data transformed with these means, from which the
+    coefficients of the fixed effects estimators follow. The last pass
+    accumulates the robust meat with the residuals of the transformed data. Only
+    O(k^2 + (N + T) k) numbers are kept in memory, and the rows may come in any
+    order. The estimates equal those of _est_OLS, _est_one_way and _est_two_way.
+
+    Args:
+        source (Path or array): the panel in long format with one row per unit
+            and period, with the "obs" and "time" labels, as a .parquet file, a
+            .npy file with a structured array or a (memory-mapped) structured
+            array
+        x_columns (list): the names of the regressor columns
+        y_column (str): the name of the outcome column
+        cov_type (str): type of the robust covariance matrix
+        cluster (str or list): "obs", "time" or both of them if cov_type is
+            "cluster"
+        estimators (tuple): the estimators to apply, out of ESTIMATORS. The
+            two-way estimator requires a balanced panel.
+        block_rows (int): number of rows read at once
+
+    Returns:
+        A dictionary with the (k,) estimated parameters and their (k, k)
+        covariance matrix for every estimator.
+
+    """
+    if cov_type not in COV_TYPES or cov_type == "jackknife":
+        cov_types = tuple(name for name in COV_TYPES if name != "jackknife")
+        msg = f"cov_type must be one of {cov_types} out of core, got {cov_type!r}."
+        raise ValueError(msg)
+    unknown = set(estimators) - set(ESTIMATORS)
+    if unknown:
+        msg = f"estimators must be in {ESTIMATORS}, got {sorted(unknown)}."
+        raise ValueError(msg)
+    names = _cluster_names(cluster) if cov_type == "cluster" else []
+    columns = [*x_columns, y_column]
+
+    cross, groups, n_rows = _first_pass(source, columns, block_rows)
+    n_units, n_periods = len(groups["obs"][0]), len(groups["time"][0])
+    balanced = n_rows == n_units * n_periods and (groups["obs"][2] == n_periods).all()
+    if "two_way" in estimators and not balanced:
+        msg = "The out-of-core two-way estimator requires a balanced panel."
+        raise ValueError(msg)
+    means = _group_means(groups, n_rows)
+    cross = {"OLS": cross}
+    within = [name for name in estimators if name != "OLS"]
+    if within:
+        cross.update(_within_pass(source, columns, groups, means, within, block_rows))
+    fits = {name: _solve_normal(cross[name]) for name in estimators}
+
+    meats, sums = _meat_pass(
+        source,
+        columns,
+        fits,
+        groups,
+        means,
+        cov_type,
+        names,
+        block_rows,
+    )
+    n_params = len(x_columns)
+    n_effects = {"OLS": 0, "one_way": n_units, "two_way": n_units + n_periods - 1}
+    estimates = {}
+    for name, (beta_est, bread) in fits.items():
+        meat = meats[name]
+        if cov_type == "HC1":
+            meat = meat * (n_rows / (n_rows - n_params - n_effects[name]))
+        elif cov_type == "cluster":
+            # Every unit-period cell is its own cluster in the intersection
+            if len(names) == 2:
+                meat = -_cluster_correction(n_rows, n_rows, n_params) * meat
+            for dim_sums in sums[name].values():
+                correction = _cluster_correction(len(dim_sums), n_rows, n_params)
+                meat = meat + correction * (dim_sums.T @ dim_sums)
+            if len(names) == 2:
+                meat = _clip_psd(meat)
+        estimates[name] = (beta_est, bread @ meat @ bread)
+    return estimates
@@ -0,0 +1,345 @@
+"""Heteroskedasticity- and cluster-robust covariance matrices for the panel
+estimators."""
+
+import numpy as np
+
+COV_TYPES = ("HC0", "HC1", "HC2", "HC3", "cluster", "jackknife")
+BLOCK_ROWS = 2**14
+
+
+def _gram(a, b):
+    """A function that computes the cross-product a'b accumulated in float64.
+
+    Single precision inputs are converted to float64 in blocks of rows, so the
+    accumulation is exact to double precision without a float64 copy of the
+    inputs.
+
+    Args:
+        a (array): matrix of shape (..., n, k)
+        b (array): matrix of shape (..., n, m)
+
+    Returns:
+        The (..., k, m) cross-product in float64.
+
+    """
+    if a.dtype == np.float64 and b.dtype == np.float64:
+        return np.swapaxes(a, -1, -2) @ b
+    gram = 0
+    for start in range(0, a.shape[-2], BLOCK_ROWS):
+        rows = slice(start, start + BLOCK_ROWS)
+        a_block = a[..., rows, :].astype(np.float64)
+        b_block = b[..., rows, :].astype(np.float64)
+        gram = gram + np.swapaxes(a_block, -1, -2) @ b_block
+    return gram
+
+
+def _meat(x, resid):
+    """A function that computes the meat of the sandwich without an NT x NT matrix.
+
+    Args:
+        x (array): regressors of shape (..., n, k)
+        resid (array): residuals of shape (..., n)
+
+    Returns:
+        The (..., k, k) sum of the outer products of the scores, accumulated in
+        float64.
+
+    """
+    scores = x * resid[..., None]
+    return _gram(scores, scores)
+
+
+def _leverage(x, bread):
+    """A function that computes the diagonal of the hat matrix.
+
+    The diagonal is the row sum of (X (X'X)^-1) * X, so the n x n hat matrix is
+    never formed and the product runs in one matrix multiplication.
+
+    Args:
+        x (array): regressors of shape (..., n, k)
+        bread (array): the inverse of X'X of shape (..., k, k)
+
+    Returns:
+        The (..., n) leverage of every observation.
+
+    """
+    return ((x @ bread) * x).sum(axis=-1)
+
+
+def _leverage_weight(x, bread, fe_leverage, power):
+    """A function that computes the weights of the residuals in HC2 and HC3.
+
+    The residual of an observation with a leverage of one, e.g. of a singleton
+    unit, is zero, so its weight is set to zero instead of dividing by zero.
+
+    Args:
+        x (array): regressors of shape (..., n, k)
+        bread (array): the inverse of X'X of shape (..., k, k)
+        fe_leverage (float or array): leverage of the partialled out fixed effects
+        power (float): 0.5 for HC2 and 1 for HC3
+
+    Returns:
+        The (..., n) weights one over (1 - h) to the power.
+
+    """
+    complement = 1 - _leverage(x, bread) - fe_leverage
+    return np.divide(
+        1,
+        np.abs(complement) ** power,
+        out=np.zeros_like(complement),
+        where=complement > 1e-12,
+    )
+
+
+def _group_codes(groups):
+    """A function that maps arbitrary cluster labels to the codes 0, ..., G-1.
+
+    Args:
+        groups (array): cluster label of every observation
+
+    Returns:
+        An integer array with the code of every observation and the number of
+        clusters.
+
+    """
+    labels, codes = np.unique(np.asarray(groups), return_inverse=True)
+    return codes.reshape(-1), len(labels)
+
+
+def _group_sums(scores, codes, n_groups):
+    """A function that sums the scores within clusters in a single bincount pass.
+
+    Args:
+        scores (array): scores of shape (..., n, k)
+        codes (array): cluster code of every observation, shape (n,)
+        n_groups (int): number of clusters
+
+    Returns:
+        The (..., n_groups, k) sums of the scores per cluster.
+
+    """
+    *batch, n, k = scores.shape
+    n_batch = int(np.prod(batch))
+    index = (
+        np.arange(n_batch)[:, None, None] * n_groups + codes[None, :, None]
+    ) * k + np.arange(k)
+    sums = np.bincount(
+        index.reshape(-1),
+        weights=scores.reshape(-1),
+        minlength=n_batch * n_groups * k,
+    )
+    return sums.reshape(*batch, n_groups, k)
+
+
+def _cluster_correction(n_groups, n, k):
+    """A function that computes the small-sample correction of a cluster meat.
+
+    Args:
+        n_groups (int): number of clusters
+        n (int): number of observations
+        k (int): number of parameters
+
+    Returns:
+        The factor G / (G - 1) * (n - 1) / (n - k).
+
+    """
+    return n_groups / (n_groups - 1) * (n - 1) / (n - k)
+
+
+def _cluster_meat(scores, codes, n_groups):
+    """A function that computes the small-sample corrected one-way cluster meat.
+
+    Args:
+        scores (array): scores of shape (..., n, k)
+        codes (array): cluster code of every observation, shape (n,)
+        n_groups (int): number of clusters
+
+    Returns:
+        The (..., k, k) cluster-robust meat.
+
+    """
+    n, k = scores.shape[-2:]
+    sums = _group_sums(scores, codes, n_groups)
+    correction = _cluster_correction(n_groups, n, k)
+    return correction * (np.swapaxes(sums, -1, -2) @ sums)
+
+
+def _clip_psd(meat):
+    """A function that clips the negative eigenvalues of a symmetric meat.
+
+    Args:
+        meat (array): symmetric matrices of shape (..., k, k)
+
+    Returns:
+        The closest positive semi-definite matrices in the Frobenius norm.
+
+    """
+    eigval, eigvec = np.linalg.eigh(meat)
+    return (eigvec * np.clip(eigval, 0, None)[..., None, :]) @ np.swapaxes(
+        eigvec,
+        -1,
+        -2,
+    )
+
+
+def _cluster_robust_meat(x, resid, clusters):
+    """A function that computes one-way or two-way (Cameron-Gelbach-Miller) cluster
+    meats.
+
+    Args:
+        x (array): regressors of shape (..., n, k)
+        resid (array): residuals of shape (..., n)
+        clusters (list): one or two arrays with the cluster label of every
+            observation
+
+    Returns:
+        The (..., k, k) cluster-robust meat.
+
+    """
+    scores = x * resid[..., None]
+    codes = [_group_codes(groups) for groups in clusters]
+    if len(codes) == 1:
+        return _cluster_meat(scores, *codes[0])
+    if len(codes) == 2:
+        (first, n_first), (second, n_second) = codes
+        intersection = _group_codes(first * n_second + second)
+        meat = (
+            _cluster_meat(scores, first, n_first)
+            + _cluster_meat(scores, second, n_second)
+            - _cluster_meat(scores, *intersection)
+        )
+        # The difference need not be positive semi-definite, clip the eigenvalues
+        return _clip_psd(meat)
+    msg = f"Clustering is supported in one or two dimensions, got {len(codes)}."
+    raise ValueError(msg)
+
+
+def _leave_one_out(x, resid, bread, codes, n_groups, annihilator=1.0):
+    """A function that computes the change of the estimates if one cluster is left
+    out, without refitting.
+
+    Leaving out the rows X_g of cluster g changes the estimates by
+    (X'X)^-1 X_g' (A_g - H_gg)^-1 e_g, where H_gg is the block of the hat matrix
+    of the cluster and A_g the diagonal block of the annihilator of the partialled
+    out fixed effects, the identity without them. By the Sherman-Morrison-Woodbury
+    formula this equals (X'X - X_g' A_g^-1 X_g)^-1 X_g' A_g^-1 e_g, a rank-k
+    downdate of X'X, so only the per-cluster sums of the outer products of the
+    regressors and of the scores and one k x k solve per cluster are needed.
+
+    Args:
+        x (array): regressors of shape (..., n, k)
+        resid (array): residuals of shape (..., n)
+        bread (array): the inverse of X'X of shape (..., k, k)
+        codes (array): cluster code of every observation, shape (n,)
+        n_groups (int): number of clusters
+        annihilator (float or array): the diagonal of A_g for every observation.
+            Rows with a zero diagonal, e.g. of a unit with one period, are zero
+            after the transformation and get a zero weight
+
+    Returns:
+        The (..., n_groups, k) differences between the estimates on all clusters
+        and on all but one cluster.
+
+    """
+    *batch, n, k = x.shape
+    annihilator = np.broadcast_to(np.asarray(annihilator, dtype=np.float64), (n,))
+    weight = np.divide(
+        1,
+        annihilator,
+        out=np.zeros(n),
+        where=annihilator > 1e-12,
+    )
+    counts = np.bincount(codes, minlength=n_groups)
+    order = np.argsort(codes, kind="stable")
+    starts = np.cumsum(counts) - counts
+    outer_sums = np.zeros((*batch, n_groups, k, k))
+    score_sums = np.zeros((*batch, n_groups, k))
+
+    # Clusters of the same size are summed in one batched matrix product
+    for size in np.unique(counts):
+        groups = np.flatnonzero(counts == size)
+        rows = order[starts[groups][:, None] + np.arange(size)]
+        x_g = x[..., rows, :]
+        xw_t = np.swapaxes(x_g * weight[rows][..., None], -1, -2)
+        outer_sums[..., groups, :, :] = xw_t @ x_g
+        score_sums[..., groups, :] = (xw_t @ resid[..., rows, None])[..., 0]
+    downdated = np.linalg.inv(bread)[..., None, :, :] - outer_sums
+    return np.linalg.solve(downdated, score_sums[..., None])[..., 0]
+
+
+def _jackknife(x, resid, bread, clusters, annihilator=1.0):
+    """A function that computes the leave-one-cluster-out jackknife covariance
+    matrix.
+
+    Args:
+        x (array): regressors of shape (..., n, k)
+        resid (array): residuals of shape (..., n)
+        bread (array): the inverse of X'X of shape (..., k, k)
+        clusters (list): one array with the cluster label of every observation
+        annihilator (float or array): see _leave_one_out
+
+    Returns:
+        The (..., k, k) covariance matrix (G - 1) / G sum_g (b_g - b)(b_g - b)' of
+        the estimates b_g without cluster g around their mean b.
+
+    """
+    if not clusters or len(clusters) != 1:
+        msg = "cov_type='jackknife' requires the labels of one cluster dimension."
+        raise ValueError(msg)
+    codes, n_groups = _group_codes(clusters[0])
+    delta = _leave_one_out(x, resid, bread, codes, n_groups, annihilator)
+    centered = delta - delta.mean(axis=-2, keepdims=True)
+    return (n_groups - 1) / n_groups * (np.swapaxes(centered, -1, -2) @ centered)
+
+
+def _sandwich(
+    x,
+    resid,
+    bread,
+    cov_type="HC0",
+    clusters=None,
+    annihilator=1.0,
+    absorbed=(0.0, 0),
+):
+    """A function that builds the robust covariance matrix.
+
+    Args:
+        x (array): regressors of shape (..., n, k)
+        resid (array): residuals of shape (..., n)
+        bread (array): the inverse of X'X of shape (..., k, k)
+        cov_type (str): one of COV_TYPES, "jackknife" leaves out one cluster at a
+            time
+        clusters (list): one or two arrays with the cluster label of every
+            observation, only used if cov_type is "cluster" or "jackknife"
+        annihilator (float or array): the diagonal of the annihilator of the
+            fixed effects on the left-out cluster, only used by the jackknife, see
+            _leave_one_out
+        absorbed (tuple): the leverage of the partialled out fixed effects for
+            every observation, which is added to the leverage of x in HC2 and
+            HC3, and their number, which HC1 subtracts from the degrees of freedom
+
+    Returns:
+        The (..., k, k) covariance matrix of the estimated parameters.
+
+    """
+    n, k = x.shape[-2:]
+    fe_leverage, n_effects = absorbed
+    if cov_type == "jackknife":
+        return _jackknife(x, resid, bread, clusters, annihilator)
+    if cov_type == "cluster":
+        if not clusters:
+            msg = "cov_type='cluster' requires the cluster labels."
+            raise ValueError(msg)
+        meat = _cluster_robust_meat(x, resid, clusters)
+    elif cov_type == "HC0":
+        meat = _meat(x, resid)
+    elif cov_type == "HC1":
+        meat = _meat(x, resid) * (n / (n - k - n_effects))
+    elif cov_type == "HC2":
+        meat = _meat(x, resid * _leverage_weight(x, bread, fe_leverage, 0.5))
+    elif cov_type == "HC3":
+        meat = _meat(x, resid * _leverage_weight(x, bread, fe_leverage, 1))
+    else:
+        msg = f"cov_type must be one of {COV_TYPES}, got {cov_type!r}."
+        raise ValueError(msg)
+    return bread @ meat @ bread
@@ -0,0 +1,160 @@
+"""Estimation core built on the cross-product matrices of the panel."""
+
+import numpy as np
+from scipy.stats import chi2
+
+from epp_final_project.analysis.covariance import _gram, _sandwich
+from epp_final_project.analysis.profiling import _stage
+
+
+def _cross_products(xy):
+    """A function that computes the cross-product matrix of the stacked data.
+
+    Args:
+        xy(array): regressors with the outcome as last column, shape (..., n, k + 1)
+
+    Returns:
+        The (..., k + 1, k + 1) matrix that contains X'X, X'y and y'y, accumulated
+        in float64.
+
+    """
+    return _gram(xy, xy)
+
+
+def _solve_normal(cross, inverse=True):
+    """A function that solves the normal equations with one Cholesky factorization.
+
+    The inverse of the Cholesky factor is computed in one batched call, the
+    parameters follow from two products with it on X'y, so X'X itself is only
+    inverted for the bread of a covariance matrix.
+
+    Args:
+        cross(array): cross-products of shape (..., k + 1, k + 1)
+        inverse (bool): also compute the inverse of X'X
+
+    Returns:
+        The (..., k) estimated parameters and the (..., k, k) inverse of X'X, or
+        None if inverse is False.
+
+    """
+    chol_inv = np.linalg.inv(np.linalg.cholesky(cross[..., :-1, :-1]))
+    chol_inv_t = np.swapaxes(chol_inv, -1, -2)
+    beta_est = (chol_inv_t @ (chol_inv @ cross[..., :-1, -1:]))[..., 0]
+    if not inverse:
+        return beta_est, None
+    return beta_est, chol_inv_t @ chol_inv
+
+
+def _residual_ssr(cross, beta_est):
+    """A function that computes the sum of squared residuals from the cross-products.
+
+    Args:
+        cross(array): cross-products of shape (..., k + 1, k + 1)
+        beta_est(array): the estimated parameters of shape (..., k)
+
+    Returns:
+        The (...) sum of squared residuals y'y - beta'X'y.
+
+    """
+    return cross[..., -1, -1] - (cross[..., :-1, -1] * beta_est).sum(axis=-1)
+
+
+def _random_effects_cross(one_way, unit_mean, beta_one_way, t_per):
+    """A function that derives the cross-products of the random-effects estimator.
+
+    The variance components follow Swamy and Arora (1972): the idiosyncratic
+    variance from the within residuals and the variance of the unit means from
+    the between regression on the unit means. The pooled cross-products are the
+    sum of the within and the between ones, and subtracting theta times the unit
+    means scales the between part by (1 - theta)^2. Both parts are built from
+    their own data, the difference of the pooled and the within cross-products
+    would cancel with large unit levels.
+
+    Args:
+        one_way(array): one-way within cross-products of shape (..., k + 1, k + 1)
+        unit_mean(array): the unit means of the regressors and the outcome of
+            shape (..., n_obs, k + 1)
+        beta_one_way(array): the one-way estimated parameters of shape (..., k)
+        t_per(int): the number of periods
+
+    Returns:
+        The (..., k + 1, k + 1) quasi-demeaned cross-products, the (...) share
+        theta of the unit means and the (...) idiosyncratic variance.
+
+    """
+    n_obs, n_params = unit_mean.shape[-2], unit_mean.shape[-1] - 1
+    between = t_per * _cross_products(unit_mean)
+    beta_between, _ = _solve_normal(between, inverse=False)
+    resid = unit_mean[..., -1] - (unit_mean[..., :-1] @ beta_between[..., None])[..., 0]
+    sigma_e = _residual_ssr(one_way, beta_one_way) / (n_obs * (t_per - 1) - n_params)
+    sigma_b = (resid**2).sum(axis=-1) / (n_obs - n_params)
+    # A negative estimate of the unit variance is set to zero, i.e. pooled OLS
+    theta = 1 - np.sqrt(np.minimum(1, sigma_e / (t_per * sigma_b)))
+    shrink = (1 - theta) ** 2
+    return one_way + shrink[..., None, None] * between, theta, sigma_e
+
+
+def _hausman(beta_fe, beta_re, bread_fe, bread_re, sigma_e):
+    """A function that computes the Hausman test of the random-effects estimator.
+
+    The covariance matrices of both estimators use the idiosyncratic variance of
+    the within residuals, so their difference is positive definite.
+
+    Args:
+        beta_fe(array): fixed effects estimated parameters of shape (..., k)
+        beta_re(array): random-effects estimated parameters of shape (..., k)
+        bread_fe(array): the inverse of the within X'X of shape (..., k, k)
+        bread_re(array): the inverse of the quasi-demeaned X'X of shape (..., k, k)
+        sigma_e(array): the (...) idiosyncratic variance
+
+    Returns:
+        The (...) Hausman statistic and its p-value from the chi-squared
+        distribution with k degrees of freedom.
+
+    """
+    diff = beta_fe - beta_re
+    var = sigma_e[..., None, None] * (bread_fe - bread_re)
+    statistic = (diff * np.linalg.solve(var, diff[..., None])[..., 0]).sum(axis=-1)
+    return statistic, chi2.sf(statistic, df=diff.shape[-1])
+
+
+def _fit(xy_t, cov_type="HC0", clusters=None, annihilator=1.0, absorbed=(0.0, 0)):
+    """A function that estimates the parameters and their robust covariance matrix.
+
+    Leading dimensions are treated as a batch of replications, every one of them
+    is solved in the same call.
+
+    Args:
+        xy_t(array): (transformed) regressors with the (transformed) outcome as last
+            column, shape (..., n, k + 1)
+        cov_type (str): type of the robust covariance matrix
+        clusters (list): cluster labels if cov_type is "cluster" or "jackknife"
+        annihilator (float or array): the diagonal of the annihilator of the fixed
+            effects on the left-out cluster of the jackknife
+        absorbed (tuple): the leverage and the number of the partialled out fixed
+            effects, see _sandwich
+
+    Returns:
+        the (..., k) estimated parameters and their (..., k, k) covariance matrix
+
+    """
+    with _stage("solve"):
+        beta_est, bread = _solve_normal(_cross_products(xy_t))
+
+        # Extract the errors of the transformed data, which do not contain the
+        # fixed effects
+        x, y = xy_t[..., :-1], xy_t[..., -1]
+        e_est = (x @ beta_est[..., None].astype(x.dtype, copy=False))[..., 0] - y
+
+    # Using theory obtain the covariance matrix
+    with _stage("covariance"):
+        var = _sandwich(
+            xy_t[..., :-1],
+            e_est,
+            bread,
+            cov_type,
+            clusters,
+            annihilator,
+            absorbed,
+        )
+    return beta_est, var
@@ -0,0 +1,174 @@
+"""Declarative grid of Monte Carlo scenarios."""
+
+import itertools
+
+from epp_final_project.analysis.cache import MAX_CACHE_BYTES, cached_compare_est
+from epp_final_project.analysis.model import SCENARIO_PARAMS, compare_est
+
+
+def _expand_grid(grid):
+    """A function that expands a grid into the Cartesian product of its values.
+
+    Args:
+        grid (dict): the values of every varied parameter
+
+    Returns:
+        A list with a dictionary of parameter values for every grid point.
+
+    """
+    return [
+        dict(zip(grid, values, strict=True))
+        for values in itertools.product(*grid.values())
+    ]
+
+
+def _scenario_id(point):
+    """A function that names a grid point.
+
+    Args:
+        point (dict): the values of the varied parameters
+
+    Returns:
+        The value itself if a single parameter is varied, otherwise the
+        parameter=value pairs joined by underscores.
+
+    """
+    if len(point) == 1:
+        return str(*point.values())
+    return "_".join(f"{name}={value}" for name, value in point.items())
+
+
+def _scenarios(spec, baseline):
+    """A function that lists every scenario of a scenario specification.
+
+    Args:
+        spec (dict): a grid of parameter values for every named family of
+            scenarios, e.g. {"c_unit": {"c_unit": (0, 0.4)}}
+        baseline (dict): arguments of compare_est that are not varied
+
+    Returns:
+        A dictionary that maps (family, scenario id) to the arguments of
+        compare_est.
+
+    """
+    return {
+        (family, _scenario_id(point)): {**baseline, **point}
+        for family, grid in spec.items()
+        for point in _expand_grid(grid)
+    }
+
+
+def _hashable(value):
+    """A function that converts an argument of compare_est to a hashable value.
+
+    Args:
+        value (obj): the value of the argument
+
+    Returns:
+        A tuple for lists and tuples, a sorted tuple of the items for dictionaries
+        and the value itself otherwise.
+
+    """
+    if isinstance(value, list | tuple):
+        return tuple(value)
+    if isinstance(value, dict):
+        return tuple(sorted(value.items()))
+    return value
+
+
+def _dgp_key(params):
+    """A function that identifies the data generating stage of a scenario.
+
+    Args:
+        params (dict): arguments of compare_est
+
+    Returns:
+        A hashable tuple of every argument except the scenario parameters.
+
+    """
+    return tuple(
+        (name, _hashable(value))
+        for name, value in sorted(params.items())
+        if name not in SCENARIO_PARAMS
+    )
+
+
+def _dgp_groups(scenarios):
+    """A function that groups the scenarios that share the same simulated data.
+
+    Scenarios that only differ in c_unit, c_time, c_trend or c_var are estimated
+    on the same base draws of the covariates and error terms.
+
+    Args:
+        scenarios (dict): arguments of compare_est for every scenario
+
+    Returns:
+        A list of dictionaries that map the scenarios of a group to their
+        arguments.
+
+    """
+    groups = {}
+    for key, params in scenarios.items():
+        groups.setdefault(_dgp_key(params), {})[key] = params
+    return list(groups.values())
+
+
+def run_group(
+    scenarios,
+    cache_dir=None,
+    max_bytes=MAX_CACHE_BYTES,
+    profile=False,
+    **kwargs,
+):
+    """A function that simulates a group of scenarios with one shared DGP.
+
+    Args:
+        scenarios (dict): arguments of compare_est for every scenario, which may
+            only differ in the scenario parameters
+        cache_dir (Path): directory of the result cache, no cache is used if None
+            or if the scenarios stop at a precision target
+        max_bytes (int): maximum size of the cache in bytes
+        profile (bool): profile the stages of the simulation, the cache is not used
+            for profiled runs
+        **kwargs: further arguments of compare_est, e.g. n_jobs
+
+    Returns:
+        A dictionary with the result of compare_est for every scenario, and the
+        profile table if profile is True. With a precision target, every result
+        only contains the replications its scenario needed.
+
+    """
+    params = [
+        {name: value for name, value in scenario.items() if name in SCENARIO_PARAMS}
+        for scenario in scenarios.values()
+    ]
+    overrides = [
+        dict(items) for items in dict.fromkeys(tuple(p.items()) for p in params)
+    ]
+    shared = {
+        name: value
+        for name, value in next(iter(scenarios.values())).items()
+        if name not in SCENARIO_PARAMS
+    }
+    if profile:
+        tables, table = compare_est(
+            **shared,
+            **kwargs,
+            scenarios=overrides,
+            profile=True,
+        )
+    elif cache_dir is None or {**shared, **kwargs}.get("precision") is not None:
+        tables = compare_est(**shared, **kwargs, scenarios=overrides)
+    else:
+        tables = cached_compare_est(
+            cache_dir,
+            max_bytes,
+            **shared,
+            **kwargs,
+            scenarios=overrides,
+        )
+    results = {
+        key: tables[overrides.index(override)]
+        for key, override in zip(scenarios, params, strict=True)
+    }
+    return (results, table) if profile else results
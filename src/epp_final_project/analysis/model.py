@@ -1,8 +1,48 @@
 import math
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 import pandas as pd
 
+from epp_final_project.analysis.aggregate import (
+    PRECISION_TARGETS,
+    _merge_accumulators,
+    _precision_reached,
+    _summary_table,
+    _update_accumulators,
+)
+from epp_final_project.analysis.bootstrap import BOOT_WEIGHTS, _wild_bootstrap
+from epp_final_project.analysis.covariance import _group_codes, _sandwich
+from epp_final_project.analysis.estimation import (
+    _cross_products,
+    _fit,
+    _hausman,
+    _random_effects_cross,
+    _solve_normal,
+)
+from epp_final_project.analysis.profiling import (
+    _merge_stages,
+    _profile_table,
+    _profiling,
+    _stage,
+)
+from epp_final_project.analysis.transform import (
+    _quasi_demean,
+    _transform_one_way,
+    _transform_two_way,
+    _within_one_way,
+    _within_two_way,
+    _within_unit_trend,
+)
+
+ESTIMATORS = ("OLS", "one_way", "two_way")
+DTYPES = ("float32", "float64")
+SCENARIO_PARAMS = ("c_unit", "c_time", "c_trend", "c_var")
+# Fixed order of all estimators, which keys the seeds of their bootstrap weights
+ESTIMATOR_KEYS = (*ESTIMATORS, "unit_trend", "RE")
+
 
 # Covariance function
 def _covariance(rng, n_params):
@@ -20,6 +60,28 @@ def _covariance(rng, n_params):
     return helper @ helper.T + np.eye(n_params)
 
 
+# Draws from the multivariate normal distribution
+def _mvn(rng, mean, cov, size, dtype=np.float64):
+    """A function that draws from a multivariate normal distribution with a single
+    Cholesky factor.
+
+    Args:
+        rng (obj): random generator
+        mean (array): the mean of X values
+        cov (array): the covariance matrix
+        size (tuple): leading shape of the draws
+        dtype (type): floating point type of the draws
+
+    Returns:
+        An array of shape (*size, len(mean)).
+
+    """
+    chol = np.linalg.cholesky(cov).astype(dtype, copy=False)
+    draws = rng.standard_normal(size=(*size, len(mean)), dtype=dtype) @ chol.T
+    draws += np.asarray(mean, dtype=dtype)
+    return draws
+
+
 # Generating initial x covariates
 def _x_init(rng, mean, cov, n_obs):
     """A function that generates data from multivariate normal distribution .
@@ -31,11 +93,10 @@ def _x_init(rng, mean, cov, n_obs):
         n_obs (int): number of observations.
 
     Returns:
-        A dataframe for number of n_obs.
+        An array of shape (n_obs, n_params).
 
     """
-    x_initial = pd.DataFrame(rng.multivariate_normal(mean=mean, cov=cov, size=n_obs))
-    return x_initial
+    return _mvn(rng, mean, cov, (n_obs,))
 
 
 # Generating variation over time
@@ -49,20 +110,23 @@ def _x_time(rng, mean, cov, t_per):
         t_per(int): the number of periods
 
     Returns:
-        A dataframe for number of n_obs.
+        An array of shape (t_per, n_params).
 
     """
-    x_time = pd.DataFrame(rng.multivariate_normal(mean=mean, cov=cov, size=t_per))
-    return x_time
+    return _mvn(rng, mean, cov, (t_per,))
 
 
 # Function for panel data
 def _xpanel(x_initial, x_time, t_per, rng, mean, cov, n_obs, c_var):
     """A function that build a panel data for n_obs observations and t_per period.
 
+    All the n_obs * t_per shocks are drawn in one call, so the cost is linear in the
+    size of the panel. Leading dimensions of x_initial and x_time are treated as a
+    batch of replications.
+
     Args:
-        x_initial(dataframe): initial x covariates
-        x_time(dataframe): variations across time
+        x_initial(array): initial x covariates of shape (..., n_obs, n_params)
+        x_time(array): variations across time of shape (..., t_per, n_params)
         t_per(int): the number of periods
         rng (obj): random generator
         mean (array): the mean of X values
@@ -71,99 +135,145 @@ def _xpanel(x_initial, x_time, t_per, rng, mean, cov, n_obs, c_var):
         c_var(int): correlation variables
 
     Returns:
-        A data frame for n_obs and t_per periods.
+        A contiguous array of shape (..., t_per, n_obs, n_params).
 
     """
-    x_panel = pd.DataFrame()
-    for per in range(1, t_per + 1):
-        x = (
-            x_initial
-            + x_time.loc[per - 1, :]
-            + c_var
-            * pd.DataFrame(rng.multivariate_normal(mean=mean, cov=cov, size=n_obs))
-        )
-        # + c_trend*per*x_trend
-        x["time"] = per
-        x["obs"] = np.arange(1, (n_obs + 1))
-        x_panel = pd.concat([x_panel, x])
-    return x_panel.set_index("time")
+    batch = x_initial.shape[:-2]
+    x_shocks = _mvn(rng, mean, cov, (*batch, t_per, n_obs))
+    return _combine_xpanel(x_initial, x_time, x_shocks, c_var, inplace=True)
 
 
-def _transform_one_way(x, n_obs, t_per):
-    """A function that makes one way transformation.
+def _combine_xpanel(x_initial, x_time, x_shocks, c_var, inplace=False):
+    """A function that combines the base draws of the covariates to a panel.
 
     Args:
-        x(dataframe): panel data
-        n_obs (int): number of observations
-        t_per(int): the number of periods
+        x_initial(array): initial x covariates of shape (..., n_obs, n_params)
+        x_time(array): variations across time of shape (..., t_per, n_params)
+        x_shocks(array): unit-period shocks of shape (..., t_per, n_obs, n_params)
+        c_var(int): correlation variables
+        inplace (bool): overwrite x_shocks instead of allocating the result
 
     Returns:
-        one-way transformed dataframe for n_obs and t_per periods.
+        A contiguous array of shape (..., t_per, n_obs, n_params).
 
     """
-    x_df = x.copy()
-    x_df["obs"] = np.tile(np.arange(1, (n_obs + 1)), t_per)
-    x_mean = x_df.groupby("obs").mean()
-    x_panel_mean = pd.DataFrame(np.tile(x_mean, (t_per, 1)))
-    return x_df.drop("obs", axis=1) - x_panel_mean
+    if inplace:
+        x_shocks *= c_var
+        x_panel = x_shocks
+    else:
+        x_panel = x_shocks * c_var
+    x_panel += x_initial[..., None, :, :]
+    x_panel += x_time[..., :, None, :]
+    return x_panel
 
 
-# Define function for two-way transformation
-def _transform_two_way(x, n_obs, t_per):
-    """A function that makes two way transformation.
+def _panel_frame(x_panel):
+    """A function that flattens the panel array to the long data frame used by the
+    estimators.
 
     Args:
-        x(dataframe): panel data
-        n_obs (int): number of observations
-        t_per(int): the number of periods
+        x_panel(array): panel data of shape (t_per, n_obs, n_params)
 
     Returns:
-        two-way transformed dataframe for n_obs and t_per periods.
+        A data frame with the columns "time", 0, ..., n_params - 1 and "obs".
 
     """
-    # Generate the columns that tell observation and the time
-    x_df = x.copy()
-    x_df["obs"] = np.tile(np.arange(1, (n_obs + 1)), t_per)
-    x_df["time"] = np.repeat(np.arange(0, t_per), n_obs)
-
-    # Averaged each unit over time
-    x_mean_unit = x_df.drop("time", axis=1).groupby("obs").mean()
-    x_panel_unit = pd.DataFrame(np.tile(x_mean_unit, (t_per, 1)))
-
-    # Averaged each time over unit
-    x_mean_time = x_df.drop("obs", axis=1).groupby("time").mean()
-    x_panel_time = pd.DataFrame(np.repeat(x_mean_time.values, n_obs, axis=0))
-
-    # Transforming
-    return (
-        x_df.drop(["time", "obs"], axis=1)
-        - x_panel_unit
-        - x_panel_time
-        + x_df.drop(["time", "obs"], axis=1).mean()
-    )
+    t_per, n_obs, n_params = x_panel.shape
+    df = pd.DataFrame(x_panel.reshape(t_per * n_obs, n_params))
+    df.insert(0, "time", np.repeat(np.arange(1, t_per + 1), n_obs))
+    df["obs"] = np.tile(np.arange(1, n_obs + 1), t_per)
+    return df
 
 
 # Function for additive time trend structure
-def _time_trend(n_obs, rng, t_per, c_trend, seed):
-    """A function that generates time trend.
+def _time_trend(n_obs, rng, t_per, c_trend, batch=()):
+    """A function that generates unit-specific linear time trends.
+
+    The slope w_i of every unit is drawn from rng, so every replication has its
+    own trends.
 
     Args:
         n_obs (int): number of observations
         rng (obj): random generator
         t_per(int): the number of periods
         c_trend(int): trend constant
+        batch (tuple): leading shape of a batch of replications
 
     Returns:
-        two-way transformed dataframe for n_obs and t_per periods.
+        An array of shape (*batch, t_per * n_obs) with the trend w_i * t * c_trend
+        of every row.
 
     """
-    rng = np.random.default_rng(seed)
     # Generate the normally distributed w
-    tw_i = []
-    w_i = rng.normal(2, 0.5, size=n_obs)
-    for k in range(1, t_per + 1):
-        tw_i.extend(np.multiply(w_i, k * c_trend))
-    return np.array(tw_i)
+    w_i = rng.normal(2, 0.5, size=(*batch, n_obs))
+    periods = np.arange(1, t_per + 1)[:, None] * c_trend
+    return (periods * w_i[..., None, :]).reshape(*batch, t_per * n_obs)
+
+
+# Draw the error terms
+def _error_draws(rng, batch, n_obs, t_per, dtype=np.float64):
+    """A function that draws the random parts of the error terms.
+
+    Args:
+        rng (obj): random generator
+        batch (tuple): leading shape of a batch of replications
+        n_obs (int): number of observations.
+        t_per(int): the number of periods
+        dtype (type): floating point type of the draws
+
+    Returns:
+        The idiosyncratic errors and the uniform parts of the unit and time effects.
+
+    """
+    # Generate time variant(epsilon_it) and time invariant(u_i) under fixed effect assumptions
+    epsilon_it = rng.standard_normal(size=(*batch, n_obs * t_per), dtype=dtype)
+    # Generate time invariant and unit invariant fixed error terms
+    u_draw = rng.random(size=(*batch, n_obs), dtype=dtype)
+    v_draw = rng.random(size=(*batch, t_per), dtype=dtype)
+    return epsilon_it, u_draw, v_draw
+
+
+# Structure the y values
+def _outcome(
+    x_panel,
+    x_initial,
+    x_time,
+    draws,
+    n_obs,
+    t_per,
+    c_unit,
+    c_time,
+    n_params,
+    true_params,
+    tw_i,
+):
+    """A function that combines the covariates and the error draws to y values.
+
+    Args:
+        x_panel(array): panel data of shape (..., t_per, n_obs, n_params)
+        x_initial(array): initial x covariates of shape (..., n_obs, n_params)
+        x_time(array): variations across time of shape (..., t_per, n_params)
+        draws (tuple): the output of _error_draws
+        n_obs (int): number of observations.
+        t_per(int): the number of periods
+        c_unit(int): constant for unit endogeneity
+        c_time(int): constant for time endogeneity
+        n_params: number of parameters
+        true_params: true parameters
+        tw_i(array): the time trend of every row
+
+    Returns:
+        an array of shape (..., n_obs * t_per) that includes y values
+
+    """
+    batch = x_initial.shape[:-2]
+    epsilon_it, u_draw, v_draw = draws
+    u_i = np.tile((x_initial[..., 1] * c_unit) + u_draw, t_per)
+    v_t = np.repeat((x_time[..., 1] * c_time) + v_draw, n_obs, axis=-1)
+    # Extract x and y values
+    x_panel_data = x_panel.reshape(*batch, n_obs * t_per, n_params)
+    y_it = x_panel_data @ np.asarray(true_params, dtype=x_panel.dtype)
+    return y_it + u_i + v_t + tw_i.astype(x_panel.dtype, copy=False) + epsilon_it
 
 
 # Generate error terms and structure the y values
@@ -179,14 +289,16 @@ def _error_terms(
     n_params,
     true_params,
     c_trend,
-    seed,
 ):
     """A function that generates error terms.
 
+    Leading dimensions of x_initial and x_time are treated as a batch of
+    replications.
+
     Args:
-        x_panel(dataframe): panel data
-        x_initial(dataframe): initial x covariates
-        x_time(dataframe): variations across time
+        x_panel(array): panel data of shape (..., t_per, n_obs, n_params)
+        x_initial(array): initial x covariates of shape (..., n_obs, n_params)
+        x_time(array): variations across time of shape (..., t_per, n_params)
         rng (obj): random generator
         n_obs (int): number of observations.
         t_per(int): the number of periods
@@ -197,63 +309,220 @@ def _error_terms(
         c_trend(int): trend constant
 
     Returns:
-        a one dimensional dataframe that includes y values
+        an array of shape (..., n_obs * t_per) that includes y values
 
     """
-    # Generate time variant(epsilon_it) and time invariant(u_i) under fixed effect assumptions
-    epsilon_it = rng.normal(size=n_obs * t_per)
-    # Generate time invariant and unit invariant fixed error terms
-    u_i = np.tile((x_initial[1] * c_unit) + rng.uniform(size=n_obs), t_per)
-    v_t = np.repeat((x_time[1] * c_time) + rng.uniform(size=t_per), n_obs).to_numpy()
-    tw_i = _time_trend(n_obs, rng, t_per, c_trend, seed)  # *x_panel[1] * 0.2
-    # Extract x and y values
-    x_panel_data = x_panel.loc[:, 0 : (n_params - 1)]
-    return pd.DataFrame(x_panel_data @ true_params + u_i + v_t + tw_i + epsilon_it)
+    batch = x_initial.shape[:-2]
+    draws = _error_draws(rng, batch, n_obs, t_per)
+    tw_i = _time_trend(n_obs, rng, t_per, c_trend, batch)
+    return _outcome(
+        x_panel,
+        x_initial,
+        x_time,
+        draws,
+        n_obs,
+        t_per,
+        c_unit,
+        c_time,
+        n_params,
+        true_params,
+        tw_i,
+    )
+
+
+def _panel_labels(n_obs, t_per):
+    """A function that creates the unit and time labels of a balanced panel.
+
+    Args:
+        n_obs (int): number of observations
+        t_per(int): the number of periods
+
+    Returns:
+        A dictionary with the "obs" and "time" label of every row.
+
+    """
+    return {
+        "obs": np.tile(np.arange(1, n_obs + 1), t_per),
+        "time": np.repeat(np.arange(1, t_per + 1), n_obs),
+    }
+
+
+def _unbalanced_labels(x_panel, n_obs, t_per):
+    """A function that returns the unit and time labels if the panel is unbalanced.
+
+    Args:
+        x_panel(df): the panel data for X with the "obs" and "time" columns
+        n_obs (int): number of observations
+        t_per(int): the number of periods
+
+    Returns:
+        A dictionary with the "obs" and "time" labels, empty if every unit is
+        observed in every period.
+
+    """
+    if len(x_panel) == n_obs * t_per:
+        return {}
+    return {name: x_panel[name].to_numpy() for name in ("obs", "time")}
+
+
+def _cluster_labels(x_panel, cov_type, cluster):
+    """A function that extracts the cluster labels from the panel data.
+
+    Args:
+        x_panel(df or dict): the panel data for X or the panel labels with the
+            "obs" and "time" columns
+        cov_type (str): type of the robust covariance matrix
+        cluster (str or list): "obs", "time" or both of them
+
+    Returns:
+        A list of arrays with the cluster labels or None if cov_type is neither
+        "cluster" nor "jackknife".
+
+    """
+    if cov_type not in ("cluster", "jackknife"):
+        return None
+    names = [cluster] if isinstance(cluster, str) else list(cluster)
+    return [np.asarray(x_panel[name]) for name in names]
+
+
+def _annihilator(estimator, cov_type, cluster, labels):
+    """A function that computes the diagonal of the annihilator of the fixed effects
+    on the rows of a cluster that is left out by the jackknife.
+
+    The fixed effects of the dimension that is left out drop with the cluster, the
+    other ones have 1 / (number of rows of their group) on the diagonal of their
+    projection. On balanced panels the annihilator is diagonal on the left-out
+    complement of the unit or time constants, so the jackknife is exact. On
+    unbalanced panels it is only exact for the one-way estimator. The unit trends
+    leave the leverage of the period within the unit on the diagonal.
+
+    Args:
+        estimator (str): one of ESTIMATORS, "unit_trend" or "RE"
+        cov_type (str): type of the robust covariance matrix
+        cluster (str or list): the dimension that is left out, "obs" or "time"
+        labels (df or dict): the "obs" and "time" label of every row
+
+    Returns:
+        The diagonal of the annihilator for every row, or 1.0 if there are no
+        fixed effects of another dimension.
+
+    """
+    left_out = cluster if isinstance(cluster, str) else cluster[0]
+    effects = {
+        "OLS": (),
+        "one_way": ("obs",),
+        "two_way": ("obs", "time"),
+        "unit_trend": ("obs",),
+        "RE": (),
+    }
+    others = [name for name in effects[estimator] if name != left_out]
+    if cov_type != "jackknife" or not others:
+        return 1.0
+    if estimator == "unit_trend":
+        # The unit trends project on [1, t], so the diagonal is one minus the
+        # leverage of the period of the row within its unit
+        return 1 - _absorbed_effects(estimator, "HC3", labels)[0]
+    codes, _ = _group_codes(labels[others[0]])
+    return 1 - 1 / np.bincount(codes)[codes]
+
+
+def _absorbed_effects(estimator, cov_type, labels):
+    """A function that computes the leverage and the number of the fixed effects
+    that an estimator partials out.
+
+    The hat matrix of the regression with the dummies is the sum of the hat matrix
+    of the transformed regressors and the one of the dummies. HC2 and HC3 add the
+    leverage of the dummies to the one of the transformed regressors, and HC1
+    subtracts their number from the degrees of freedom.
+
+    Args:
+        estimator (str): one of ESTIMATORS, "unit_trend" or "RE"
+        cov_type (str): type of the robust covariance matrix
+        labels (df or dict): the "obs" and "time" label of every row
+
+    Returns:
+        The leverage of the dummies for every row, or 0.0 without fixed effects
+        or if cov_type is not HC1, HC2 or HC3, and the rank of the dummies.
+
+    """
+    if estimator in ("OLS", "RE") or cov_type not in ("HC1", "HC2", "HC3"):
+        return 0.0, 0
+    obs, n_units = _group_codes(labels["obs"])
+    counts = np.bincount(obs)
+    if estimator == "one_way":
+        return 1 / counts[obs], n_units
+    time = np.asarray(labels["time"], dtype=np.float64)
+    if estimator == "unit_trend":
+        centered = time - (np.bincount(obs, time) / counts)[obs]
+        trend = centered**2 / np.bincount(obs, centered**2)[obs]
+        return 1 / counts[obs] + trend, 2 * n_units
+    # By FWL the time dummies demeaned within units add their leverage to the one
+    # of the unit dummies. They share one constant with the unit dummies, so
+    # their T x T Gram matrix is inverted on its nonzero eigenvalues.
+    time, n_periods = _group_codes(time)
+    cells = np.bincount(obs * n_periods + time, minlength=n_units * n_periods)
+    if len(obs) == len(cells) and (cells == 1).all():
+        leverage = 1 / n_periods + 1 / n_units - 1 / (n_units * n_periods)
+        return np.full(len(obs), leverage), n_units + n_periods - 1
+    shares = cells.reshape(n_units, n_periods) / counts[:, None]
+    demeaned = -shares[obs]
+    demeaned[np.arange(len(obs)), time] += 1
+    eigval, eigvec = np.linalg.eigh(demeaned.T @ demeaned)
+    keep = eigval > 1e-10 * eigval.max()
+    projected = demeaned @ eigvec[:, keep]
+    leverage = 1 / counts[obs] + (projected**2 / eigval[keep]).sum(axis=1)
+    return leverage, n_units + keep.sum()
 
 
 # Generate the function for OLS regression
-def _est_OLS(y_it, x_panel, n_params):
+def _est_OLS(y_it, x_panel, n_params, cov_type="HC0", cluster="obs", full=False):
     """A function for OLS regression and obtaining resulting estimaton.
 
     Args:
         y_it(dataframe): one-dimensional y dataframe
         x_panel(df): the panel data for X
         n_params (int): number of parameters.
+        cov_type (str): type of the robust covariance matrix
+        cluster (str or list): cluster dimensions if cov_type is "cluster"
+        full (bool): return all parameters and their covariance matrix
 
     Returns:
         estimated parameter for the beta_1 and
-        standard deviation for beta_1
+        standard deviation for beta_1, or the estimated parameters and their
+        covariance matrix if full is True
 
     """
     # Assign the x and y values
-    x_panel_data = x_panel.loc[:, 0 : (n_params - 1)]
+    x_panel_data = x_panel.loc[:, 0 : (n_params - 1)].to_numpy()
+    y = y_it.to_numpy()[:, 0]
 
     # Apply pooled estimator and show consistency, show how many times CI had the real Beta
-    beta_est = np.linalg.inv(x_panel_data.transpose() @ x_panel_data) @ (
-        x_panel_data.transpose() @ y_it
+    beta_est, var_pooled = _fit(
+        np.column_stack([x_panel_data, y]),
+        cov_type=cov_type,
+        clusters=_cluster_labels(x_panel, cov_type, cluster),
     )
 
-    # Generate estimated y values
-    y_est = x_panel_data @ beta_est
-
-    # Extract errors
-    e_it_sq = ((y_est - y_it) ** 2).iloc[:, 0]
-
-    # Using theory obtain the covariance matrix
-    var_pooled = (
-        np.linalg.inv(x_panel_data.T @ x_panel_data)
-        @ (x_panel_data.T @ np.diag(e_it_sq) @ x_panel_data)
-        @ np.linalg.inv(x_panel_data.T @ x_panel_data)
-    )
+    if full:
+        return beta_est, var_pooled
 
     # Extract the first value of the covariance matrix
-    beta1_sd = math.sqrt(var_pooled.iloc[1, 1])
-    return beta_est.loc[1, 0], beta1_sd
+    beta1_sd = math.sqrt(var_pooled[1, 1])
+    return beta_est[1], beta1_sd
 
 
 # Function one-way fixed error estimation
-def _est_one_way(y_it, x_panel, n_obs, t_per, n_params):
-    """"A function for one-way estimator.
+def _est_one_way(
+    y_it,
+    x_panel,
+    n_obs,
+    t_per,
+    n_params,
+    cov_type="HC0",
+    cluster="obs",
+    full=False,
+):
+    """ "A function for one-way estimator.
 
     Args:
         y_it(dataframe): one-dimensional y dataframe
@@ -261,44 +530,58 @@ def _est_one_way(y_it, x_panel, n_obs, t_per, n_params):
         n_obs (int): number of observations.
         t_per(int): the number of periods
         n_params (int): number of parameters.
+        cov_type (str): type of the robust covariance matrix
+        cluster (str or list): cluster dimensions if cov_type is "cluster"
+        full (bool): return all parameters and their covariance matrix
 
     Returns:
         estimated parameter for the beta_1 and
-        standard deviation for beta_1
+        standard deviation for beta_1, or the estimated parameters and their
+        covariance matrix if full is True
 
     """
     # Assign the x and y values
-    x_panel_data = x_panel.loc[:, 0 : (n_params - 1)]
+    x_panel_data = x_panel.loc[:, 0 : (n_params - 1)].to_numpy()
+    y = y_it.to_numpy()[:, 0]
 
-    # Transform x and y values
-    x_panel_t = _transform_one_way(x_panel_data, n_obs, t_per=t_per)
-    y_panel_t = _transform_one_way(y_it, n_obs, t_per=t_per)
+    # Transform x and y values in one pass
+    with _stage("transform"):
+        xy_t = _transform_one_way(
+            np.column_stack([x_panel_data, y]),
+            n_obs,
+            t_per,
+            obs=_unbalanced_labels(x_panel, n_obs, t_per).get("obs"),
+            inplace=True,
+        )
 
     # Estimated values
-    beta_est = np.linalg.inv(x_panel_t.transpose() @ x_panel_t) @ (
-        x_panel_t.transpose() @ y_panel_t
+    beta_est, var_fixed = _fit(
+        xy_t,
+        cov_type=cov_type,
+        clusters=_cluster_labels(x_panel, cov_type, cluster),
+        annihilator=_annihilator("one_way", cov_type, cluster, x_panel),
+        absorbed=_absorbed_effects("one_way", cov_type, x_panel),
     )
 
-    # Generate estimated y values
-    y_est = x_panel_data @ beta_est
-
-    # Extract errors
-    e_est_sq = ((y_est - y_it) ** 2).iloc[:, 0]
-
-    # Using theory obtain the covariance matrix
-    var_fixed = (
-        np.linalg.inv(x_panel_t.T @ x_panel_t)
-        @ (x_panel_t.T @ np.diag(e_est_sq) @ x_panel_t)
-        @ np.linalg.inv(x_panel_t.T @ x_panel_t)
-    )
+    if full:
+        return beta_est, var_fixed
 
     # Extract the first value of the covariance matrix
-    beta1_sd = math.sqrt(var_fixed.iloc[1, 1])
-    return beta_est.loc[1, 0], beta1_sd
+    beta1_sd = math.sqrt(var_fixed[1, 1])
+    return beta_est[1], beta1_sd
 
 
-def _est_two_way(y_it, x_panel, n_obs, t_per, n_params):
-    """"A function for two-way estimator.
+def _est_two_way(
+    y_it,
+    x_panel,
+    n_obs,
+    t_per,
+    n_params,
+    cov_type="HC0",
+    cluster="obs",
+    full=False,
+):
+    """ "A function for two-way estimator.
 
     Args:
         y_it(dataframe): one-dimensional y dataframe
@@ -306,40 +589,213 @@ def _est_two_way(y_it, x_panel, n_obs, t_per, n_params):
         n_obs (int): number of observations.
         t_per(int): the number of periods
         n_params (int): number of parameters.
+        cov_type (str): type of the robust covariance matrix
+        cluster (str or list): cluster dimensions if cov_type is "cluster"
+        full (bool): return all parameters and their covariance matrix
 
     Returns:
         estimated parameter for the beta_1 and
-        standard deviation for beta_1
+        standard deviation for beta_1, or the estimated parameters and their
+        covariance matrix if full is True
 
     """
-    # Generate the x and y variables
-    x_panel_data = x_panel.loc[:, 0 : (n_params - 1)]
+    # Assign the x and y values
+    x_panel_data = x_panel.loc[:, 0 : (n_params - 1)].to_numpy()
+    y = y_it.to_numpy()[:, 0]
 
-    # Transform x and y values
-    x_panel_t = _transform_two_way(x_panel_data, n_obs, t_per)
-    y_panel_t = _transform_two_way(y_it, n_obs, t_per)
+    # Transform x and y values in one pass
+    with _stage("transform"):
+        xy_t = _transform_two_way(
+            np.column_stack([x_panel_data, y]),
+            n_obs,
+            t_per,
+            **_unbalanced_labels(x_panel, n_obs, t_per),
+            inplace=True,
+        )
 
     # Estimated values
-    beta_est = np.linalg.inv(x_panel_t.transpose() @ x_panel_t) @ (
-        x_panel_t.transpose() @ y_panel_t
+    beta_est, var_fixed = _fit(
+        xy_t,
+        cov_type=cov_type,
+        clusters=_cluster_labels(x_panel, cov_type, cluster),
+        annihilator=_annihilator("two_way", cov_type, cluster, x_panel),
+        absorbed=_absorbed_effects("two_way", cov_type, x_panel),
     )
 
-    # Generate estimated y values
-    y_est = x_panel_data @ beta_est
+    if full:
+        return beta_est, var_fixed
 
-    # Extract errors
-    e_est_sq = ((y_est - y_it) ** 2).iloc[:, 0]
+    # Extract the first value of the covariance matrix
+    beta1_sd = math.sqrt(var_fixed[1, 1])
+    return beta_est[1], beta1_sd
 
-    # Using theory obtain the covariance matrix
-    var_fixed = (
-        np.linalg.inv(x_panel_t.T @ x_panel_t)
-        @ (x_panel_t.T @ np.diag(e_est_sq) @ x_panel_t)
-        @ np.linalg.inv(x_panel_t.T @ x_panel_t)
-    )
 
-    # Extract the first value of the covariance matrix
-    beta1_sd = math.sqrt(var_fixed.iloc[1, 1])
-    return beta_est.loc[1, 0], beta1_sd
+def _est_batch(
+    y,
+    x_panel,
+    cov_type="HC0",
+    cluster="obs",
+    full=False,
+    bootstrap=None,
+    random_effects=False,
+    unit_trends=False,
+):
+    """A function that applies the three estimators to a balanced panel.
+
+    The regressors and the outcome are transformed together, once for every
+    estimator, and the normal equations of all estimators are solved in one
+    batched call. The within cross-products are accumulated from the transformed
+    panel instead of being derived from the pooled ones, which would cancel with
+    large unit or time levels. Leading dimensions are treated as a batch of
+    replications. The random-effects estimator quasi-demeans the panel with the
+    variance components of the one-way and the between regression.
+
+    Args:
+        y(array): outcomes of shape (..., t_per * n_obs)
+        x_panel(array): panel data of shape (..., t_per, n_obs, n_params)
+        cov_type (str): type of the robust covariance matrix
+        cluster (str or list): cluster dimensions if cov_type is "cluster"
+        full (bool): return all parameters and their covariance matrices
+        bootstrap (dict): the seed sequence "seed", number of draws "n_boot",
+            type of "weights" and the "null" value of beta_1 of the wild
+            bootstrap, no bootstrap if None. Every estimator draws its weights
+            from a child of the seed keyed by its position in ESTIMATOR_KEYS
+        random_effects (bool): add the random-effects estimator "RE"
+        unit_trends (bool): add the estimator "unit_trend" with unit fixed
+            effects and unit-specific linear trends
+
+    Returns:
+        A dictionary with the estimated beta_1 and its standard deviation for
+        every estimator and replication, or with the (..., n_params) estimated
+        parameters and their (..., n_params, n_params) covariance matrices if
+        full is True. With bootstrap, the upper and lower bounds of the bootstrap
+        confidence interval and the bootstrap p-value follow. The random-effects
+        estimator ends with the Hausman statistic against the one-way estimator
+        and its p-value.
+
+    """
+    *batch, t_per, n_obs, n_params = x_panel.shape
+    xy = np.concatenate([x_panel, y.reshape(*batch, t_per, n_obs, 1)], axis=-1)
+    xy_long = xy.reshape(*batch, t_per * n_obs, n_params + 1)
+
+    names, transforms = list(ESTIMATORS), [None, _within_one_way, _within_two_way]
+    if unit_trends:
+        names.append("unit_trend")
+        transforms.append(_within_unit_trend)
+    with _stage("transform"):
+        xy_t = [xy if transform is None else transform(xy) for transform in transforms]
+        cross = np.stack(
+            [_cross_products(data.reshape(xy_long.shape)) for data in xy_t],
+            axis=-3,
+        )
+    with _stage("solve"):
+        beta_est, bread = _solve_normal(cross)
+
+    if random_effects:
+        with _stage("solve"):
+            unit_mean = xy.mean(axis=-3, dtype=np.float64)
+            cross_re, theta, sigma_e = _random_effects_cross(
+                cross[..., 1, :, :],
+                unit_mean,
+                beta_est[..., 1, :],
+                t_per,
+            )
+            beta_re, bread_re = _solve_normal(cross_re)
+            beta_est = np.concatenate([beta_est, beta_re[..., None, :]], axis=-2)
+            bread = np.concatenate([bread, bread_re[..., None, :, :]], axis=-3)
+        with _stage("transform"):
+            xy_t.append(_quasi_demean(xy, theta))
+        names.append("RE")
+
+    labels = _panel_labels(n_obs, t_per)
+    clusters = _cluster_labels(labels, cov_type, cluster)
+    estimates = {}
+    for index, name in enumerate(names):
+        x_t, y_t = xy_t[index][..., :-1], xy_t[index][..., -1]
+        with _stage("covariance"):
+            # The residuals of the transformed data do not contain the fixed
+            # effects, or the share of the unit means that RE removes
+            beta_t = beta_est[..., index, :, None].astype(xy.dtype, copy=False)
+            resid = (
+                y_t.reshape(*batch, -1)
+                - (x_t.reshape(*batch, t_per * n_obs, n_params) @ beta_t)[..., 0]
+            )
+            absorbed = _absorbed_effects(name, cov_type, labels)
+            var = _sandwich(
+                x_t.reshape(*batch, t_per * n_obs, n_params),
+                resid,
+                bread[..., index, :, :],
+                cov_type,
+                clusters,
+                _annihilator(name, cov_type, cluster, labels),
+                absorbed,
+            )
+        if full:
+            estimates[name] = (beta_est[..., index, :], var)
+        else:
+            estimates[name] = (beta_est[..., index, 1], np.sqrt(var[..., 1, 1]))
+        if bootstrap is not None:
+            with _stage("bootstrap"):
+                estimates[name] += _bootstrap(
+                    x_t,
+                    resid,
+                    bread[..., index, :, :],
+                    beta_est[..., index, 1],
+                    cov_type,
+                    clusters,
+                    absorbed,
+                    bootstrap,
+                    ESTIMATOR_KEYS.index(name),
+                )
+    if random_effects:
+        estimates["RE"] += _hausman(
+            beta_est[..., 1, :],
+            beta_re,
+            bread[..., 1, :, :],
+            bread_re,
+            sigma_e,
+        )
+    return estimates
+
+
+def _bootstrap(x_t, resid, bread, beta, cov_type, clusters, absorbed, bootstrap, key):
+    """A function that applies the wild bootstrap to one estimator of a balanced
+    panel.
+
+    Args:
+        x_t(array): transformed panel data of shape (..., t_per, n_obs, n_params)
+        resid(array): residuals of the transformed data of shape
+            (..., t_per * n_obs)
+        bread (array): the inverse of X'X of shape (..., n_params, n_params)
+        beta (array): the estimated beta_1
+        cov_type (str): type of the robust covariance matrix
+        clusters (list): the cluster labels, the bootstrap draws per observation
+            if None
+        absorbed (tuple): the leverage and the number of the fixed effects, see
+            _absorbed_effects
+        bootstrap (dict): the seed sequence "seed" and the remaining arguments of
+            _wild_bootstrap
+        key (int): key of the child of the seed that draws the weights
+
+    Returns:
+        The upper and lower bounds of the bootstrap confidence interval and the
+        bootstrap p-value.
+
+    """
+    *batch, t_per, n_obs, n_params = x_t.shape
+    bootstrap = dict(bootstrap)
+    rng = np.random.default_rng(_child_seed(bootstrap.pop("seed"), key))
+    return _wild_bootstrap(
+        x_t.reshape(*batch, t_per * n_obs, n_params),
+        resid,
+        bread,
+        beta,
+        cov_type=cov_type,
+        codes=None if clusters is None else _group_codes(clusters[0]),
+        absorbed=absorbed,
+        rng=rng,
+        **bootstrap,
+    )
 
 
 def _CI(beta, sd):
@@ -360,6 +816,482 @@ def _CI(beta, sd):
     return CI_upper, CI_lower
 
 
+def _estimate(
+    y_it,
+    x_panel,
+    keep,
+    cov_type="HC0",
+    cluster="obs",
+    full=False,
+    bootstrap=None,
+    random_effects=False,
+    unit_trends=False,
+):
+    """A function that applies the three estimators to one simulated outcome.
+
+    Args:
+        y_it(array): outcomes of shape (..., t_per * n_obs)
+        x_panel(array): panel data of shape (..., t_per, n_obs, n_params)
+        keep (array): the unit-period cells that are observed, all if None
+        cov_type (str): type of the robust covariance matrix
+        cluster (str or list): cluster dimensions if cov_type is "cluster"
+        full (bool): return all parameters and their covariance matrices
+        bootstrap (dict): the arguments of the wild bootstrap, see _est_batch,
+            only for balanced panels
+        random_effects (bool): add the random-effects estimator, only for
+            balanced panels
+        unit_trends (bool): add the unit-trend estimator, only for balanced
+            panels
+
+    Returns:
+        A dictionary with arrays of the estimated beta_1 and its standard deviation
+        for every estimator, or with the (n_batch, n_params) estimated parameters
+        and their (n_batch, n_params, n_params) covariance matrices if full is
+        True, followed by the results of the bootstrap and the Hausman test.
+
+    """
+    n_params = x_panel.shape[-1]
+    if keep is None:
+        estimates = _est_batch(
+            y_it,
+            x_panel,
+            cov_type,
+            cluster,
+            full,
+            bootstrap,
+            random_effects,
+            unit_trends,
+        )
+    else:
+        estimates = _est_unbalanced(y_it, x_panel, keep, cov_type, cluster, full)
+    if full:
+        return {
+            name: (
+                beta.reshape(-1, n_params),
+                var.reshape(-1, n_params, n_params),
+                *(np.atleast_1d(value) for value in extra),
+            )
+            for name, (beta, var, *extra) in estimates.items()
+        }
+    return {name: np.atleast_1d(*est) for name, est in estimates.items()}
+
+
+def _est_unbalanced(y_it, x_panel, keep, cov_type="HC0", cluster="obs", full=False):
+    """A function that applies the three estimators to the observed cells of one
+    replication.
+
+    Args:
+        y_it(array): outcomes of shape (t_per * n_obs,)
+        x_panel(array): panel data of shape (t_per, n_obs, n_params)
+        keep (array): the unit-period cells that are observed
+        cov_type (str): type of the robust covariance matrix
+        cluster (str or list): cluster dimensions if cov_type is "cluster"
+        full (bool): return all parameters and their covariance matrices
+
+    Returns:
+        A dictionary with the result of _est_OLS, _est_one_way and _est_two_way.
+
+    """
+    t_per, n_obs, n_params = x_panel.shape
+    x_panel = _panel_frame(x_panel)[keep].reset_index(drop=True)
+    y_it = pd.DataFrame(y_it[keep])
+    return {
+        "OLS": _est_OLS(y_it, x_panel, n_params, cov_type, cluster, full),
+        "one_way": _est_one_way(
+            y_it,
+            x_panel,
+            n_obs,
+            t_per,
+            n_params,
+            cov_type,
+            cluster,
+            full,
+        ),
+        "two_way": _est_two_way(
+            y_it,
+            x_panel,
+            n_obs,
+            t_per,
+            n_params,
+            cov_type,
+            cluster,
+            full,
+        ),
+    }
+
+
+def _simulate(
+    rng,
+    mean,
+    cov,
+    n_obs,
+    t_per,
+    true_params,
+    scenarios,
+    cov_type="HC0",
+    cluster="obs",
+    p_drop=0,
+    n_batch=None,
+    dtype=np.float64,
+    full=False,
+    bootstrap=None,
+    boot_seed=None,
+    random_effects=False,
+    unit_trends=False,
+):
+    """A function that simulates the model and applies the three estimators.
+
+    The base draws of the covariates and the error terms are generated once and
+    shared by all scenarios (common random numbers), which only differ in the
+    linear combination of the draws set by c_unit, c_time, c_trend and c_var.
+
+    Args:
+        rng (obj): random generator
+        mean (array): the mean of X values
+        cov (array): the covariance matrix
+        n_obs (int): number of observations.
+        t_per(int): the number of periods
+        true_params (array): The real value of parameters
+        scenarios (list): dictionaries with c_unit, c_time, c_trend and c_var of
+            every scenario
+        cov_type (str): type of the robust covariance matrix
+        cluster (str or list): cluster dimensions if cov_type is "cluster"
+        p_drop (float): probability that a unit-period cell is dropped, only for
+            unstacked replications
+        n_batch (int): number of replications that are simulated as one stacked
+            array, a single replication is simulated if None
+        dtype (type): floating point type of the simulated data
+        full (bool): keep all parameters and their covariance matrices
+        bootstrap (dict): number of draws "n_boot" and type of "weights" of the
+            wild bootstrap, no bootstrap if None
+        boot_seed (obj): seed sequence of the bootstrap weights of the chunk, every
+            scenario draws from a child keyed by its parameters, so its weights do
+            not depend on the other scenarios
+        random_effects (bool): add the random-effects estimator
+        unit_trends (bool): add the unit-trend estimator
+
+    Returns:
+        A list with a dictionary of arrays of the estimated beta_1 and its standard
+        deviation, or of all parameters and their covariance matrices if full is
+        True, for every estimator, one for every scenario.
+
+    """
+    n_params = len(true_params)
+    batch = () if n_batch is None else (n_batch,)
+
+    # Generate the base draws of the X values
+    with _stage("data"):
+        x_initial = _mvn(rng, mean, cov, (*batch, n_obs), dtype)
+        x_time = _mvn(rng, mean, cov, (*batch, t_per), dtype)
+        x_shocks = _mvn(rng, mean, cov, (*batch, t_per, n_obs), dtype)
+        draws = _error_draws(rng, batch, n_obs, t_per, dtype)
+        keep = None if p_drop == 0 else rng.uniform(size=n_obs * t_per) >= p_drop
+        # The trends are linear in c_trend, so their slopes are shared as well
+        trend = _time_trend(n_obs, rng, t_per, 1.0, batch)
+    if bootstrap is not None:
+        bootstrap = {**bootstrap, "null": true_params[1]}
+
+    results = []
+    x_panels = {}
+    for scenario in scenarios:
+        with _stage("outcome"):
+            c_var = scenario["c_var"]
+            if c_var not in x_panels:
+                x_panels[c_var] = _combine_xpanel(x_initial, x_time, x_shocks, c_var)
+            x_panel = x_panels[c_var]
+            tw_i = scenario["c_trend"] * trend
+            y_it = _outcome(
+                x_panel,
+                x_initial,
+                x_time,
+                draws,
+                n_obs,
+                t_per,
+                scenario["c_unit"],
+                scenario["c_time"],
+                n_params,
+                true_params,
+                tw_i,
+            )
+        if bootstrap is not None:
+            seed = _child_seed(boot_seed, *_scenario_key(scenario))
+            bootstrap = {**bootstrap, "seed": seed}
+        results.append(
+            _estimate(
+                y_it,
+                x_panel,
+                keep,
+                cov_type,
+                cluster,
+                full,
+                bootstrap,
+                random_effects,
+                unit_trends,
+            ),
+        )
+    return results
+
+
+def _simulate_chunk(seed_seq, n_batch, params, stream=False, profile=False):
+    """A function that simulates one chunk of replications from its own seed stream.
+
+    Args:
+        seed_seq (obj): seed sequence of the chunk
+        n_batch (int): number of stacked replications, a single replication if None
+        params (dict): the remaining arguments of _simulate
+        stream (bool): return the summary accumulators instead of the estimates
+        profile (bool): collect the statistics of the stages of the simulation
+
+    Returns:
+        A list with a dictionary of arrays of the estimated beta_1 and its standard
+        deviation for every estimator, or with their accumulators if stream is True,
+        one for every scenario, and the statistics of the stages or None.
+
+    """
+    with _profiling(profile) as stages:
+        rng = np.random.default_rng(seed_seq)
+        # The bootstrap weights come from a child stream, so the draws of the
+        # model do not depend on the bootstrap
+        boot_seed = _child_seed(seed_seq, 0)
+        estimates = _simulate(rng, n_batch=n_batch, boot_seed=boot_seed, **params)
+        if stream:
+            with _stage("summary"):
+                estimates = [
+                    _update_accumulators(
+                        {},
+                        {name: values[:2] for name, values in scenario.items()},
+                        params["true_params"][1],
+                    )
+                    for scenario in estimates
+                ]
+    return estimates, stages
+
+
+def _simulate_chunks(seeds, sizes, params, stream=False, profile=False):
+    """A function that simulates a group of chunks in one worker call.
+
+    Args:
+        seeds (list): seed sequence of every chunk
+        sizes (list): size of every chunk
+        params (dict): the remaining arguments of _simulate
+        stream (bool): return the summary accumulators instead of the estimates
+        profile (bool): collect the statistics of the stages of the simulation
+
+    Returns:
+        A list with the results of every chunk.
+
+    """
+    return [
+        _simulate_chunk(seed_seq, n_batch, params, stream, profile)
+        for seed_seq, n_batch in zip(seeds, sizes, strict=True)
+    ]
+
+
+def _chunk_sizes(n_sim, batch_size):
+    """A function that splits the replications into chunks.
+
+    Args:
+        n_sim (int): number of simulations
+        batch_size (int): number of replications per chunk, every replication is
+            its own unstacked chunk if None
+
+    Returns:
+        A list with the size of every chunk.
+
+    """
+    if batch_size is None:
+        return [None] * n_sim
+    return [min(batch_size, n_sim - start) for start in range(0, n_sim, batch_size)]
+
+
+def _chunk_seeds(seed, start, stop):
+    """A function that creates the seed sequences of a range of chunks.
+
+    The seed sequences are the same as the children of
+    np.random.SeedSequence(seed).spawn(stop)[start:stop], but they are created
+    lazily.
+
+    Args:
+        seed(int): seed for drawing random numbers.
+        start (int): index of the first chunk
+        stop (int): index after the last chunk
+
+    Returns:
+        A generator of seed sequences.
+
+    """
+    return (
+        np.random.SeedSequence(seed, spawn_key=(index,)) for index in range(start, stop)
+    )
+
+
+def _child_seed(seed_seq, *key):
+    """A function that derives a child seed sequence from an explicit key.
+
+    Unlike SeedSequence.spawn, the child only depends on the key and not on the
+    number of children spawned before.
+
+    Args:
+        seed_seq (obj): the parent seed sequence
+        *key (int): non-negative integers appended to the spawn key of the parent
+
+    Returns:
+        The child seed sequence.
+
+    """
+    return np.random.SeedSequence(
+        seed_seq.entropy,
+        spawn_key=(*seed_seq.spawn_key, *key),
+        pool_size=seed_seq.pool_size,
+    )
+
+
+def _scenario_key(scenario):
+    """A function that turns the parameters of a scenario into a seed key.
+
+    Args:
+        scenario (dict): the values of SCENARIO_PARAMS
+
+    Returns:
+        A tuple with the bit pattern of every parameter as non-negative integer.
+
+    """
+    values = np.array([scenario[name] for name in SCENARIO_PARAMS], dtype=np.float64)
+    return tuple(values.view(np.uint64).tolist())
+
+
+def _run_chunks(seeds, sizes, params, n_jobs=1, stream=False, profile=False):
+    """A function that simulates the chunks, in parallel if n_jobs is not one.
+
+    Every chunk draws from its own seed stream, so the results do not depend on the
+    number of workers. Results are yielded in the order of the chunks and only a
+    bounded number of chunks is in flight at the same time.
+
+    Args:
+        seeds (iterable): seed sequence of every chunk
+        sizes (list): size of every chunk
+        params (dict): the remaining arguments of _simulate
+        n_jobs (int): number of worker processes, -1 uses all cores
+        stream (bool): yield the summary accumulators instead of the estimates
+        profile (bool): collect the statistics of the stages of the simulation
+
+    Yields:
+        The result of every chunk and the statistics of its stages in the order of
+        the chunks.
+
+    """
+    n_workers = os.cpu_count() if n_jobs == -1 else n_jobs
+    if n_workers == 1 or len(sizes) <= 1:
+        for seed_seq, n_batch in zip(seeds, sizes, strict=True):
+            yield _simulate_chunk(seed_seq, n_batch, params, stream, profile)
+        return
+
+    group = max(1, min(64, len(sizes) // (4 * n_workers)))
+    seeds = iter(seeds)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        try:
+            for start in range(0, len(sizes), group):
+                group_sizes = sizes[start : start + group]
+                group_seeds = [next(seeds) for _ in group_sizes]
+                pending.append(
+                    executor.submit(
+                        _simulate_chunks,
+                        group_seeds,
+                        group_sizes,
+                        params,
+                        stream,
+                        profile,
+                    ),
+                )
+                if len(pending) >= 2 * n_workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            # Cancel the chunks that are not needed anymore, e.g. after early stopping
+            for future in pending:
+                future.cancel()
+
+
+def _first_parameter(estimates):
+    """A function that extracts beta_1 and its standard deviation from the full
+    estimates.
+
+    Args:
+        estimates (dict): the (n_batch, n_params) estimated parameters and their
+            (n_batch, n_params, n_params) covariance matrices for every estimator,
+            followed by the results of the bootstrap and the Hausman test
+
+    Returns:
+        A dictionary with arrays of the estimated beta_1 and its standard deviation
+        for every estimator, followed by the results of the bootstrap and the
+        Hausman test.
+
+    """
+    return {
+        name: (beta[:, 1], np.sqrt(var[:, 1, 1]), *extra)
+        for name, (beta, var, *extra) in estimates.items()
+    }
+
+
+def _coefficient_arrays(coefficients):
+    """A function that stacks the full estimates of all replications.
+
+    Args:
+        coefficients (dict): lists of the arrays of the estimated parameters and
+            their covariance matrices for every estimator
+
+    Returns:
+        A dictionary with the "beta" array of shape (n_sim, n_estimators, n_params)
+        and the "cov" array of shape (n_sim, n_estimators, n_params, n_params), the
+        estimators in the order of ESTIMATORS, followed by "unit_trend" and "RE" if
+        included.
+
+    """
+    return {
+        key: np.stack(
+            [np.concatenate(columns[index]) for columns in coefficients.values()],
+            axis=1,
+        )
+        for index, key in enumerate(("beta", "cov"))
+    }
+
+
+def _results_table(estimates, true_params):
+    """A function that collects the estimates of all replications in a dataframe.
+
+    Args:
+        estimates (dict): lists of the beta_1 and standard deviation arrays for
+            every estimator, followed by the lists of the bounds of the bootstrap
+            confidence interval and of the bootstrap p-values if bootstrapped, and
+            of the Hausman statistics and p-values for "RE"
+        true_params (array): The real value of parameters
+
+    Returns:
+        A dataframe that contains estimates for beta_1
+
+    """
+    dict = {}
+    for name, columns in estimates.items():
+        beta, sd, *extra = map(np.concatenate, columns)
+        CI_upper, CI_lower = _CI(beta=beta, sd=sd)
+        dict[f"beta_{name}"] = beta
+        dict[f"beta_sd_{name}"] = sd
+        dict[f"rmse_{name}"] = (beta - true_params[1]) ** 2
+        dict[f"CI_upper_{name}"] = CI_upper
+        dict[f"CI_lower_{name}"] = CI_lower
+        hausman = extra[-2:] if name == "RE" else []
+        if len(extra) > len(hausman):
+            boot_upper, boot_lower, p_value = extra[:3]
+            dict[f"CI_upper_boot_{name}"] = boot_upper
+            dict[f"CI_lower_boot_{name}"] = boot_lower
+            dict[f"p_boot_{name}"] = p_value
+        if hausman:
+            dict["hausman"], dict["p_hausman"] = hausman
+    return pd.DataFrame(dict)
+
+
 def compare_est(
     n_sim=500,
     n_obs=200,
@@ -370,9 +1302,29 @@ def compare_est(
     c_time=0.4,
     c_trend=0.3,
     c_var=0.15,
+    cov_type="HC0",
+    cluster="obs",
+    batch_size=None,
+    n_jobs=1,
+    p_drop=0,
+    stream=False,
+    precision=None,
+    scenarios=None,
+    chunks=None,
+    profile=False,
+    dtype="float64",
+    full=False,
+    n_boot=0,
+    boot_weights="rademacher",
+    random_effects=False,
+    unit_trends=False,
 ):
     """A function to compare three different estimators given different parameters.
 
+    Every chunk of replications (a single replication, or batch_size of them) draws
+    from its own child of np.random.SeedSequence(seed), so the result is the same
+    for any number of workers.
+
     Args:
         n_sim (int): number of simulations
         n_obs (int): number of observations.
@@ -383,120 +1335,211 @@ def compare_est(
         c_time(int): constant for time endogeneity
         c_trend(int): trend constant
         c_var(int): variation factor over time
+        cov_type (str): type of the robust covariance matrix, "HC0", "HC1",
+            "HC2", "HC3", "cluster" or "jackknife". The jackknife leaves out one
+            cluster at a time, by default one unit
+        cluster (str or list): "obs", "time" or ["obs", "time"] for two-way
+            clustering, only used if cov_type is "cluster" or "jackknife"
+        batch_size (int): if given, replications are simulated and estimated in
+            stacked arrays of batch_size replications instead of one at a time
+        n_jobs (int): number of worker processes, -1 uses all cores
+        p_drop (float): probability that a unit-period cell is randomly dropped,
+            which makes the panel unbalanced, not available with batch_size
+        stream (bool): if True, the replications are not stored but summarized
+            with running statistics, so memory does not grow with n_sim
+        precision (dict): targets for the Monte Carlo standard error of "bias"
+            and/or "coverage", e.g. {"bias": 0.01}. If given, n_sim is the maximum
+            number of replications and every scenario stops after the first
+            chunk at which all of its estimators meet the targets, so its
+            results contain the replications it needed
+        scenarios (list): dictionaries that override c_unit, c_time, c_trend
+            and/or c_var. If given, the base draws of every replication are
+            generated once and shared by all scenarios (common random numbers) and
+            one result is returned per scenario
+        chunks (tuple): if given, only the chunks with indices in [start, stop) of
+            the full run of n_sim replications are simulated
+        profile (bool): if True, the wall time, number of calls and allocated
+            bytes of every stage of the simulation are collected
+        dtype (str): "float64", or "float32" to simulate and transform the data in
+            single precision, which halves the memory traffic. Cross-products,
+            the solve and the covariance meats still accumulate in float64, so on
+            the same data the estimates agree with float64 to a relative
+            tolerance of about 1e-4
+        full (bool): if True, all estimated parameters and their covariance
+            matrices are kept as well, not available with stream
+        n_boot (int): if positive, the number of draws of a wild bootstrap, or of
+            a wild cluster bootstrap if cov_type is "cluster" with one cluster
+            dimension. The symmetric bootstrap-t confidence intervals and the
+            p-values of the true beta_1 are added as the CI_upper_boot_*,
+            CI_lower_boot_* and p_boot_* columns. Only for balanced panels and
+            not with stream
+        boot_weights (str): the weights of the bootstrap, "rademacher" or "webb"
+        random_effects (bool): if True, the Swamy-Arora random-effects estimator is
+            added as "RE", with the Hausman statistic against the one-way estimator
+            and its p-value in the hausman and p_hausman columns. Only for
+            balanced panels and not with the jackknife
+        unit_trends (bool): if True, the estimator "unit_trend" with unit fixed
+            effects and unit-specific linear trends is added, which removes the
+            trends set by c_trend. Only for balanced panels with at least three
+            periods, four with the jackknife over periods
 
     Returns:
-        A dataframe that contains estimates for beta_1
+        A dataframe that contains estimates for beta_1, or the summary table with
+        one row per estimator if stream is True. If full is True, a tuple of the
+        dataframe and a dictionary with the "beta" array of shape (n_sim,
+        n_estimators, n_params) and the "cov" array of shape (n_sim, n_estimators,
+        n_params, n_params), the estimators in the order of ESTIMATORS, followed by
+        "unit_trend" and "RE" if included. A list of them, one for every
+        scenario, if scenarios is given. If profile is True, the profile table with
+        one row per stage is returned alongside.
 
     """
+    if p_drop > 0 and batch_size is not None:
+        msg = "Unbalanced panels (p_drop > 0) are not available with batch_size."
+        raise ValueError(msg)
+    if full and stream:
+        msg = "The full estimates are not available with stream."
+        raise ValueError(msg)
+    if n_boot > 0 and (stream or p_drop > 0 or cov_type == "jackknife"):
+        msg = (
+            "The bootstrap is only available for stored, balanced replications "
+            "with a sandwich covariance matrix."
+        )
+        raise ValueError(msg)
+    if n_boot > 0 and cov_type == "cluster" and not isinstance(cluster, str):
+        if len(cluster) > 1:
+            msg = "The wild cluster bootstrap supports one cluster dimension."
+            raise ValueError(msg)
+    if random_effects and (p_drop > 0 or cov_type == "jackknife"):
+        msg = (
+            "The random-effects estimator is only available for balanced panels "
+            "with a sandwich covariance matrix."
+        )
+        raise ValueError(msg)
+    if unit_trends and (p_drop > 0 or t_per < 3):
+        msg = (
+            "The unit-trend estimator is only available for balanced panels with "
+            "at least three periods."
+        )
+        raise ValueError(msg)
+    left_out = cluster if isinstance(cluster, str) else cluster[0]
+    if unit_trends and cov_type == "jackknife" and left_out == "time" and t_per < 4:
+        msg = (
+            "The jackknife over periods of the unit-trend estimator requires at "
+            "least four periods."
+        )
+        raise ValueError(msg)
+    if boot_weights not in BOOT_WEIGHTS:
+        msg = f"boot_weights must be one of {BOOT_WEIGHTS}, got {boot_weights!r}."
+        raise ValueError(msg)
+    if dtype not in DTYPES:
+        msg = f"dtype must be one of {DTYPES}, got {dtype!r}."
+        raise ValueError(msg)
+    unknown = set(precision or {}) - set(PRECISION_TARGETS)
+    if unknown:
+        msg = f"precision targets must be in {PRECISION_TARGETS}, got {unknown}."
+        raise ValueError(msg)
+
     # Assign mean and covariance matrix to X values
     n_params = len(true_params)
     mean = np.zeros(n_params)
     rng = np.random.default_rng(seed)
     cov = _covariance(rng, n_params)
 
-    beta_OLS = []
-    beta_sd_OLS = []
-    rmse_OLS = []
-
-    beta_one_way = []
-    beta_sd_one_way = []
-    rmse_one_way = []
-
-    beta_two_way = []
-    beta_sd_two_way = []
-    rmse_two_way = []
-
-    for _ in range(n_sim):
-        # Generate initial X values
-        x_initial = _x_init(rng, mean, cov, n_obs)
-        x_time = _x_time(rng, mean, cov, t_per)
-
-        # Generate X values for n observations and for t time
-        x_panel = _xpanel(
-            x_initial,
-            x_time,
-            t_per,
-            rng,
-            mean,
-            cov,
-            n_obs,
-            c_var,
-        ).reset_index()
-        y_it = _error_terms(
-            x_panel,
-            x_initial,
-            x_time,
-            rng,
-            n_obs,
-            t_per,
-            c_unit,
-            c_time,
-            n_params,
-            true_params,
-            c_trend,
-            seed,
-        )
-
-        # Apply OLS estimator
-        beta_est_OLS, sd_OLS = _est_OLS(y_it, x_panel, n_params)
-
-        # Apply one-way fixed effect estimator
-        beta_est_one_way, sd_one_way = _est_one_way(
-            y_it,
-            x_panel,
-            n_obs,
-            t_per,
-            n_params,
-        )
-
-        # Apply two-way fixed effect estimator
-        beta_est_two_way, sd_two_way = _est_two_way(
-            y_it,
-            x_panel,
-            n_obs,
-            t_per,
-            n_params,
-        )
-
-        # Storing \beta_1 OLS info
-        beta_OLS.append(beta_est_OLS)
-        beta_sd_OLS.append(sd_OLS)
-        rmse_OLS.append((beta_est_OLS - true_params[1]) ** 2)
-
-        # Storing beta_1 one-way info
-        beta_one_way.append(beta_est_one_way)
-        beta_sd_one_way.append(sd_one_way)
-        rmse_one_way.append((beta_est_one_way - true_params[1]) ** 2)
-
-        # Storing beta_1 two-way info
-        beta_two_way.append(beta_est_two_way)
-        beta_sd_two_way.append(sd_two_way)
-        rmse_two_way.append((beta_est_two_way - true_params[1]) ** 2)
-
-    CI_upper_OLS, CI_lower_OLS = _CI(beta=beta_OLS, sd=beta_sd_OLS)
-    CI_upper_one_way, CI_lower_one_way = _CI(beta=beta_one_way, sd=beta_sd_one_way)
-    CI_upper_two_way, CI_lower_two_way = _CI(beta=beta_two_way, sd=beta_sd_two_way)
-
-    dict = {
-        "beta_OLS": beta_OLS,
-        "beta_sd_OLS": beta_sd_OLS,
-        "rmse_OLS": rmse_OLS,
-        "CI_upper_OLS": CI_upper_OLS,
-        "CI_lower_OLS": CI_lower_OLS,
-        "beta_one_way": beta_one_way,
-        "beta_sd_one_way": beta_sd_one_way,
-        "rmse_one_way": rmse_one_way,
-        "CI_upper_one_way": CI_upper_one_way,
-        "CI_lower_one_way": CI_lower_one_way,
-        "beta_two_way": beta_two_way,
-        "beta_sd_two_way": beta_sd_two_way,
-        "rmse_two_way": rmse_two_way,
-        "CI_upper_two_way": CI_upper_two_way,
-        "CI_lower_two_way": CI_lower_two_way,
+    defaults = {"c_unit": c_unit, "c_time": c_time, "c_trend": c_trend, "c_var": c_var}
+    unknown = {name for scenario in scenarios or [] for name in scenario}
+    unknown -= set(SCENARIO_PARAMS)
+    if unknown:
+        msg = f"scenarios may only set {SCENARIO_PARAMS}, got {unknown}."
+        raise ValueError(msg)
+    grid = [{**defaults, **scenario} for scenario in (scenarios or [{}])]
+    params = {
+        "mean": mean,
+        "cov": cov,
+        "n_obs": n_obs,
+        "t_per": t_per,
+        "true_params": true_params,
+        "scenarios": grid,
+        "cov_type": cov_type,
+        "cluster": cluster,
+        "p_drop": p_drop,
+        "dtype": np.dtype(dtype),
+        "full": full,
+        "bootstrap": {"n_boot": n_boot, "weights": boot_weights} if n_boot else None,
+        "random_effects": random_effects,
+        "unit_trends": unit_trends,
     }
-    df = pd.DataFrame(dict)
-
-    return df
+    sizes = _chunk_sizes(n_sim, batch_size)
+    start, stop = (0, len(sizes)) if chunks is None else chunks
+    sizes = sizes[start:stop]
+    seeds = _chunk_seeds(seed, start, stop)
+    results = _run_chunks(seeds, sizes, params, n_jobs, stream, profile)
+
+    names = list(ESTIMATORS)
+    if unit_trends:
+        names.append("unit_trend")
+    if random_effects:
+        names.append("RE")
+    accumulators = [dict.fromkeys(names) for _ in grid]
+    n_columns = {name: 5 if n_boot else 2 for name in names}
+    if random_effects:
+        n_columns["RE"] += 2
+    estimates = [
+        {name: tuple([] for _ in range(n_columns[name])) for name in names}
+        for _ in grid
+    ]
+    coefficients = [{name: ([], []) for name in names} for _ in grid]
+    stages = {}
+    # Scenarios that reached the precision targets keep their replications so far
+    done = [False] * len(grid)
+    for result, chunk_stages in results:
+        if profile:
+            stages = _merge_stages(stages, chunk_stages)
+        active = [index for index, finished in enumerate(done) if not finished]
+        if full:
+            for index in active:
+                for name, (beta, var, *_) in result[index].items():
+                    coefficients[index][name][0].append(beta)
+                    coefficients[index][name][1].append(var)
+            result = [_first_parameter(outcome) for outcome in result]
+        if not stream:
+            for index in active:
+                for name, values in result[index].items():
+                    columns = estimates[index][name]
+                    for column, value in zip(columns, values, strict=True):
+                        column.append(value)
+            if precision is None:
+                continue
+            result = {
+                index: _update_accumulators(
+                    {},
+                    {name: values[:2] for name, values in result[index].items()},
+                    true_params[1],
+                )
+                for index in active
+            }
+        for index in active:
+            accumulators[index] = {
+                name: _merge_accumulators(accumulators[index][name], outcome)
+                for name, outcome in result[index].items()
+            }
+            if precision is not None:
+                done[index] = _precision_reached(accumulators[index], precision)
+        if all(done):
+            results.close()
+            break
+
+    if stream:
+        tables = [_summary_table(acc, true_params[1]) for acc in accumulators]
+    else:
+        tables = [_results_table(scenario, true_params) for scenario in estimates]
+    if full:
+        tables = [
+            (table, _coefficient_arrays(scenario))
+            for table, scenario in zip(tables, coefficients, strict=True)
+        ]
+    tables = tables if scenarios is not None else tables[0]
+    return (tables, _profile_table(stages)) if profile else tables
 
 
 # Run the function with default values
@@ -0,0 +1,120 @@
+"""Opt-in timing of the stages of the simulation."""
+
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+STAGES = (
+    "data",
+    "outcome",
+    "transform",
+    "solve",
+    "covariance",
+    "bootstrap",
+    "summary",
+)
+
+# Statistics of the stages, only collected inside _profiling
+_stages = None
+
+
+@contextmanager
+def _profiling(enabled=True):
+    """A context manager that collects the statistics of the stages.
+
+    Memory is traced with tracemalloc while profiling, which is started here if it
+    is not running yet.
+
+    Args:
+        enabled (bool): collect the statistics, the context does nothing if False
+
+    Yields:
+        A dictionary that maps every stage to its wall time in seconds, number of
+        calls and allocated bytes, or None if not enabled.
+
+    """
+    global _stages
+    if not enabled:
+        yield None
+        return
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    _stages = {}
+    try:
+        yield _stages
+    finally:
+        _stages = None
+        if started:
+            tracemalloc.stop()
+
+
+@contextmanager
+def _stage(name):
+    """A context manager that adds the enclosed code to the statistics of a stage.
+
+    Outside of _profiling only one check is done. The allocated bytes are the
+    peak of the traced memory within the stage above the memory at its start.
+
+    Args:
+        name (str): one of STAGES
+
+    """
+    if _stages is None:
+        yield
+        return
+    start_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        allocated = tracemalloc.get_traced_memory()[1] - start_memory
+        stats = _stages.setdefault(name, [0.0, 0, 0])
+        stats[0] += seconds
+        stats[1] += 1
+        stats[2] += allocated
+
+
+def _merge_stages(first, second):
+    """A function that adds the statistics of the stages of two runs.
+
+    Args:
+        first (dict): statistics of the first run
+        second (dict): statistics of the second run, may be None
+
+    Returns:
+        The statistics of both runs.
+
+    """
+    merged = {name: list(stats) for name, stats in first.items()}
+    for name, stats in (second or {}).items():
+        total = merged.setdefault(name, [0.0, 0, 0])
+        for index, value in enumerate(stats):
+            total[index] += value
+    return merged
+
+
+def _profile_table(stages):
+    """A function that builds the profile table.
+
+    Args:
+        stages (dict): statistics of the stages
+
+    Returns:
+        A dataframe with one row per stage that contains the cumulative wall time,
+        its share of the profiled time, the number of calls and the allocated
+        bytes.
+
+    """
+    table = pd.DataFrame.from_dict(
+        {name: stages[name] for name in STAGES if name in stages},
+        orient="index",
+        columns=["seconds", "calls", "allocated_bytes"],
+    )
+    table.insert(1, "share", table["seconds"] / table["seconds"].sum())
+    table.index.name = "stage"
+    return table
@@ -0,0 +1,85 @@
+"""Reading and writing the simulation results in columnar formats."""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+FORMATS = {
+    "parquet": ".parquet",
+    "feather": ".feather",
+    "npy": ".npy",
+    "csv": ".csv",
+}
+
+
+def _results_format(path):
+    """A function that infers the format of a results file from its suffix.
+
+    Args:
+        path (Path): the results file
+
+    Returns:
+        The name of the format.
+
+    """
+    suffix = Path(path).suffix
+    for name, format_suffix in FORMATS.items():
+        if suffix == format_suffix:
+            return name
+    msg = f"Results must be stored as one of {tuple(FORMATS.values())}, got {suffix}."
+    raise ValueError(msg)
+
+
+def write_results(df, path, float32=False):
+    """A function that stores the simulation results.
+
+    Parquet files are compressed with zstd and feather files with lz4, .npy files
+    contain a structured array with one field per column.
+
+    Args:
+        df (dataframe): the results with one row per replication
+        path (Path): the target file, its suffix sets the format
+        float32 (bool): store the floating point columns in single precision
+
+    """
+    if float32:
+        df = df.astype(
+            {name: np.float32 for name in df.select_dtypes("floating").columns},
+        )
+    results_format = _results_format(path)
+    if results_format == "parquet":
+        df.to_parquet(path, index=False, compression="zstd")
+    elif results_format == "feather":
+        df.to_feather(path, compression="lz4")
+    elif results_format == "npy":
+        np.save(path, df.to_records(index=False), allow_pickle=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def read_results(path, columns=None):
+    """A function that loads the simulation results.
+
+    Binary formats are memory-mapped and only the requested columns are read.
+
+    Args:
+        path (Path): the results file, its suffix sets the format
+        columns (list): the columns to load, all columns if None
+
+    Returns:
+        A dataframe with one row per replication.
+
+    """
+    results_format = _results_format(path)
+    if results_format == "parquet":
+        return pd.read_parquet(path, columns=columns, memory_map=True)
+    if results_format == "feather":
+        from pyarrow import feather
+
+        return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+    if results_format == "npy":
+        records = np.load(path, mmap_mode="r")
+        columns = list(records.dtype.names) if columns is None else columns
+        return pd.DataFrame({name: np.asarray(records[name]) for name in columns})
+    return pd.read_csv(path, usecols=columns)
@@ -1,101 +1,53 @@
+import pandas as pd
 import pytask
 
-from epp_final_project.analysis.model import compare_est
+from epp_final_project.analysis.grid import _dgp_groups, _scenarios, run_group
+from epp_final_project.analysis.storage import FORMATS, write_results
 from epp_final_project.config import (
+    BASELINE,
     BLD,
-    c_time_values,
-    c_trend_values,
-    c_unit_values,
-    c_var_values,
+    CACHE_DIR,
+    CACHE_SIZE,
+    FLOAT32,
+    N_JOBS,
+    PROFILE,
+    RESULTS_FORMAT,
+    SCENARIOS,
 )
 
-for c_unit in c_unit_values:
-    kwargs = {
-        "produces": BLD / "python" / "data" / "c_unit" / f"{c_unit}.csv",
-        "group": c_unit,
-    }
-
-    @pytask.mark.task(kwargs=kwargs)
-    def task_monte_carlo(produces, group):
-        """Simulate the underlying model for different c_unit values."""
-        df = compare_est(
-            n_sim=25,
-            n_obs=30,
-            t_per=10,
-            true_params=[1, 5, 3, 3, 3],
-            c_unit=group,
-            c_time=0,
-            seed=42,
-            c_trend=0,
-            c_var=0.25,
-        )
-        df.to_csv(produces, index=False)
-
+SUFFIX = FORMATS[RESULTS_FORMAT]
 
-for c_var in c_var_values:
-    kwargs = {
-        "produces": BLD / "python" / "data" / "c_var" / f"{c_var}.csv",
-        "group": c_var,
+for i, group in enumerate(_dgp_groups(_scenarios(SCENARIOS, BASELINE))):
+    produces = {
+        "results": {
+            key: BLD / "python" / "data" / family / f"{scenario_id}{SUFFIX}"
+            for key, (family, scenario_id) in enumerate(group)
+        },
     }
-
-    @pytask.mark.task(kwargs=kwargs)
-    def task_monte_carlo(produces, group):
-        """Simulate the underlying model for different c_var values."""
-        df = compare_est(
-            n_sim=25,
-            n_obs=30,
-            t_per=10,
-            true_params=[1, 5, 3, 3, 3],
-            c_unit=0.4,
-            c_time=0,
-            seed=42,
-            c_trend=0,
-            c_var=group,
-        )
-        df.to_csv(produces, index=False)
-
-
-for c_trend in c_trend_values:
-    kwargs = {
-        "produces": BLD / "python" / "data" / "c_trend" / f"{c_trend}.csv",
-        "group": c_trend,
-    }
-
-    @pytask.mark.task(kwargs=kwargs)
-    def task_monte_carlo(produces, group):
-        """Simulate the underlying model for different c_trend values."""
-        df = compare_est(
-            n_sim=25,
-            n_obs=30,
-            t_per=10,
-            true_params=[1, 5, 3, 3, 3],
-            c_unit=0.4,
-            c_time=0,
-            seed=42,
-            c_trend=group,
-            c_var=0.25,
-        )
-        df.to_csv(produces, index=False)
-
-
-for c_time in c_time_values:
-    kwargs = {
-        "produces": BLD / "python" / "data" / "c_time" / f"{c_time}.csv",
-        "group": c_time,
-    }
-
-    @pytask.mark.task(kwargs=kwargs)
-    def task_monte_carlo(produces, group):
-        """Simulate the underlying model for different c_time values."""
-        df = compare_est(
-            n_sim=25,
-            n_obs=30,
-            t_per=10,
-            true_params=[1, 5, 3, 3, 3],
-            c_unit=0.4,
-            c_time=group,
-            seed=42,
-            c_trend=0,
-            c_var=0.25,
+    if PROFILE:
+        produces["profile"] = BLD / "python" / "profile" / f"dgp_{i}.csv"
+    if BASELINE.get("precision") is not None:
+        produces["n_sim"] = BLD / "python" / "precision" / f"dgp_{i}.csv"
+    kwargs = {"produces": produces, "scenarios": group}
+
+    @pytask.mark.task(id=f"dgp_{i}", kwargs=kwargs)
+    def task_monte_carlo(produces, scenarios):
+        """Simulate the underlying model for a group of scenarios with shared data."""
+        results = run_group(
+            scenarios,
+            cache_dir=CACHE_DIR,
+            max_bytes=CACHE_SIZE,
+            profile=PROFILE,
+            n_jobs=N_JOBS,
         )
-        df.to_csv(produces, index=False)
+        if PROFILE:
+            results, profile = results
+            profile.to_csv(produces["profile"])
+        paths = produces["results"].values()
+        for path, df in zip(paths, results.values(), strict=True):
+            write_results(df, path, float32=FLOAT32)
+        if "n_sim" in produces:
+            # Number of replications every scenario needed to reach the targets
+            index = pd.MultiIndex.from_tuples(results, names=["family", "scenario"])
+            n_sim = [len(df) for df in results.values()]
+            pd.Series(n_sim, index=index, name="n_sim").to_csv(produces["n_sim"])
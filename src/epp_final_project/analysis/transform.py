@@ -0,0 +1,250 @@
+"""Within transformations for balanced and unbalanced panels."""
+
+import warnings
+
+import numpy as np
+
+from epp_final_project.analysis.covariance import _group_codes, _group_sums
+
+
+def _within_one_way(x, inplace=False):
+    """A function that demeans a balanced panel array within units.
+
+    Args:
+        x(array): panel data of shape (..., t_per, n_obs, n_cols)
+        inplace (bool): overwrite x instead of allocating the result
+
+    Returns:
+        The one-way transformed array of the same shape.
+
+    """
+    unit_mean = x.mean(axis=-3, keepdims=True, dtype=np.float64)
+    unit_mean = unit_mean.astype(x.dtype, copy=False)
+    if inplace:
+        x -= unit_mean
+        return x
+    return x - unit_mean
+
+
+def _within_two_way(x, inplace=False):
+    """A function that demeans a balanced panel array within units and periods.
+
+    Args:
+        x(array): panel data of shape (..., t_per, n_obs, n_cols)
+        inplace (bool): overwrite x instead of allocating the result
+
+    Returns:
+        The two-way transformed array of the same shape.
+
+    """
+    unit_mean = x.mean(axis=-3, keepdims=True, dtype=np.float64)
+    time_mean = x.mean(axis=-2, keepdims=True, dtype=np.float64)
+    grand_mean = unit_mean.mean(axis=-2, keepdims=True)
+    unit_mean, time_mean, grand_mean = (
+        mean.astype(x.dtype, copy=False) for mean in (unit_mean, time_mean, grand_mean)
+    )
+    out = x if inplace else x - unit_mean
+    if inplace:
+        out -= unit_mean
+    out -= time_mean
+    out += grand_mean
+    return out
+
+
+def _centered_periods(t_per):
+    """A function that creates the centered period index of a balanced panel.
+
+    Args:
+        t_per(int): the number of periods
+
+    Returns:
+        The (t_per,) periods minus their mean, which are orthogonal to a constant.
+
+    """
+    return np.arange(t_per) - (t_per - 1) / 2
+
+
+def _within_unit_trend(x, inplace=False):
+    """A function that removes a linear trend within every unit of a balanced panel
+    array.
+
+    The projection on [1, t] is the same for every unit, so the unit means and
+    the slopes of all units and columns follow from one mean and one contraction
+    over the periods.
+
+    Args:
+        x(array): panel data of shape (..., t_per, n_obs, n_cols)
+        inplace (bool): overwrite x instead of allocating the result
+
+    Returns:
+        The detrended array of the same shape.
+
+    """
+    periods = _centered_periods(x.shape[-3])
+    unit_mean = x.mean(axis=-3, keepdims=True, dtype=np.float64)
+    slope = np.tensordot(periods, x, axes=([0], [x.ndim - 3])) / (periods @ periods)
+    fitted = unit_mean + periods[:, None, None] * slope[..., None, :, :]
+    fitted = fitted.astype(x.dtype, copy=False)
+    if inplace:
+        x -= fitted
+        return x
+    return x - fitted
+
+
+def _quasi_demean(x, theta):
+    """A function that subtracts a share theta of the unit means of a balanced panel
+    array, the transformation of the random-effects estimator.
+
+    Args:
+        x(array): panel data of shape (..., t_per, n_obs, n_cols)
+        theta(array): share of the unit means of every replication, shape (...)
+
+    Returns:
+        The quasi-demeaned array of the same shape.
+
+    """
+    unit_mean = x.mean(axis=-3, keepdims=True, dtype=np.float64)
+    unit_mean *= np.asarray(theta)[..., None, None, None]
+    return x - unit_mean.astype(x.dtype, copy=False)
+
+
+def _group_means(x, codes, n_groups):
+    """A function that averages the rows of x within groups by sparse indexing.
+
+    Args:
+        x(array): data of shape (..., n, n_cols)
+        codes (array): group code of every row, shape (n,)
+        n_groups (int): number of groups
+
+    Returns:
+        The (..., n_groups, n_cols) group means.
+
+    """
+    counts = np.bincount(codes, minlength=n_groups)
+    return _group_sums(x, codes, n_groups) / counts[:, None]
+
+
+def _demean_unbalanced_one_way(x, obs):
+    """A function that demeans an unbalanced panel within units.
+
+    Args:
+        x(array): data in long format of shape (..., n, n_cols)
+        obs (array): unit label of every row, shape (n,)
+
+    Returns:
+        The one-way transformed array of the same shape.
+
+    """
+    codes, n_groups = _group_codes(obs)
+    means = _group_means(x, codes, n_groups).astype(x.dtype, copy=False)
+    return x - means[..., codes, :]
+
+
+def _demean_unbalanced_two_way(x, obs, time, tol=1e-10, max_iter=1000):
+    """A function that demeans an unbalanced panel within units and periods.
+
+    The projection on the unit and time dummies is found by alternating between
+    the unit and time demeaning (method of alternating projections) and the
+    iterations are accelerated with the Irons-Tuck extrapolation. Only group means
+    are stored, so the memory stays O(NT) for any number of units and periods.
+
+    Args:
+        x(array): data in long format of shape (..., n, n_cols)
+        obs (array): unit label of every row, shape (n,)
+        time (array): period label of every row, shape (n,)
+        tol (float): convergence tolerance on the largest change relative to the
+            scale of x
+        max_iter (int): maximum number of accelerated iterations
+
+    Returns:
+        The two-way transformed array of the same shape. The iterations run in
+        float64 for any dtype of x.
+
+    """
+    dtype = x.dtype
+    x = x.astype(np.float64, copy=False)
+    unit_codes, n_units = _group_codes(obs)
+    time_codes, n_periods = _group_codes(time)
+
+    def sweep(z):
+        z = z - _group_means(z, unit_codes, n_units)[..., unit_codes, :]
+        return z - _group_means(z, time_codes, n_periods)[..., time_codes, :]
+
+    scale = max(1.0, np.abs(x).max())
+    current = sweep(x)
+    for _ in range(max_iter):
+        g_x = sweep(current)
+        gg_x = sweep(g_x)
+        delta_g = gg_x - g_x
+        delta_sq = delta_g - g_x + current
+        denom = (delta_sq**2).sum(axis=-2, keepdims=True)
+        coef = np.divide(
+            (delta_g * delta_sq).sum(axis=-2, keepdims=True),
+            denom,
+            out=np.zeros_like(denom),
+            where=denom > 0,
+        )
+        update = gg_x - coef * delta_g
+        converged = np.abs(update - current).max() <= tol * scale
+        current = update
+        if converged:
+            return current.astype(dtype, copy=False)
+    warnings.warn(
+        f"Alternating projections did not converge in {max_iter} iterations.",
+        RuntimeWarning,
+        stacklevel=2,
+    )
+    return current.astype(dtype, copy=False)
+
+
+def _transform_one_way(x, n_obs, t_per, obs=None, inplace=False):
+    """A function that makes one way transformation.
+
+    Args:
+        x(array): panel data in long format of shape (..., n, n_cols), ordered by
+            time and then by unit if the panel is balanced
+        n_obs (int): number of observations
+        t_per(int): the number of periods
+        obs (array): unit label of every row, required for unbalanced panels
+        inplace (bool): overwrite x if the panel is balanced
+
+    Returns:
+        one-way transformed array of the same shape.
+
+    """
+    if obs is not None:
+        return _demean_unbalanced_one_way(x, obs)
+    panel = x.reshape(*x.shape[:-2], t_per, n_obs, x.shape[-1])
+    return _within_one_way(panel, inplace).reshape(x.shape)
+
+
+def _transform_two_way(
+    x,
+    n_obs,
+    t_per,
+    obs=None,
+    time=None,
+    inplace=False,
+    tol=1e-10,
+):
+    """A function that makes two way transformation.
+
+    Args:
+        x(array): panel data in long format of shape (..., n, n_cols), ordered by
+            time and then by unit if the panel is balanced
+        n_obs (int): number of observations
+        t_per(int): the number of periods
+        obs (array): unit label of every row, required for unbalanced panels
+        time (array): period label of every row, required for unbalanced panels
+        inplace (bool): overwrite x if the panel is balanced
+        tol (float): convergence tolerance of the alternating projections used for
+            unbalanced panels
+
+    Returns:
+        two-way transformed array of the same shape.
+
+    """
+    if obs is not None:
+        return _demean_unbalanced_two_way(x, obs, time, tol=tol)
+    panel = x.reshape(*x.shape[:-2], t_per, n_obs, x.shape[-1])
+    return _within_two_way(panel, inplace).reshape(x.shape)
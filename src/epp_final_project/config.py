@@ -19,9 +19,56 @@ c_trend_values = (0.03, 0.1, 0.25, 0.5)
 # Assign values for c_time
 c_time_values = (0, 0.015, 0.05, 0.2)
 
-c_values = [c_unit_values, c_var_values, c_trend_values, c_time_values]
+# Arguments of compare_est that are shared by every scenario
+BASELINE = {
+    "n_sim": 25,
+    "n_obs": 30,
+    "t_per": 10,
+    "true_params": (1, 5, 3, 3, 3),
+    "c_unit": 0.4,
+    "c_time": 0,
+    "seed": 42,
+    "c_trend": 0,
+    "c_var": 0.25,
+    # Wild bootstrap draws for the confidence intervals, which are more reliable
+    # than the normal ones with few units. Off by default because every draw
+    # costs about one more estimation, e.g. 999 to enable it
+    "n_boot": 0,
+    # Estimator with unit-specific linear trends, which removes the c_trend
+    # component that biases the other estimators
+    "unit_trends": True,
+    # Targets for the Monte Carlo standard errors, e.g. {"bias": 0.01}. If set,
+    # n_sim is the maximum and every scenario stops once it reaches them, the
+    # results are then not cached
+    "precision": None,
+}
 
-c_names = ["c_unit", "c_var", "c_trend", "c_time"]
+# Grid of every family of scenarios, a family with several parameters is simulated
+# for their full Cartesian product, e.g. {"c_unit": c_unit_values, "n_obs": (30, 100)}
+SCENARIOS = {
+    "c_unit": {"c_unit": c_unit_values},
+    "c_var": {"c_var": c_var_values},
+    "c_trend": {"c_trend": c_trend_values},
+    "c_time": {"c_time": c_time_values},
+}
+
+# Number of worker processes of every simulation
+N_JOBS = 1
+
+# Format of the simulation results ("parquet", "feather", "npy" or "csv") and
+# whether they are stored in single precision
+RESULTS_FORMAT = "parquet"
+FLOAT32 = False
+
+# Whether the simulation tasks write the profile of the stages of the simulation
+PROFILE = False
+
+# Kernel density engine of the figures ("pandas" or "binned")
+KDE_ENGINE = "binned"
+
+# Directory and maximum size in bytes of the cache of simulation results
+CACHE_DIR = BLD / "python" / "cache"
+CACHE_SIZE = 2**30
 
 __all__ = [
     "BLD",
@@ -31,4 +78,13 @@ __all__ = [
     "c_var_values",
     "c_trend_values",
     "c_time_values",
+    "BASELINE",
+    "SCENARIOS",
+    "N_JOBS",
+    "RESULTS_FORMAT",
+    "FLOAT32",
+    "PROFILE",
+    "KDE_ENGINE",
+    "CACHE_DIR",
+    "CACHE_SIZE",
 ]
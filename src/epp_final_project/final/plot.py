@@ -1,4 +1,67 @@
-def plotting_monte_carlo(data, column_list, label_name):
+import matplotlib.pyplot as plt
+import numpy as np
+
+KDE_ENGINES = ("pandas", "binned")
+
+
+def _kde_grid(values, n_grid=1000):
+    """A function that builds the evaluation grid of a density plot.
+
+    The grid spans the range of the values extended by half of it on both sides,
+    like the density plots of pandas.
+
+    Args:
+        values (array): the sample
+        n_grid (int): number of grid points
+
+    Returns:
+        The equally spaced grid.
+
+    """
+    low, high = np.min(values), np.max(values)
+    spread = high - low
+    return np.linspace(low - 0.5 * spread, high + 0.5 * spread, n_grid)
+
+
+def _binned_kde(values, grid):
+    """A function that estimates a Gaussian kernel density on an equally spaced grid.
+
+    The sample is binned linearly onto the grid and convolved with the kernel by
+    FFT, so the cost is O(n + m log m) for n values and m grid points instead of
+    O(n m). The bandwidth follows Scott's rule, the default of
+    scipy.stats.gaussian_kde.
+
+    Args:
+        values (array): the sample
+        grid (array): equally spaced evaluation points
+
+    Returns:
+        The density at every grid point.
+
+    """
+    values = np.asarray(values, dtype=float)
+    n_values, n_grid = len(values), len(grid)
+    bandwidth = values.std(ddof=1) * n_values ** (-1 / 5)
+    delta = grid[1] - grid[0]
+
+    # Split every value between its two neighbouring grid points
+    position = (values - grid[0]) / delta
+    left = np.clip(np.floor(position).astype(int), 0, n_grid - 2)
+    share = np.clip(position - left, 0, 1)
+    counts = np.bincount(left, weights=1 - share, minlength=n_grid)
+    counts += np.bincount(left + 1, weights=share, minlength=n_grid)
+
+    # Convolve with the kernel truncated at four bandwidths, zero padded by FFT
+    n_kernel = min(n_grid - 1, int(np.ceil(4 * bandwidth / delta)))
+    offsets = np.arange(-n_kernel, n_kernel + 1) * delta
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    kernel /= bandwidth * np.sqrt(2 * np.pi) * n_values
+    size = 1 << int(np.ceil(np.log2(n_grid + 2 * n_kernel + 1)))
+    density = np.fft.irfft(np.fft.rfft(counts, size) * np.fft.rfft(kernel, size), size)
+    return np.maximum(density[n_kernel : n_kernel + n_grid], 0)
+
+
+def plotting_monte_carlo(data, column_list, label_name, engine="pandas", ax=None):
     """A function to produce density plot from certain columns in a dataframe by also
     assigning labels.
 
@@ -7,13 +70,28 @@ def plotting_monte_carlo(data, column_list, label_name):
         column_list (list): A list that contains the names of the columns
         label_name (list): A list that contains the labels we want to assign
         for the respective columns
+        engine (str): "pandas" evaluates the scipy kernel density at every grid
+            point, "binned" uses the binned FFT approximation, which is much faster
+            for many replications
+        ax (obj): the axes to draw on, a new figure is created if None
 
     Returns:
         A density plot.
 
     """
+    if engine not in KDE_ENGINES:
+        msg = f"engine must be in {KDE_ENGINES}, got {engine}."
+        raise ValueError(msg)
     df = data
-    ax = df[column_list].plot.density(linewidth=2)
+    if engine == "pandas":
+        ax = df[column_list].plot.density(linewidth=2, ax=ax)
+    else:
+        if ax is None:
+            _, ax = plt.subplots()
+        for column in column_list:
+            values = df[column].dropna().to_numpy()
+            grid = _kde_grid(values)
+            ax.plot(grid, _binned_kde(values, grid), linewidth=2, label=column)
     ax.legend(label_name, prop={"size": 10}, title="Estimator", title_fontsize=10)
     ax.set_xlabel("")
     ax.tick_params(axis="both", which="major", labelsize=10)
@@ -0,0 +1,135 @@
+"""Headless rendering of the Monte Carlo figures in worker processes."""
+
+import math
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from epp_final_project.analysis.storage import read_results
+from epp_final_project.final.plot import plotting_monte_carlo
+
+# Label of every estimator in the legend of the figures
+ESTIMATOR_LABELS = {
+    "OLS": "Pooled",
+    "one_way": "one-way",
+    "two_way": "two-way",
+    "unit_trend": "unit trends",
+    "RE": "random effects",
+}
+PANEL_SIZE = (6.4, 4.8)
+
+
+def _peak_memory_mb():
+    """A function that reads the peak resident memory of the current process.
+
+    On Linux the peak is read from /proc, because ru_maxrss keeps the peak of the
+    parent process across fork and exec.
+
+    Returns:
+        The peak memory in MB, NaN on platforms without the resource module.
+
+    """
+    if sys.platform == "win32":
+        return np.nan
+    if sys.platform.startswith("linux"):
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 2**10
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes and macOS bytes
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _agg_figure(n_panels=1):
+    """A function that creates a figure on the Agg canvas outside of pyplot.
+
+    The figure is not registered with pyplot, so it is released as soon as it is
+    not referenced anymore.
+
+    Args:
+        n_panels (int): number of panels, arranged in two columns if more than one
+
+    Returns:
+        The figure and a list with its axes.
+
+    """
+    n_cols = min(n_panels, 2)
+    n_rows = math.ceil(n_panels / n_cols)
+    figure = Figure(figsize=(PANEL_SIZE[0] * n_cols, PANEL_SIZE[1] * n_rows))
+    FigureCanvasAgg(figure)
+    axes = figure.subplots(n_rows, n_cols, squeeze=False).ravel()
+    for ax in axes[n_panels:]:
+        ax.set_axis_off()
+    return figure, list(axes[:n_panels])
+
+
+def _render_family(family):
+    """A function that renders the figures of a family of scenarios in one pass.
+
+    Every results file is read once and drawn both as its own figure and as a
+    panel of the combined figure.
+
+    Args:
+        family (dict): "panels" with the title, results file and figure of every
+            scenario, the "produces" path of the combined figure, the
+            "estimators" that are plotted and the KDE "engine"
+
+    Returns:
+        A dictionary with the build time in seconds and the peak memory in MB of
+        the process that rendered the family.
+
+    """
+    start = time.perf_counter()
+    columns = [f"beta_{name}" for name in family["estimators"]]
+    labels = [ESTIMATOR_LABELS[name] for name in family["estimators"]]
+    combined, panel_axes = _agg_figure(len(family["panels"]))
+    for panel, panel_ax in zip(family["panels"], panel_axes, strict=True):
+        data = read_results(panel["depends_on"], columns=columns)
+        figure, (ax,) = _agg_figure()
+        for axis in (ax, panel_ax):
+            plotting_monte_carlo(data, columns, labels, family["engine"], ax=axis)
+            axis.set_title(panel["title"], fontsize=15)
+        figure.savefig(panel["produces"])
+        figure.clear()
+    combined.tight_layout()
+    combined.savefig(family["produces"])
+    combined.clear()
+    seconds = time.perf_counter() - start
+    return {"seconds": seconds, "peak_memory_mb": _peak_memory_mb()}
+
+
+def render_figures(families, n_jobs=1):
+    """A function that renders the figures of every family, in parallel if n_jobs
+    is not one.
+
+    Every family is rendered in a freshly spawned worker process, so the peak
+    memory of the process is the one of its family and not of the work done
+    before it or in the calling process.
+
+    Args:
+        families (dict): the specification of every family, see _render_family
+        n_jobs (int): number of worker processes, -1 uses all cores
+
+    Returns:
+        A dataframe with the build time and peak memory of every family.
+
+    """
+    n_workers = os.cpu_count() if n_jobs == -1 else n_jobs
+    n_workers = max(1, min(n_workers, len(families)))
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        max_tasks_per_child=1,
+    ) as executor:
+        reports = list(executor.map(_render_family, families.values()))
+    return pd.DataFrame(reports, index=pd.Index(families, name="family"))
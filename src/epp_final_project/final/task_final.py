@@ -1,98 +1,76 @@
-import pandas as pd
 import pytask
 
+from epp_final_project.analysis.grid import _expand_grid, _scenario_id
+from epp_final_project.analysis.model import ESTIMATORS
+from epp_final_project.analysis.storage import FORMATS
 from epp_final_project.config import (
+    BASELINE,
     BLD,
-    c_time_values,
-    c_trend_values,
-    c_unit_values,
-    c_var_values,
+    KDE_ENGINE,
+    N_JOBS,
+    RESULTS_FORMAT,
+    SCENARIOS,
 )
-from epp_final_project.final.plot import plotting_monte_carlo
+from epp_final_project.final.render import render_figures
 
-for c_unit in c_unit_values:
-    kwargs = {
-        "group": c_unit,
-        "depends_on": BLD / "python" / "data" / "c_unit" / f"{c_unit}.csv",
-        "produces": BLD / "python" / "figures" / "c_unit" / f"{c_unit}.png",
-    }
+SUFFIX = FORMATS[RESULTS_FORMAT]
+DATA_DIR = BLD / "python" / "data"
+FIGURE_DIR = BLD / "python" / "figures"
+# The optional estimators are only plotted if the simulation applies them
+PLOTTED = [
+    *ESTIMATORS,
+    *(["unit_trend"] if BASELINE.get("unit_trends") else []),
+    *(["RE"] if BASELINE.get("random_effects") else []),
+]
 
-    @pytask.mark.task(kwargs=kwargs)
-    def task_plot_results(depends_on, group, produces):
-        """Plot the simulation results for different c_unit values."""
-        column_list = ["beta_OLS", "beta_one_way", "beta_two_way"]
-        label_name = ["Pooled", "one-way", "two-way"]
-        data = pd.read_csv(depends_on)
-        ax = plotting_monte_carlo(
-            data=data,
-            column_list=column_list,
-            label_name=label_name,
-        )
-        ax.set_title(rf"$c_{{unit}}=${group}", fontsize=15)
-        ax.figure.savefig(produces)
 
+def _panel_title(point):
+    """A function that writes the title of a panel.
 
-for c_time in c_time_values:
-    kwargs = {
-        "group": c_time,
-        "depends_on": BLD / "python" / "data" / "c_time" / f"{c_time}.csv",
-        "produces": BLD / "python" / "figures" / "c_time" / f"{c_time}.png",
-    }
+    Args:
+        point (dict): the values of the varied parameters
 
-    @pytask.mark.task(kwargs=kwargs)
-    def task_plot_results(depends_on, group, produces):
-        """Plot the simulation results for different c_time values."""
-        column_list = ["beta_OLS", "beta_one_way", "beta_two_way"]
-        label_name = ["Pooled", "one-way", "two-way"]
-        data = pd.read_csv(depends_on)
-        ax = plotting_monte_carlo(
-            data=data,
-            column_list=column_list,
-            label_name=label_name,
-        )
-        ax.set_title(rf"$c_{{time}}=${group}", fontsize=15)
-        ax.figure.savefig(produces)
+    Returns:
+        The parameter values, with the constants in math mode.
 
+    """
+    return ", ".join(
+        rf"$c_{{{name[2:]}}}=${value}" if name.startswith("c_") else f"{name}={value}"
+        for name, value in point.items()
+    )
 
-for c_var in c_var_values:
-    kwargs = {
-        "group": c_var,
-        "depends_on": BLD / "python" / "data" / "c_var" / f"{c_var}.csv",
-        "produces": BLD / "python" / "figures" / "c_var" / f"{c_var}.png",
-    }
 
-    @pytask.mark.task(kwargs=kwargs)
-    def task_plot_results(depends_on, group, produces):
-        """Plot the simulation results for different c_var values."""
-        column_list = ["beta_OLS", "beta_one_way", "beta_two_way"]
-        label_name = ["Pooled", "one-way", "two-way"]
-        data = pd.read_csv(depends_on)
-        ax = plotting_monte_carlo(
-            data=data,
-            column_list=column_list,
-            label_name=label_name,
-        )
-        ax.set_title(rf"$c_{{var}}=${group}", fontsize=15)
-        ax.figure.savefig(produces)
+families = {
+    family: {
+        "panels": [
+            {
+                "title": _panel_title(point),
+                "depends_on": DATA_DIR / family / f"{_scenario_id(point)}{SUFFIX}",
+                "produces": FIGURE_DIR / family / f"{_scenario_id(point)}.png",
+            }
+            for point in _expand_grid(grid)
+        ],
+        "produces": FIGURE_DIR / family / "panels.png",
+        "estimators": PLOTTED,
+        "engine": KDE_ENGINE,
+    }
+    for family, grid in SCENARIOS.items()
+}
+panels = [panel for family in families.values() for panel in family["panels"]]
 
+kwargs = {
+    "families": families,
+    "depends_on": [panel["depends_on"] for panel in panels],
+    "produces": [
+        *(panel["produces"] for panel in panels),
+        *(family["produces"] for family in families.values()),
+        FIGURE_DIR / "render_report.csv",
+    ],
+}
 
-for c_trend in c_trend_values:
-    kwargs = {
-        "group": c_trend,
-        "depends_on": BLD / "python" / "data" / "c_trend" / f"{c_trend}.csv",
-        "produces": BLD / "python" / "figures" / "c_trend" / f"{c_trend}.png",
-    }
 
-    @pytask.mark.task(kwargs=kwargs)
-    def task_plot_results(depends_on, group, produces):
-        """Plot the simulation results for different c_trend values."""
-        column_list = ["beta_OLS", "beta_one_way", "beta_two_way"]
-        label_name = ["Pooled", "one-way", "two-way"]
-        data = pd.read_csv(depends_on)
-        ax = plotting_monte_carlo(
-            data=data,
-            column_list=column_list,
-            label_name=label_name,
-        )
-        ax.set_title(rf"$c_{{trend}}=${group}", fontsize=15)
-        ax.figure.savefig(produces)
+@pytask.mark.task(kwargs=kwargs)
+def task_plot_results(families, depends_on, produces):
+    """Plot the simulation results of every scenario and family in worker processes."""
+    report = render_figures(families, n_jobs=N_JOBS)
+    report.to_csv(produces[-1])
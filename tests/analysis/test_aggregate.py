@@ -0,0 +1,69 @@
+"""Tests for the streaming summary statistics."""
+
+import numpy as np
+import pytest
+
+from src.epp_final_project.analysis.aggregate import (
+    _chunk_accumulator,
+    _merge_accumulators,
+    _precision_reached,
+    _sketch_quantiles,
+    _summary_table,
+)
+
+
+# ===============================================
+# FIXTURES
+# ===============================================
+@pytest.fixture()
+def estimates():
+    rng = np.random.default_rng(925408)
+    return {"beta": rng.normal(5, 0.3, size=5000), "sd": rng.uniform(0.2, 0.4, 5000)}
+
+
+# ================================================
+# TESTS
+# ================================================
+def test_merge_matches_full_sample(estimates):
+    beta, sd = estimates.values()
+    accumulator = None
+    for chunk in np.array_split(np.arange(5000), 37):
+        accumulator = _merge_accumulators(
+            accumulator,
+            _chunk_accumulator(beta[chunk], sd[chunk], 5),
+        )
+    summary = _summary_table({"OLS": accumulator}, 5).loc["OLS"]
+    assert summary["n_sim"] == 5000
+    assert summary["mean"] == pytest.approx(beta.mean())
+    assert summary["var"] == pytest.approx(beta.var(ddof=1))
+    assert summary["rmse"] == pytest.approx(np.sqrt(((beta - 5) ** 2).mean()))
+    assert summary["mean_sd"] == pytest.approx(sd.mean())
+    assert summary["coverage"] == (np.abs(beta - 5) <= 1.96 * sd).mean()
+
+
+def test_sketch_quantiles(estimates):
+    beta, sd = estimates.values()
+    accumulator = None
+    for chunk in np.array_split(np.arange(5000), 500):
+        accumulator = _merge_accumulators(
+            accumulator,
+            _chunk_accumulator(beta[chunk], sd[chunk], 5),
+        )
+    assert len(accumulator["sketch"][0]) <= 256
+    quantiles = (0.05, 0.5, 0.95)
+    assert np.allclose(
+        _sketch_quantiles(accumulator["sketch"], quantiles),
+        np.quantile(beta, quantiles),
+        atol=0.02,
+    )
+
+
+def test_mcse_coverage_all_covered(estimates):
+    beta, _ = estimates.values()
+    accumulator = _chunk_accumulator(beta[:40], np.full(40, 10.0), 5)
+    summary = _summary_table({"OLS": accumulator}, 5).loc["OLS"]
+    assert summary["coverage"] == 1
+    assert summary["mcse_coverage"] > 0
+    assert not _precision_reached({"OLS": accumulator}, {"coverage": 0.01})
+    bound = summary["mcse_coverage"]
+    assert _precision_reached({"OLS": accumulator}, {"coverage": bound * 1.01})
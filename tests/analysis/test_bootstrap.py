@@ -0,0 +1,79 @@
+"""Tests for the wild bootstrap."""
+
+import numpy as np
+import pytest
+
+from src.epp_final_project.analysis.bootstrap import _boot_weights, _wild_bootstrap
+from src.epp_final_project.analysis.covariance import _group_codes, _sandwich
+
+
+# ===============================================
+# FIXTURES
+# ===============================================
+@pytest.fixture()
+def regression():
+    rng = np.random.default_rng(925408)
+    x = rng.normal(size=(120, 3))
+    y = x @ np.ones(3) + rng.normal(size=120)
+    bread = np.linalg.inv(x.T @ x)
+    beta = bread @ x.T @ y
+    return {"x": x, "resid": y - x @ beta, "bread": bread, "beta": beta}
+
+
+def _refit_t_stats(regression, v, cov_type, clusters):
+    x, resid, bread, beta = regression.values()
+    t_stats = []
+    for draw in v.T:
+        y_boot = x @ beta + resid * draw
+        beta_boot = bread @ x.T @ y_boot
+        var = _sandwich(x, y_boot - x @ beta_boot, bread, cov_type, clusters)
+        t_stats.append(abs(beta_boot[1] - beta[1]) / np.sqrt(var[1, 1]))
+    return np.array(t_stats)
+
+
+# ================================================
+# TESTS
+# ================================================
+@pytest.mark.parametrize("weights", ["rademacher", "webb"])
+def test_weights_moments(weights):
+    v = _boot_weights(np.random.default_rng(3), 200_000, weights)
+    assert v.mean() == pytest.approx(0, abs=0.01)
+    assert v.var() == pytest.approx(1, abs=0.01)
+
+
+@pytest.mark.parametrize("cov_type", ["HC0", "HC1", "HC3", "cluster"])
+def test_matches_refitting(regression, cov_type):
+    groups = np.repeat(np.arange(12), 10)
+    codes = _group_codes(groups) if cov_type == "cluster" else None
+    clusters = [groups] if cov_type == "cluster" else None
+    upper, lower, p_value = _wild_bootstrap(
+        regression["x"],
+        regression["resid"],
+        regression["bread"],
+        regression["beta"][1],
+        null=1.0,
+        rng=np.random.default_rng(5),
+        n_boot=50,
+        cov_type=cov_type,
+        codes=codes,
+        weights="webb",
+    )
+
+    n_draws = 120 if codes is None else 12
+    v = _boot_weights(np.random.default_rng(5), (n_draws, 50), "webb")
+    t_boot = _refit_t_stats(
+        regression, v if codes is None else v[codes[0]], cov_type, clusters
+    )
+    var = _sandwich(
+        regression["x"],
+        regression["resid"],
+        regression["bread"],
+        cov_type,
+        clusters,
+    )
+    sd = np.sqrt(var[1, 1])
+    t_stat = abs(regression["beta"][1] - 1.0) / sd
+    critical = np.quantile(t_boot, 0.95)
+    assert p_value == pytest.approx((t_boot >= t_stat).mean())
+    assert upper == pytest.approx(regression["beta"][1] + critical * sd)
+    assert lower == pytest.approx(regression["beta"][1] - critical * sd)
@@ -0,0 +1,83 @@
+"""Tests for the result cache."""
+
+import pytest
+
+from src.epp_final_project.analysis import model
+from src.epp_final_project.analysis.cache import (
+    SOURCE_MODULES,
+    _cache_key,
+    cached_compare_est,
+)
+from src.epp_final_project.analysis.model import compare_est
+
+
+# ===============================================
+# FIXTURES
+# ===============================================
+@pytest.fixture()
+def inputs():
+    return {
+        "n_obs": 8,
+        "t_per": 3,
+        "true_params": [1, 2, 3],
+        "seed": 42,
+        "batch_size": 4,
+    }
+
+
+# ================================================
+# TESTS
+# ================================================
+def test_cache_key_ignores_n_sim(inputs):
+    key = _cache_key({**inputs, "n_sim": 5, "n_jobs": 1})
+    assert key == _cache_key({**inputs, "n_sim": 50, "n_jobs": 2})
+    assert key != _cache_key({**inputs, "n_sim": 5, "seed": 1})
+
+
+def test_source_modules_cover_model():
+    package = "epp_final_project.analysis."
+    imported = {
+        value.__module__.removeprefix(package)
+        for value in vars(model).values()
+        if getattr(value, "__module__", "").startswith(package)
+    }
+    assert "bootstrap" in imported
+    assert {"model", *imported} <= set(SOURCE_MODULES)
+
+
+def test_cache_extends_runs(inputs, tmp_path):
+    first = cached_compare_est(tmp_path, n_sim=6, **inputs)
+    assert first.equals(compare_est(n_sim=6, **inputs))
+    result = cached_compare_est(tmp_path, n_sim=13, **inputs)
+    assert result.equals(compare_est(n_sim=13, **inputs))
+    (entry,) = tmp_path.iterdir()
+    assert sorted(file.name for file in entry.iterdir()) == [
+        "chunks-00000000-00000001.pkl",
+        "chunks-00000001-00000003.pkl",
+        "tail-00000001-2.pkl",
+        "tail-00000003-1.pkl",
+    ]
+    assert cached_compare_est(tmp_path, n_sim=4, **inputs).equals(first.iloc[:4])
+    result = cached_compare_est(tmp_path, n_sim=9, **inputs)
+    assert result.equals(compare_est(n_sim=9, **inputs))
+
+
+def test_cache_scenarios(inputs, tmp_path):
+    cached_compare_est(tmp_path, n_sim=4, **inputs)
+    scenarios = [{}, {"c_var": 0.5}]
+    results = cached_compare_est(tmp_path, n_sim=8, scenarios=scenarios, **inputs)
+    for result, scenario in zip(results, scenarios, strict=True):
+        assert result.equals(compare_est(n_sim=8, **inputs, **scenario))
+
+
+def test_cache_evicts_least_recently_used(inputs, tmp_path):
+    cached_compare_est(tmp_path, n_sim=4, **inputs)
+    (old,) = tmp_path.iterdir()
+    cached_compare_est(tmp_path, max_bytes=0, n_sim=4, **{**inputs, "seed": 1})
+    (entry,) = tmp_path.iterdir()
+    assert entry != old
+
+
+def test_cache_rejects_stream(inputs, tmp_path):
+    with pytest.raises(ValueError, match="Only complete"):
+        cached_compare_est(tmp_path, n_sim=4, stream=True, **inputs)
@@ -0,0 +1,136 @@
+"""Tests for the out-of-core estimation."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.epp_final_project.analysis.chunked import estimate_chunked
+from src.epp_final_project.analysis.model import (
+    _covariance,
+    _error_terms,
+    _est_one_way,
+    _est_OLS,
+    _est_two_way,
+    _panel_frame,
+    _xpanel,
+)
+
+X_COLUMNS = [f"x{i}" for i in range(4)]
+
+
+# ===============================================
+# FIXTURES
+# ===============================================
+@pytest.fixture()
+def panel():
+    rng = np.random.default_rng(925408)
+    mean, cov = np.zeros(4), _covariance(rng, 4)
+    x_initial = rng.multivariate_normal(mean, cov, size=30)
+    x_time = rng.multivariate_normal(mean, cov, size=6)
+    x_panel = _xpanel(x_initial, x_time, 6, rng, mean, cov, 30, 0.3)
+    y = _error_terms(
+        x_panel, x_initial, x_time, rng, 30, 6, 0.4, 0.4, 4, np.ones(4), 0.1
+    )
+    x_long = _panel_frame(x_panel)
+    df = x_long.rename(columns=dict(enumerate(X_COLUMNS))).assign(y=y)
+    return {"x_long": x_long, "y": y, "df": df}
+
+
+def _in_memory(panel, cov_type, cluster, keep=None):
+    x_long, y = panel["x_long"], panel["y"]
+    if keep is not None:
+        x_long, y = x_long[keep].reset_index(drop=True), y[keep]
+    y_long = pd.DataFrame(y)
+    return {
+        "OLS": _est_OLS(y_long, x_long, 4, cov_type, cluster),
+        "one_way": _est_one_way(y_long, x_long, 30, 6, 4, cov_type, cluster),
+        "two_way": _est_two_way(y_long, x_long, 30, 6, 4, cov_type, cluster),
+    }
+
+
+# ================================================
+# TESTS
+# ================================================
+@pytest.mark.parametrize(
+    ("cov_type", "cluster"),
+    [("HC0", "obs"), ("HC1", "obs"), ("HC2", "obs"), ("HC3", "obs")]
+    + [("cluster", "obs")]
+    + [("cluster", ["obs", "time"])],
+)
+def test_matches_in_memory(panel, cov_type, cluster):
+    records = panel["df"].sample(frac=1, random_state=3).to_records(index=False)
+    estimates = estimate_chunked(
+        records,
+        X_COLUMNS,
+        "y",
+        cov_type,
+        cluster,
+        block_rows=37,
+    )
+    for name, (beta, sd) in _in_memory(panel, cov_type, cluster).items():
+        beta_est, var = estimates[name]
+        assert beta_est[1] == pytest.approx(beta)
+        assert np.sqrt(var[1, 1]) == pytest.approx(sd)
+
+
+@pytest.mark.parametrize("suffix", [".npy", ".parquet"])
+def test_files(panel, tmp_path, suffix):
+    path = tmp_path / f"panel{suffix}"
+    if suffix == ".npy":
+        np.save(path, panel["df"].to_records(index=False), allow_pickle=False)
+    else:
+        pytest.importorskip("pyarrow")
+        panel["df"].to_parquet(path)
+    estimates = estimate_chunked(path, X_COLUMNS, "y", block_rows=50)
+    beta, sd = _in_memory(panel, "HC0", "obs")["two_way"]
+    assert estimates["two_way"][0][1] == pytest.approx(beta)
+    assert np.sqrt(estimates["two_way"][1][1, 1]) == pytest.approx(sd)
+
+
+def test_unbalanced_one_way(panel):
+    keep = np.random.default_rng(4).uniform(size=len(panel["y"])) > 0.3
+    records = panel["df"][keep].to_records(index=False)
+    estimates = estimate_chunked(
+        records,
+        X_COLUMNS,
+        "y",
+        estimators=("OLS", "one_way"),
+        block_rows=40,
+    )
+    expected = _in_memory(panel, "HC0", "obs", keep)
+    for name in ("OLS", "one_way"):
+        assert estimates[name][0][1] == pytest.approx(expected[name][0])
+        assert np.sqrt(estimates[name][1][1, 1]) == pytest.approx(expected[name][1])
+    with pytest.raises(ValueError, match="balanced panel"):
+        estimate_chunked(records, X_COLUMNS, "y")
+
+
+def test_large_levels(panel):
+    df = panel["df"].copy()
+    # The within estimators do not depend on unit-specific levels
+    offset = 1e5 + 1e3 * df["obs"].to_numpy()
+    for name in [*X_COLUMNS, "y"]:
+        df[name] = df[name] + offset
+    records = df.sample(frac=1, random_state=3).to_records(index=False)
+    estimates = estimate_chunked(
+        records,
+        X_COLUMNS,
+        "y",
+        estimators=("one_way", "two_way"),
+        block_rows=37,
+    )
+    expected = _in_memory(panel, "HC0", "obs")
+    for name in ("one_way", "two_way"):
+        beta, sd = expected[name]
+        assert estimates[name][0][1] == pytest.approx(beta, rel=1e-9)
+        assert np.sqrt(estimates[name][1][1, 1]) == pytest.approx(sd, rel=1e-9)
+
+
+def test_unsupported_inputs(panel, tmp_path):
+    records = panel["df"].to_records(index=False)
+    with pytest.raises(ValueError, match="cluster must be"):
+        estimate_chunked(records, X_COLUMNS, "y", "cluster", "firm")
+    with pytest.raises(ValueError, match="out of core"):
+        estimate_chunked(records, X_COLUMNS, "y", "jackknife")
+    with pytest.raises(ValueError, match="stored as"):
+        estimate_chunked(tmp_path / "panel.csv", X_COLUMNS, "y")
@@ -0,0 +1,137 @@
+"""Tests for the robust covariance matrices."""
+
+import numpy as np
+import pytest
+
+from src.epp_final_project.analysis.covariance import (
+    _group_sums,
+    _leverage,
+    _sandwich,
+)
+
+
+# ===============================================
+# FIXTURES
+# ===============================================
+@pytest.fixture()
+def inputs_sandwich():
+    rng = np.random.default_rng(925408)
+    x = rng.normal(size=(120, 4))
+    resid = rng.normal(size=120)
+    return {"x": x, "resid": resid, "bread": np.linalg.inv(x.T @ x)}
+
+
+@pytest.fixture()
+def inputs_clusters():
+    obs = np.tile(np.arange(1, 31), 4)
+    time = np.repeat(np.arange(1, 5), 30)
+    return {"obs": obs, "time": time}
+
+
+def _loop_cluster_meat(scores, groups):
+    meat = np.zeros((scores.shape[1], scores.shape[1]))
+    for group in np.unique(groups):
+        score_g = scores[groups == group].sum(axis=0)
+        meat += np.outer(score_g, score_g)
+    n_groups = len(np.unique(groups))
+    n, k = scores.shape
+    return n_groups / (n_groups - 1) * (n - 1) / (n - k) * meat
+
+
+# ================================================
+# TESTS
+# ================================================
+def test_hc0_matches_diagonal(inputs_sandwich):
+    x, resid, bread = inputs_sandwich.values()
+    expected = bread @ (x.T @ np.diag(resid**2) @ x) @ bread
+    assert np.allclose(_sandwich(**inputs_sandwich), expected)
+
+
+def test_hc1_scaling(inputs_sandwich):
+    hc0 = _sandwich(**inputs_sandwich, cov_type="HC0")
+    hc1 = _sandwich(**inputs_sandwich, cov_type="HC1")
+    assert np.allclose(hc1, hc0 * 120 / (120 - 4))
+
+
+def test_hc3_matches_hat_matrix(inputs_sandwich):
+    x, resid, bread = inputs_sandwich.values()
+    hat = np.diag(x @ bread @ x.T)
+    assert np.allclose(_leverage(x, bread), hat)
+    expected = bread @ (x.T @ np.diag((resid / (1 - hat)) ** 2) @ x) @ bread
+    assert np.allclose(_sandwich(**inputs_sandwich, cov_type="HC3"), expected)
+
+
+def test_sandwich_batched(inputs_sandwich):
+    x, resid, bread = inputs_sandwich.values()
+    batched = _sandwich(np.stack([x, x]), np.stack([resid, 2 * resid]), bread)
+    assert np.allclose(batched[1], 4 * _sandwich(x, resid, bread))
+
+
+def test_unknown_cov_type(inputs_sandwich):
+    with pytest.raises(ValueError, match="cov_type"):
+        _sandwich(**inputs_sandwich, cov_type="HC9")
+
+
+def test_group_sums_batched():
+    scores = np.arange(24, dtype=float).reshape(2, 4, 3)
+    codes = np.array([1, 0, 1, 0])
+    sums = _group_sums(scores, codes, 2)
+    assert np.allclose(sums[1, 0], scores[1, [1, 3]].sum(axis=0))
+    assert np.allclose(sums[0, 1], scores[0, [0, 2]].sum(axis=0))
+
+
+@pytest.mark.parametrize("dimension", ["obs", "time"])
+def test_one_way_cluster_matches_loop(inputs_sandwich, inputs_clusters, dimension):
+    x, resid, bread = inputs_sandwich.values()
+    groups = inputs_clusters[dimension]
+    expected = bread @ _loop_cluster_meat(x * resid[:, None], groups) @ bread
+    result = _sandwich(**inputs_sandwich, cov_type="cluster", clusters=[groups])
+    assert np.allclose(result, expected)
+
+
+def test_two_way_cluster_matches_loop(inputs_sandwich, inputs_clusters):
+    x, resid, bread = inputs_sandwich.values()
+    obs, time = inputs_clusters.values()
+    scores = x * resid[:, None]
+    meat = (
+        _loop_cluster_meat(scores, obs)
+        + _loop_cluster_meat(scores, time)
+        - _loop_cluster_meat(scores, obs * 10 + time)
+    )
+    eigval, eigvec = np.linalg.eigh(meat)
+    meat = eigvec @ np.diag(np.clip(eigval, 0, None)) @ eigvec.T
+    result = _sandwich(**inputs_sandwich, cov_type="cluster", clusters=[obs, time])
+    assert np.allclose(result, bread @ meat @ bread)
+
+
+def test_cluster_requires_labels(inputs_sandwich):
+    with pytest.raises(ValueError, match="cluster labels"):
+        _sandwich(**inputs_sandwich, cov_type="cluster")
+
+
+def test_hc2_matches_hat_matrix(inputs_sandwich):
+    x, resid, bread = inputs_sandwich.values()
+    hat = np.diag(x @ bread @ x.T)
+    expected = bread @ (x.T @ np.diag(resid**2 / (1 - hat)) @ x) @ bread
+    assert np.allclose(_sandwich(**inputs_sandwich, cov_type="HC2"), expected)
+
+
+def test_jackknife_matches_refits():
+    rng = np.random.default_rng(7)
+    groups = rng.integers(0, 9, size=90)
+    x = rng.normal(size=(90, 3))
+    y = x @ np.ones(3) + rng.normal(size=90)
+    bread = np.linalg.inv(x.T @ x)
+    beta = bread @ x.T @ y
+    refits = np.array(
+        [
+            np.linalg.lstsq(x[groups != g], y[groups != g], rcond=None)[0]
+            for g in np.unique(groups)
+        ],
+    )
+    centered = refits - refits.mean(axis=0)
+    expected = 8 / 9 * centered.T @ centered
+    result = _sandwich(x, y - x @ beta, bread, "jackknife", [groups])
+    assert np.allclose(result, expected)
+    with pytest.raises(ValueError, match="one cluster dimension"):
+        _sandwich(x, y - x @ beta, bread, "jackknife")
@@ -0,0 +1,49 @@
+"""Tests for the estimation core."""
+
+import numpy as np
+import pytest
+
+from src.epp_final_project.analysis.estimation import (
+    _cross_products,
+    _random_effects_cross,
+    _solve_normal,
+)
+from src.epp_final_project.analysis.transform import _quasi_demean, _within_one_way
+
+
+# ===============================================
+# FIXTURES
+# ===============================================
+@pytest.fixture()
+def xy_panel():
+    rng = np.random.default_rng(925408)
+    xy = rng.normal(size=(2, 6, 15, 4))
+    return xy + rng.normal(size=(2, 1, 15, 4)) + rng.normal(size=(2, 6, 1, 4))
+
+
+# ================================================
+# TESTS
+# ================================================
+def test_random_effects_cross(xy_panel):
+    one_way = _cross_products(_within_one_way(xy_panel).reshape(2, -1, 4))
+    beta_one_way, _ = _solve_normal(one_way, inverse=False)
+    result, theta, _ = _random_effects_cross(
+        one_way,
+        xy_panel.mean(axis=-3),
+        beta_one_way,
+        6,
+    )
+    xy_t = _quasi_demean(xy_panel, theta).reshape(2, -1, 4)
+    assert np.allclose(result, _cross_products(xy_t))
+
+
+def test_solve_normal(xy_panel):
+    xy = xy_panel.reshape(2, -1, 4)
+    beta, bread = _solve_normal(_cross_products(xy))
+    for b in range(2):
+        x, y = xy[b, :, :-1], xy[b, :, -1]
+        assert np.allclose(beta[b], np.linalg.lstsq(x, y, rcond=None)[0])
+        assert np.allclose(bread[b], np.linalg.inv(x.T @ x))
+    beta_only, no_bread = _solve_normal(_cross_products(xy), inverse=False)
+    assert no_bread is None
+    assert np.allclose(beta_only, beta)
@@ -0,0 +1,81 @@
+"""Tests for the scenario grid."""
+
+import pytest
+
+from src.epp_final_project.analysis.grid import (
+    _dgp_groups,
+    _expand_grid,
+    _scenarios,
+    run_group,
+)
+from src.epp_final_project.analysis.model import compare_est
+
+
+# ===============================================
+# FIXTURES
+# ===============================================
+@pytest.fixture()
+def baseline():
+    return {
+        "n_sim": 4,
+        "n_obs": 8,
+        "t_per": 3,
+        "true_params": (1, 2, 3),
+        "c_unit": 0.4,
+        "c_time": 0,
+        "seed": 42,
+        "c_trend": 0,
+        "c_var": 0.25,
+    }
+
+
+# ================================================
+# TESTS
+# ================================================
+def test_expand_grid():
+    points = _expand_grid({"c_unit": (0, 1), "n_obs": (10, 20, 30)})
+    assert len(points) == 6
+    assert points[1] == {"c_unit": 0, "n_obs": 20}
+
+
+def test_scenario_ids(baseline):
+    spec = {"c_unit": {"c_unit": (0, 1)}, "grid": {"c_time": (0,), "t_per": (3, 5)}}
+    scenarios = _scenarios(spec, baseline)
+    assert list(scenarios) == [
+        ("c_unit", "0"),
+        ("c_unit", "1"),
+        ("grid", "c_time=0_t_per=3"),
+        ("grid", "c_time=0_t_per=5"),
+    ]
+    assert scenarios["grid", "c_time=0_t_per=5"]["t_per"] == 5
+
+
+def test_dgp_groups_share_base_draws(baseline):
+    spec = {
+        "c_unit": {"c_unit": (0, 0.4)},
+        "c_trend": {"c_trend": (0, 0.2)},
+        "c_var": {"c_var": (0.1, 0.25)},
+        "n_obs": {"n_obs": (8, 10)},
+    }
+    groups = _dgp_groups(_scenarios(spec, baseline))
+    assert [len(group) for group in groups] == [7, 1]
+
+
+def test_run_group_equals_single_runs(baseline):
+    spec = {"grid": {"c_unit": (0, 0.4), "c_trend": (0, 0.2), "c_var": (0.1, 0.25)}}
+    (group,) = _dgp_groups(_scenarios(spec, baseline))
+    results = run_group(group, batch_size=2)
+    for key, params in group.items():
+        assert results[key].equals(compare_est(**params, batch_size=2))
+
+
+def test_run_group_precision(baseline, tmp_path):
+    baseline = {**baseline, "n_sim": 400, "precision": {"bias": 0.05}}
+    spec = {"c_var": {"c_var": (0.1, 1.0)}}
+    (group,) = _dgp_groups(_scenarios(spec, baseline))
+    results = run_group(group, cache_dir=tmp_path, batch_size=2)
+    assert not any(tmp_path.iterdir())
+    for key, params in group.items():
+        assert results[key].equals(compare_est(**params, batch_size=2))
+    assert sorted(len(result) for result in results.values())[0] < 400
+    assert len({len(result) for result in results.values()}) == 2
@@ -1,9 +1,26 @@
 """Tests for the simulation result."""
 
+import warnings
+
 import numpy as np
+import pandas as pd
 import pytest
 
-from src.epp_final_project.analysis.model import _covariance, _x_init, compare_est
+from src.epp_final_project.analysis.model import (
+    _chunk_seeds,
+    _covariance,
+    _error_terms,
+    _est_batch,
+    _est_one_way,
+    _est_OLS,
+    _est_two_way,
+    _mvn,
+    _panel_frame,
+    _time_trend,
+    _x_init,
+    _xpanel,
+    compare_est,
+)
 
 
 # ===============================================
@@ -97,6 +114,604 @@ def test_x_init(inputs_x_init):
     assert x_init.shape == (50, 6)
 
 
+def test_xpanel_layout(inputs_x_init):
+    x_initial = _x_init(**inputs_x_init)
+    x_time = np.arange(3 * 6, dtype=float).reshape(3, 6)
+    x_panel = _xpanel(
+        x_initial,
+        x_time,
+        t_per=3,
+        rng=np.random.default_rng(1),
+        mean=inputs_x_init["mean"],
+        cov=inputs_x_init["cov"],
+        n_obs=50,
+        c_var=0,
+    )
+    assert x_panel.shape == (3, 50, 6)
+    assert x_panel.flags["C_CONTIGUOUS"]
+    assert np.allclose(x_panel[2], x_initial + x_time[2])
+    x_long = _panel_frame(x_panel)
+    assert np.allclose(x_long.loc[x_long["time"] == 3, 0:5], x_panel[2])
+    assert (x_long.loc[x_long["time"] == 3, "obs"] == np.arange(1, 51)).all()
+
+
+def test_xpanel_shocks_covariance(inputs_x_init):
+    cov = inputs_x_init["cov"]
+    x_panel = _xpanel(
+        np.zeros((2000, 6)),
+        np.zeros((50, 6)),
+        t_per=50,
+        rng=np.random.default_rng(2),
+        mean=inputs_x_init["mean"],
+        cov=cov,
+        n_obs=2000,
+        c_var=1,
+    )
+    assert np.allclose(np.cov(x_panel.reshape(-1, 6).T), cov, atol=0.05)
+
+
+@pytest.mark.parametrize("cov_type", ["HC0", "HC3", "cluster"])
+def test_est_batch_matches_single(inputs_x_init, cov_type):
+    rng = np.random.default_rng(7)
+    mean, cov = inputs_x_init["mean"], inputs_x_init["cov"]
+    x_initial = rng.multivariate_normal(mean, cov, size=(2, 20))
+    x_time = rng.multivariate_normal(mean, cov, size=(2, 5))
+    x_panel = _xpanel(x_initial, x_time, 5, rng, mean, cov, 20, 0.3)
+    y = _error_terms(
+        x_panel, x_initial, x_time, rng, 20, 5, 0.4, 0.4, 6, np.ones(6), 0.1
+    )
+    batch = _est_batch(y, x_panel, cov_type=cov_type)
+    for b in range(2):
+        x_long = _panel_frame(x_panel[b])
+        y_long = pd.DataFrame(y[b])
+        single = {
+            "OLS": _est_OLS(y_long, x_long, 6, cov_type),
+            "one_way": _est_one_way(y_long, x_long, 20, 5, 6, cov_type),
+            "two_way": _est_two_way(y_long, x_long, 20, 5, 6, cov_type),
+        }
+        for name, (beta, sd) in single.items():
+            assert batch[name][0][b] == pytest.approx(beta)
+            assert batch[name][1][b] == pytest.approx(sd)
+
+
+@pytest.mark.parametrize("level", [1e5, 1e6])
+def test_est_batch_large_unit_levels(inputs_x_init, level):
+    rng = np.random.default_rng(7)
+    mean, cov = inputs_x_init["mean"], inputs_x_init["cov"]
+    x_initial = rng.multivariate_normal(mean, cov, size=20)
+    x_time = rng.multivariate_normal(mean, cov, size=5)
+    x_panel = _xpanel(x_initial, x_time, 5, rng, mean, cov, 20, 0.3)
+    y = _error_terms(
+        x_panel, x_initial, x_time, rng, 20, 5, 0.4, 0.4, 6, np.ones(6), 0.1
+    )
+    offsets = level * rng.uniform(1, 2, size=(20, 7))
+    x_shifted = x_panel + offsets[:, :-1]
+    y_shifted = (y.reshape(5, 20) + offsets[:, -1]).reshape(-1)
+    batch = _est_batch(y, x_panel, unit_trends=True)
+    shifted = _est_batch(y_shifted, x_shifted, unit_trends=True)
+    x_long = _panel_frame(x_shifted)
+    single = _est_one_way(pd.DataFrame(y_shifted), x_long, 20, 5, 6)
+    assert shifted["one_way"][0] == pytest.approx(single[0])
+    for name in ("one_way", "two_way", "unit_trend"):
+        assert shifted[name][0] == pytest.approx(batch[name][0])
+        assert shifted[name][1] == pytest.approx(batch[name][1])
+
+
+def test_batch_size_keeps_columns(inputs_cunit):
+    result = compare_est(**inputs_cunit)
+    batched = compare_est(**inputs_cunit, batch_size=16)
+    assert batched.columns.equals(result.columns)
+    assert len(batched) == len(result)
+
+
+@pytest.mark.parametrize("batch_size", [None, 8])
+def test_n_jobs_bit_identical(inputs_cunit, batch_size):
+    inputs_cunit["n_sim"] = 20
+    serial = compare_est(**inputs_cunit, batch_size=batch_size)
+    parallel = compare_est(**inputs_cunit, batch_size=batch_size, n_jobs=2)
+    pd.testing.assert_frame_equal(serial, parallel, check_exact=True)
+
+
+def test_est_two_way_unbalanced_matches_dummies():
+    rng = np.random.default_rng(11)
+    x_long = _panel_frame(rng.normal(size=(6, 25, 3)))
+    x_long = x_long[rng.uniform(size=len(x_long)) > 0.35].reset_index(drop=True)
+    y = x_long[[0, 1, 2]].to_numpy() @ np.array([1.0, 2.0, 3.0]) + rng.normal(
+        size=len(x_long),
+    )
+    dummies = np.column_stack(
+        [
+            pd.get_dummies(x_long["obs"]).to_numpy(dtype=float),
+            pd.get_dummies(x_long["time"]).to_numpy(dtype=float)[:, 1:],
+        ],
+    )
+    design = np.column_stack([x_long[[0, 1, 2]].to_numpy(), dummies])
+    expected = np.linalg.lstsq(design, y, rcond=None)[0][1]
+    beta, _ = _est_two_way(pd.DataFrame(y), x_long, 25, 6, 3)
+    assert beta == pytest.approx(expected)
+
+
+def test_p_drop_unbalanced(inputs_ctime):
+    result = compare_est(**inputs_ctime, p_drop=0.3)
+    assert result["beta_two_way"].mean() == pytest.approx(1, abs=0.2)
+    with pytest.raises(ValueError, match="p_drop"):
+        compare_est(**inputs_ctime, p_drop=0.3, batch_size=10)
+
+
+def test_chunk_seeds_match_spawn():
+    spawned = np.random.SeedSequence(3).spawn(5)
+    lazy = list(_chunk_seeds(3, 2, 5))
+    for child, seed_seq in zip(spawned[2:], lazy, strict=True):
+        assert (child.generate_state(4) == seed_seq.generate_state(4)).all()
+
+
+def test_stream_summary(inputs_cunit):
+    result = compare_est(**inputs_cunit, batch_size=8)
+    summary = compare_est(**inputs_cunit, batch_size=8, stream=True)
+    assert summary.loc["two_way", "n_sim"] == len(result)
+    assert summary.loc["two_way", "mean"] == pytest.approx(
+        result["beta_two_way"].mean(),
+    )
+    covered = (result["CI_lower_OLS"] <= 1) & (result["CI_upper_OLS"] >= 1)
+    assert summary.loc["OLS", "coverage"] == pytest.approx(covered.mean())
+
+
+def test_precision_early_stopping(inputs_cunit):
+    inputs_cunit["n_sim"] = 2000
+    summary = compare_est(
+        **inputs_cunit,
+        batch_size=10,
+        stream=True,
+        precision={"bias": 0.02},
+    )
+    assert (summary["n_sim"] < 2000).all()
+    assert (summary["mcse_bias"] <= 0.02).all()
+    result = compare_est(**inputs_cunit, batch_size=10, precision={"bias": 0.02})
+    assert len(result) == summary.loc["OLS", "n_sim"]
+
+
+def test_precision_per_scenario(inputs_cunit):
+    inputs_cunit["n_sim"] = 2000
+    args = {"batch_size": 10, "precision": {"bias": 0.01}}
+    scenarios = [{"c_var": 0.5}, {"c_var": 1.0}]
+    results = compare_est(**inputs_cunit, **args, scenarios=scenarios)
+    summaries = compare_est(**inputs_cunit, **args, scenarios=scenarios, stream=True)
+    assert len(results[0]) != len(results[1])
+    for result, summary, scenario in zip(results, summaries, scenarios, strict=True):
+        expected = compare_est(**{**inputs_cunit, **scenario}, **args)
+        pd.testing.assert_frame_equal(result, expected, check_exact=True)
+        assert (summary["n_sim"] == len(result)).all()
+
+
+def test_precision_unknown_target(inputs_cunit):
+    with pytest.raises(ValueError, match="precision targets"):
+        compare_est(**inputs_cunit, precision={"variance": 0.1})
+
+
+def test_scenarios_common_random_numbers(inputs_cunit):
+    scenarios = [{"c_var": 0.1}, {"c_var": 0.5, "c_unit": 0}]
+    results = compare_est(**inputs_cunit, batch_size=5, scenarios=scenarios)
+    for result, scenario in zip(results, scenarios, strict=True):
+        expected = compare_est(**{**inputs_cunit, **scenario}, batch_size=5)
+        assert result.equals(expected)
+
+
+def test_scenarios_unknown_parameter(inputs_cunit):
+    with pytest.raises(ValueError, match="scenarios may only set"):
+        compare_est(**inputs_cunit, scenarios=[{"n_obs": 10}])
+
+
+@pytest.mark.parametrize("cov_type", ["HC0", "HC3", "cluster"])
+def test_est_batch_float32_matches_float64(inputs_x_init, cov_type):
+    rng = np.random.default_rng(5)
+    mean, cov = inputs_x_init["mean"], inputs_x_init["cov"]
+    x_initial = rng.multivariate_normal(mean, cov, size=(3, 40))
+    x_time = rng.multivariate_normal(mean, cov, size=(3, 8))
+    x_panel = _xpanel(x_initial, x_time, 8, rng, mean, cov, 40, 0.3)
+    y = _error_terms(
+        x_panel, x_initial, x_time, rng, 40, 8, 0.4, 0.4, 6, np.ones(6), 0.1
+    )
+    double = _est_batch(y, x_panel, cov_type=cov_type)
+    single = _est_batch(
+        y.astype(np.float32),
+        x_panel.astype(np.float32),
+        cov_type=cov_type,
+    )
+    for name, (beta, sd) in double.items():
+        assert single[name][0] == pytest.approx(beta, rel=1e-4)
+        assert single[name][1] == pytest.approx(sd, rel=1e-4)
+
+
+def test_mvn_dtype(inputs_x_init):
+    draws = _mvn(
+        inputs_x_init["rng"],
+        inputs_x_init["mean"],
+        inputs_x_init["cov"],
+        (5, 10),
+        dtype=np.float32,
+    )
+    assert draws.dtype == np.float32
+    assert draws.shape == (5, 10, 6)
+
+
+def test_compare_est_float32(inputs_cunit):
+    result = compare_est(**inputs_cunit, batch_size=8, dtype="float32")
+    assert np.isfinite(result.to_numpy()).all()
+    assert result["beta_two_way"].mean() == pytest.approx(1, abs=0.2)
+    with pytest.raises(ValueError, match="dtype must be one of"):
+        compare_est(**inputs_cunit, dtype="float16")
+
+
+@pytest.mark.parametrize(
+    ("batch_size", "p_drop"),
+    [(None, 0), (8, 0), (None, 0.2)],
+)
+def test_full_estimates(inputs_cunit, batch_size, p_drop):
+    inputs_cunit["n_sim"] = 20
+    result = compare_est(**inputs_cunit, batch_size=batch_size, p_drop=p_drop)
+    table, coefficients = compare_est(
+        **inputs_cunit,
+        batch_size=batch_size,
+        p_drop=p_drop,
+        full=True,
+    )
+    pd.testing.assert_frame_equal(table, result, check_exact=True)
+    assert coefficients["beta"].shape == (20, 3, 6)
+    assert coefficients["cov"].shape == (20, 3, 6, 6)
+    for index, name in enumerate(["OLS", "one_way", "two_way"]):
+        assert (coefficients["beta"][:, index, 1] == result[f"beta_{name}"]).all()
+        sd = np.sqrt(coefficients["cov"][:, index, 1, 1])
+        assert (sd == result[f"beta_sd_{name}"]).all()
+    assert np.allclose(coefficients["cov"], np.swapaxes(coefficients["cov"], -1, -2))
+
+
+def test_full_estimates_not_streamed(inputs_cunit):
+    with pytest.raises(ValueError, match="not available with stream"):
+        compare_est(**inputs_cunit, stream=True, full=True)
+
+
+def test_bootstrap_columns(inputs_cunit):
+    inputs_cunit["n_sim"] = 20
+    result = compare_est(**inputs_cunit, batch_size=8, cov_type="cluster")
+    boot = compare_est(
+        **inputs_cunit,
+        batch_size=8,
+        cov_type="cluster",
+        n_boot=99,
+        boot_weights="webb",
+    )
+    pd.testing.assert_frame_equal(boot[result.columns], result, check_exact=True)
+    for name in ["OLS", "one_way", "two_way"]:
+        assert (boot[f"CI_upper_boot_{name}"] > boot[f"beta_{name}"]).all()
+        assert (boot[f"CI_lower_boot_{name}"] < boot[f"beta_{name}"]).all()
+        assert boot[f"p_boot_{name}"].between(0, 1).all()
+    parallel = compare_est(
+        **inputs_cunit,
+        batch_size=8,
+        cov_type="cluster",
+        n_boot=99,
+        boot_weights="webb",
+        n_jobs=2,
+    )
+    pd.testing.assert_frame_equal(boot, parallel, check_exact=True)
+
+
+def test_bootstrap_scenarios_independent(inputs_cunit):
+    inputs_cunit["n_sim"] = 10
+    boot = {"batch_size": 5, "n_boot": 49, "unit_trends": True}
+    scenarios = [{"c_var": 0.1}, {"c_var": 0.5, "c_unit": 0}]
+    results = compare_est(**inputs_cunit, **boot, scenarios=scenarios)
+    for result, scenario in zip(results, scenarios, strict=True):
+        expected = compare_est(**{**inputs_cunit, **scenario}, **boot)
+        pd.testing.assert_frame_equal(result, expected, check_exact=True)
+    alone = compare_est(**inputs_cunit, **boot, scenarios=scenarios[1:])
+    pd.testing.assert_frame_equal(alone[0], results[1], check_exact=True)
+    boot_columns = [f"p_boot_{name}" for name in ["OLS", "one_way", "two_way"]]
+    assert not results[0][boot_columns].equals(results[1][boot_columns])
+
+
+def test_bootstrap_unsupported(inputs_cunit):
+    with pytest.raises(ValueError, match="balanced replications"):
+        compare_est(**inputs_cunit, n_boot=99, p_drop=0.2)
+    with pytest.raises(ValueError, match="one cluster dimension"):
+        compare_est(
+            **inputs_cunit, n_boot=99, cov_type="cluster", cluster=["obs", "time"]
+        )
+    with pytest.raises(ValueError, match="boot_weights"):
+        compare_est(**inputs_cunit, n_boot=99, boot_weights="mammen")
+
+
+def _fe_panel(inputs_x_init):
+    rng = np.random.default_rng(11)
+    mean, cov = inputs_x_init["mean"], inputs_x_init["cov"]
+    x_initial = rng.multivariate_normal(mean, cov, size=15)
+    x_time = rng.multivariate_normal(mean, cov, size=6)
+    x_panel = _xpanel(x_initial, x_time, 6, rng, mean, cov, 15, 0.3)
+    y = _error_terms(
+        x_panel, x_initial, x_time, rng, 15, 6, 2.0, 2.0, 6, np.ones(6), 0.1
+    )
+    return x_panel, y, _panel_frame(x_panel)
+
+
+def _lsdv(x_long, y, estimator):
+    """Dummy-variable regression, the regressors net of the dummies and residuals."""
+    effects = {"one_way": ["obs"], "two_way": ["obs", "time"]}[estimator]
+    dummies = np.column_stack(
+        [
+            (x_long[name].to_numpy()[:, None] == np.unique(x_long[name])).astype(float)
+            for name in effects
+        ],
+    )
+    x = x_long[list(range(6))].to_numpy()
+    regressors = np.column_stack([x, dummies])
+    resid = y - regressors @ np.linalg.lstsq(regressors, y, rcond=None)[0]
+    x_net = x - dummies @ np.linalg.lstsq(dummies, x, rcond=None)[0]
+    return x_net, resid, dummies
+
+
+def _reference_crve(x_long, y, estimator, cluster):
+    x_net, resid, _ = _lsdv(x_long, y, estimator)
+    bread = np.linalg.inv(x_net.T @ x_net)
+    scores = x_net * resid[:, None]
+    names = [cluster] if isinstance(cluster, str) else cluster
+    labels = [x_long[name].to_numpy() for name in names]
+    if len(labels) == 2:
+        labels.append(labels[0] * 1000 + labels[1])
+    meat = 0
+    for index, groups in enumerate(labels):
+        sums = np.array([scores[groups == g].sum(axis=0) for g in np.unique(groups)])
+        n_groups, (n, k) = len(sums), scores.shape
+        correction = n_groups / (n_groups - 1) * (n - 1) / (n - k)
+        meat = meat + (-1 if index == 2 else 1) * correction * sums.T @ sums
+    # Cameron, Gelbach and Miller (2011) set negative eigenvalues to zero
+    eigval, eigvec = np.linalg.eigh(meat)
+    meat = eigvec @ np.diag(np.clip(eigval, 0, None)) @ eigvec.T
+    return np.sqrt((bread @ meat @ bread)[1, 1])
+
+
+@pytest.mark.parametrize("estimator", ["one_way", "two_way"])
+@pytest.mark.parametrize("cluster", ["obs", "time", ["obs", "time"]])
+def test_fixed_effects_crve_matches_lsdv(inputs_x_init, estimator, cluster):
+    x_panel, y, x_long = _fe_panel(inputs_x_init)
+    expected = _reference_crve(x_long, y, estimator, cluster)
+    batch = _est_batch(y, x_panel, cov_type="cluster", cluster=cluster)
+    assert batch[estimator][1] == pytest.approx(expected)
+    single = {"one_way": _est_one_way, "two_way": _est_two_way}[estimator]
+    _, sd = single(pd.DataFrame(y), x_long, 15, 6, 6, "cluster", cluster)
+    assert sd == pytest.approx(expected)
+
+
+def _reference_hc(x_long, y, estimator, cov_type):
+    x_net, resid, dummies = _lsdv(x_long, y, estimator)
+    bread = np.linalg.inv(x_net.T @ x_net)
+    # Leverage of the full dummy-variable regression, the degrees of freedom
+    # subtract the rank of all regressors
+    regressors = np.column_stack([x_net, dummies])
+    leverage = np.diag(regressors @ np.linalg.pinv(regressors))
+    n, rank = len(y), np.linalg.matrix_rank(regressors)
+    if cov_type == "HC1":
+        resid = resid * np.sqrt(n / (n - rank))
+    elif cov_type == "HC2":
+        resid = resid / np.sqrt(1 - leverage)
+    elif cov_type == "HC3":
+        resid = resid / (1 - leverage)
+    scores = x_net * resid[:, None]
+    return np.sqrt((bread @ scores.T @ scores @ bread)[1, 1])
+
+
+@pytest.mark.parametrize("estimator", ["one_way", "two_way"])
+@pytest.mark.parametrize("cov_type", ["HC1", "HC2", "HC3"])
+def test_fixed_effects_hc_matches_lsdv(inputs_x_init, estimator, cov_type):
+    x_panel, y, x_long = _fe_panel(inputs_x_init)
+    expected = _reference_hc(x_long, y, estimator, cov_type)
+    batch = _est_batch(y, x_panel, cov_type=cov_type)
+    assert batch[estimator][1] == pytest.approx(expected)
+    single = {"one_way": _est_one_way, "two_way": _est_two_way}[estimator]
+    _, sd = single(pd.DataFrame(y), x_long, 15, 6, 6, cov_type)
+    assert sd == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("cov_type", ["HC1", "HC2", "HC3"])
+def test_fixed_effects_hc_unbalanced_two_way(inputs_x_init, cov_type):
+    _, y, x_long = _fe_panel(inputs_x_init)
+    keep = np.random.default_rng(5).uniform(size=len(y)) > 0.3
+    x_long, y = x_long[keep].reset_index(drop=True), y[keep]
+    expected = _reference_hc(x_long, y, "two_way", cov_type)
+    _, sd = _est_two_way(pd.DataFrame(y), x_long, 15, 6, 6, cov_type)
+    assert sd == pytest.approx(expected)
+
+
+def test_fixed_effects_crve_matches_statsmodels(inputs_x_init):
+    sm = pytest.importorskip("statsmodels.api")
+    x_panel, y, x_long = _fe_panel(inputs_x_init)
+    x_net, resid, _ = _lsdv(x_long, y, "one_way")
+    fit = sm.OLS(x_net @ np.linalg.lstsq(x_net, y, rcond=None)[0] + resid, x_net)
+    fit = fit.fit(cov_type="cluster", cov_kwds={"groups": x_long["time"]})
+    batch = _est_batch(y, x_panel, cov_type="cluster", cluster="time")
+    assert batch["one_way"][1] == pytest.approx(fit.bse[1])
+
+
+@pytest.mark.parametrize("cov_type", ["HC0", "cluster"])
+def test_random_effects_matches_gls(inputs_x_init, cov_type):
+    rng = np.random.default_rng(7)
+    mean, cov = inputs_x_init["mean"], inputs_x_init["cov"]
+    x_initial = rng.multivariate_normal(mean, cov, size=(2, 30))
+    x_time = rng.multivariate_normal(mean, cov, size=(2, 5))
+    x_panel = _xpanel(x_initial, x_time, 5, rng, mean, cov, 30, 0.3)
+    y = _error_terms(x_panel, x_initial, x_time, rng, 30, 5, 0, 0, 6, np.ones(6), 0.1)
+    batch = _est_batch(y, x_panel, cov_type, full=True, random_effects=True)
+    for b in range(2):
+        x_long = _panel_frame(x_panel[b]).assign(y=y[b])
+        data = x_long[[*range(6), "y"]]
+        unit_mean = data.groupby(x_long["obs"]).transform("mean").to_numpy()
+        between = data.groupby(x_long["obs"]).mean().to_numpy()
+        within = data.to_numpy() - unit_mean
+
+        def _ols(xy):
+            beta = np.linalg.lstsq(xy[:, :-1], xy[:, -1], rcond=None)[0]
+            return beta, ((xy[:, -1] - xy[:, :-1] @ beta) ** 2).sum()
+
+        beta_fe, ssr_within = _ols(within)
+        sigma_e = ssr_within / (30 * 4 - 6)
+        sigma_b = _ols(between)[1] / (30 - 6)
+        theta = 1 - np.sqrt(sigma_e / (5 * sigma_b))
+        quasi = data.to_numpy() - theta * unit_mean
+        x_re, y_re = quasi[:, :-1], quasi[:, -1]
+        beta_re, _ = _ols(quasi)
+        bread = np.linalg.inv(x_re.T @ x_re)
+        scores = x_re * (y_re - x_re @ beta_re)[:, None]
+        if cov_type == "cluster":
+            scores = pd.DataFrame(scores).groupby(x_long["obs"]).sum().to_numpy()
+            scores = scores * np.sqrt(30 / 29 * (150 - 1) / (150 - 6))
+        var = bread @ scores.T @ scores @ bread
+
+        beta, var_batch, statistic, p_value = batch["RE"]
+        assert beta[b] == pytest.approx(beta_re)
+        assert var_batch[b] == pytest.approx(var)
+        diff = beta_fe - beta_re
+        bread_fe = np.linalg.inv(within[:, :-1].T @ within[:, :-1])
+        expected = diff @ np.linalg.inv(sigma_e * (bread_fe - bread)) @ diff
+        assert statistic[b] == pytest.approx(expected)
+        assert 0 <= p_value[b] <= 1
+
+
+def test_random_effects_columns(inputs_cunit):
+    inputs_cunit["n_sim"] = 20
+    result = compare_est(**inputs_cunit, batch_size=8)
+    table, coefficients = compare_est(
+        **inputs_cunit, batch_size=8, full=True, random_effects=True
+    )
+    pd.testing.assert_frame_equal(table[result.columns], result, check_exact=True)
+    assert (coefficients["beta"][:, 3, 1] == table["beta_RE"]).all()
+    assert coefficients["cov"].shape == (20, 4, 6, 6)
+    assert (table["hausman"] > 0).all()
+    assert table["p_hausman"].between(0, 1).all()
+    # The unit effects are correlated with x_1, so the Hausman test rejects
+    assert (table["p_hausman"] < 0.05).mean() > 0.5
+    summary = compare_est(**inputs_cunit, stream=True, random_effects=True)
+    assert list(summary.index) == ["OLS", "one_way", "two_way", "RE"]
+    with pytest.raises(ValueError, match="balanced panels"):
+        compare_est(**inputs_cunit, p_drop=0.2, random_effects=True)
+
+
+def test_time_trend_draws_from_rng():
+    rng = np.random.default_rng(5)
+    first = _time_trend(8, rng, 4, 0.5, (2,)).reshape(2, 4, 8)
+    second = _time_trend(8, rng, 4, 0.5, (2,)).reshape(2, 4, 8)
+    assert not np.allclose(first[0], first[1])
+    assert not np.allclose(first, second)
+    slopes = first[:, :1] / 0.5
+    assert np.allclose(first, slopes * 0.5 * np.arange(1, 5)[:, None])
+
+
+@pytest.mark.parametrize("dimension", ["obs", "time"])
+def test_unit_trend_matches_dummies(inputs_x_init, dimension):
+    rng = np.random.default_rng(7)
+    mean, cov = inputs_x_init["mean"], inputs_x_init["cov"]
+    x_initial = rng.multivariate_normal(mean, cov, size=12)
+    x_time = rng.multivariate_normal(mean, cov, size=5)
+    x_panel = _xpanel(x_initial, x_time, 5, rng, mean, cov, 12, 0.3)
+    y = _error_terms(
+        x_panel, x_initial, x_time, rng, 12, 5, 0.4, 0.4, 6, np.ones(6), 0.5
+    )
+    x_long = _panel_frame(x_panel)
+    dummies = (x_long["obs"].to_numpy()[:, None] == np.arange(1, 13)).astype(float)
+    trends = dummies * x_long["time"].to_numpy()[:, None]
+    regressors = np.column_stack([x_long[list(range(6))], dummies, trends])
+
+    def _beta_1(keep):
+        x = regressors[keep][:, np.abs(regressors[keep]).sum(axis=0) > 0]
+        return np.linalg.lstsq(x, y[keep], rcond=None)[0][1]
+
+    batch = _est_batch(
+        y, x_panel, cov_type="jackknife", cluster=dimension, unit_trends=True
+    )
+    assert batch["unit_trend"][0] == pytest.approx(_beta_1(np.full(len(y), True)))
+    labels = x_long[dimension].to_numpy()
+    refits = [_beta_1(labels != label) for label in np.unique(labels)]
+    expected = np.sqrt((len(refits) - 1) * np.var(refits))
+    assert batch["unit_trend"][1] == pytest.approx(expected)
+
+
+def test_unit_trend_jackknife_periods(inputs_cunit):
+    inputs = {**inputs_cunit, "n_sim": 2, "t_per": 3, "unit_trends": True}
+    with pytest.raises(ValueError, match="at least four periods"):
+        compare_est(**inputs, cov_type="jackknife", cluster="time")
+    compare_est(**inputs, cov_type="jackknife", cluster="obs")
+
+
+def test_unit_trends_remove_trend(inputs_ctrend):
+    result = compare_est(**inputs_ctrend, batch_size=10, unit_trends=True)
+    assert result["beta_unit_trend"].mean() == pytest.approx(1, abs=0.1)
+    for name in ["OLS", "one_way", "two_way"]:
+        assert result["beta_unit_trend"].var() < result[f"beta_{name}"].var()
+    with pytest.raises(ValueError, match="at least three periods"):
+        compare_est(**{**inputs_ctrend, "t_per": 2}, unit_trends=True)
+
+
+@pytest.mark.parametrize("dimension", ["obs", "time"])
+def test_jackknife_matches_refits(inputs_x_init, dimension):
+    rng = np.random.default_rng(7)
+    mean, cov = inputs_x_init["mean"], inputs_x_init["cov"]
+    x_initial = rng.multivariate_normal(mean, cov, size=12)
+    x_time = rng.multivariate_normal(mean, cov, size=5)
+    x_panel = _xpanel(x_initial, x_time, 5, rng, mean, cov, 12, 0.3)
+    y = _error_terms(
+        x_panel, x_initial, x_time, rng, 12, 5, 0.4, 0.4, 6, np.ones(6), 0.1
+    )
+    x_long = _panel_frame(x_panel)
+    estimators = {
+        "OLS": lambda y_long, x: _est_OLS(y_long, x, 6),
+        "one_way": lambda y_long, x: _est_one_way(y_long, x, 12, 5, 6),
+        "two_way": lambda y_long, x: _est_two_way(y_long, x, 12, 5, 6),
+    }
+    batch = _est_batch(y, x_panel, cov_type="jackknife", cluster=dimension)
+    for name, estimator in estimators.items():
+        refits = []
+        for label in np.unique(x_long[dimension]):
+            keep = (x_long[dimension] != label).to_numpy()
+            x_rest = x_long[keep].reset_index(drop=True)
+            refits.append(estimator(pd.DataFrame(y[keep]), x_rest)[0])
+        n_groups = len(refits)
+        expected = np.sqrt((n_groups - 1) * np.var(refits))
+        assert batch[name][1] == pytest.approx(expected)
+
+
+def test_jackknife_unbalanced_one_way():
+    rng = np.random.default_rng(8)
+    x_long = _panel_frame(rng.normal(size=(6, 15, 3)))
+    x_long = x_long[rng.uniform(size=len(x_long)) > 0.3].reset_index(drop=True)
+    y = x_long[[0, 1, 2]].to_numpy() @ np.ones(3) + rng.normal(size=len(x_long))
+    for dimension in ["obs", "time"]:
+        refits = []
+        for label in np.unique(x_long[dimension]):
+            keep = (x_long[dimension] != label).to_numpy()
+            x_rest = x_long[keep].reset_index(drop=True)
+            refits.append(_est_one_way(pd.DataFrame(y[keep]), x_rest, 15, 6, 3)[0])
+        n_groups = len(refits)
+        expected = np.sqrt((n_groups - 1) * np.var(refits))
+        _, sd = _est_one_way(pd.DataFrame(y), x_long, 15, 6, 3, "jackknife", dimension)
+        assert sd == pytest.approx(expected)
+
+
+def test_jackknife_singleton_unit():
+    rng = np.random.default_rng(9)
+    x_long = _panel_frame(rng.normal(size=(6, 15, 3)))
+    singleton = (x_long["obs"] == x_long["obs"].min()) & (x_long["time"] > 1)
+    x_long = x_long[~singleton].reset_index(drop=True)
+    y = x_long[[0, 1, 2]].to_numpy() @ np.ones(3) + rng.normal(size=len(x_long))
+    refits = []
+    for label in np.unique(x_long["time"]):
+        keep = (x_long["time"] != label).to_numpy()
+        x_rest = x_long[keep].reset_index(drop=True)
+        refits.append(_est_one_way(pd.DataFrame(y[keep]), x_rest, 15, 6, 3)[0])
+    expected = np.sqrt((len(refits) - 1) * np.var(refits))
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        _, sd = _est_one_way(pd.DataFrame(y), x_long, 15, 6, 3, "jackknife", "time")
+    assert sd == pytest.approx(expected)
+
+
 def test_cunit(inputs_cunit):
     """The endogenous results should be bigger for pooled estimator in many case."""
 
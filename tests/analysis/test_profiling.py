@@ -0,0 +1,65 @@
+"""Tests for the profiling of the simulation."""
+
+import numpy as np
+import pytest
+
+from src.epp_final_project.analysis.model import compare_est
+from src.epp_final_project.analysis.profiling import (
+    _merge_stages,
+    _profiling,
+    _stage,
+)
+
+
+# ===============================================
+# FIXTURES
+# ===============================================
+@pytest.fixture()
+def inputs():
+    return {
+        "n_sim": 6,
+        "n_obs": 10,
+        "t_per": 4,
+        "true_params": np.ones(3),
+        "seed": 3,
+    }
+
+
+# ================================================
+# TESTS
+# ================================================
+def test_stage_collects_statistics():
+    with _profiling() as stages:
+        for _ in range(3):
+            with _stage("data"):
+                np.ones(1000)
+    assert stages["data"][1] == 3
+    assert stages["data"][2] >= 8000
+
+
+def test_stage_disabled():
+    with _profiling(enabled=False) as stages, _stage("data"):
+        pass
+    assert stages is None
+
+
+def test_merge_stages():
+    merged = _merge_stages(
+        {"data": [1.0, 2, 10]}, {"data": [0.5, 1, 5], "solve": [1, 1, 1]}
+    )
+    assert merged == {"data": [1.5, 3, 15], "solve": [1, 1, 1]}
+
+
+@pytest.mark.parametrize("batch_size", [None, 3])
+def test_profile_table(inputs, batch_size):
+    result, profile = compare_est(**inputs, batch_size=batch_size, profile=True)
+    assert result.equals(compare_est(**inputs, batch_size=batch_size))
+    assert list(profile.index) == [
+        "data",
+        "outcome",
+        "transform",
+        "solve",
+        "covariance",
+    ]
+    assert profile.loc["data", "calls"] == len(range(0, 6, batch_size or 1))
+    assert profile["share"].sum() == pytest.approx(1)
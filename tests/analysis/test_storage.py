@@ -0,0 +1,41 @@
+"""Tests for the storage of the simulation results."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.epp_final_project.analysis.storage import read_results, write_results
+
+
+# ===============================================
+# FIXTURES
+# ===============================================
+@pytest.fixture()
+def results():
+    rng = np.random.default_rng(925408)
+    return pd.DataFrame(rng.normal(size=(20, 3)), columns=["beta_OLS", "a", "b"])
+
+
+# ================================================
+# TESTS
+# ================================================
+@pytest.mark.parametrize("suffix", [".csv", ".npy", ".parquet", ".feather"])
+def test_roundtrip(results, tmp_path, suffix):
+    if suffix in (".parquet", ".feather"):
+        pytest.importorskip("pyarrow")
+    path = tmp_path / f"results{suffix}"
+    write_results(results, path)
+    assert np.allclose(read_results(path), results)
+    subset = read_results(path, columns=["beta_OLS", "b"])
+    assert list(subset.columns) == ["beta_OLS", "b"]
+
+
+def test_float32(results, tmp_path):
+    path = tmp_path / "results.npy"
+    write_results(results, path, float32=True)
+    assert (read_results(path).dtypes == np.float32).all()
+
+
+def test_unknown_format(results, tmp_path):
+    with pytest.raises(ValueError, match="Results must be stored"):
+        write_results(results, tmp_path / "results.xlsx")
@@ -0,0 +1,98 @@
+"""Tests for the within transformations."""
+
+import numpy as np
+import pytest
+
+from src.epp_final_project.analysis.transform import (
+    _transform_one_way,
+    _transform_two_way,
+    _within_unit_trend,
+)
+
+
+# ===============================================
+# FIXTURES
+# ===============================================
+@pytest.fixture()
+def balanced_panel():
+    rng = np.random.default_rng(925408)
+    n_obs, t_per = 12, 5
+    return {
+        "x": rng.normal(size=(n_obs * t_per, 3)),
+        "obs": np.tile(np.arange(n_obs), t_per),
+        "time": np.repeat(np.arange(t_per), n_obs),
+        "n_obs": n_obs,
+        "t_per": t_per,
+    }
+
+
+@pytest.fixture()
+def unbalanced_panel(balanced_panel):
+    keep = np.random.default_rng(3).uniform(size=len(balanced_panel["x"])) > 0.3
+    return {key: balanced_panel[key][keep] for key in ("x", "obs", "time")}
+
+
+def _dummy_residuals(x, *labels):
+    dummies = np.column_stack(
+        [(label[:, None] == np.unique(label)).astype(float) for label in labels],
+    )
+    coef = np.linalg.lstsq(dummies, x, rcond=None)[0]
+    return x - dummies @ coef
+
+
+# ================================================
+# TESTS
+# ================================================
+def test_one_way_balanced(balanced_panel):
+    x, obs, _, n_obs, t_per = balanced_panel.values()
+    result = _transform_one_way(x, n_obs, t_per)
+    assert np.allclose(result, _dummy_residuals(x, obs))
+
+
+def test_two_way_balanced(balanced_panel):
+    x, obs, time, n_obs, t_per = balanced_panel.values()
+    result = _transform_two_way(x, n_obs, t_per)
+    assert np.allclose(result, _dummy_residuals(x, obs, time))
+
+
+def test_unit_trend_balanced(balanced_panel):
+    x, obs, time, n_obs, t_per = balanced_panel.values()
+    panel = x.reshape(t_per, n_obs, 3).copy()
+    result = _within_unit_trend(panel, inplace=True)
+    dummies = (obs[:, None] == np.unique(obs)).astype(float)
+    basis = np.column_stack([dummies, dummies * time[:, None]])
+    coef = np.linalg.lstsq(basis, x, rcond=None)[0]
+    assert np.shares_memory(result, panel)
+    assert np.allclose(result.reshape(-1, 3), x - basis @ coef)
+
+
+def test_two_way_inplace(balanced_panel):
+    x, _, _, n_obs, t_per = balanced_panel.values()
+    expected = _transform_two_way(x, n_obs, t_per)
+    result = _transform_two_way(x, n_obs, t_per, inplace=True)
+    assert np.shares_memory(result, x)
+    assert np.allclose(result, expected)
+
+
+def test_one_way_unbalanced(unbalanced_panel):
+    x, obs, _ = unbalanced_panel.values()
+    result = _transform_one_way(x, None, None, obs=obs)
+    assert np.allclose(result, _dummy_residuals(x, obs))
+
+
+def test_two_way_unbalanced(unbalanced_panel):
+    x, obs, time = unbalanced_panel.values()
+    result = _transform_two_way(x, None, None, obs=obs, time=time)
+    assert np.allclose(result, _dummy_residuals(x, obs, time))
+
+
+def test_two_way_unbalanced_batched(unbalanced_panel):
+    x, obs, time = unbalanced_panel.values()
+    result = _transform_two_way(np.stack([x, 2 * x]), None, None, obs=obs, time=time)
+    assert np.allclose(result[1], 2 * _dummy_residuals(x, obs, time))
+
+
+def test_two_way_unbalanced_not_converged(unbalanced_panel):
+    x, obs, time = unbalanced_panel.values()
+    with pytest.warns(RuntimeWarning, match="did not converge"):
+        _transform_two_way(x, None, None, obs=obs, time=time, tol=0)
@@ -0,0 +1,216 @@
+"""Benchmarks of the simulation and estimation hot paths.
+
+The benchmarks are deselected by default, run them with ``pytest -m benchmark``.
+Every case is timed and its peak memory traced over sweeps of n_obs, t_per and the
+number of parameters. A benchmark fails if its time grows faster than
+MAX_EXPONENT in the size of the panel. The baseline stores the times relative to
+a reference kernel timed in the same run, so it does not depend on the speed of
+the machine. A benchmark also fails if a point is slower or uses more memory than
+the baseline by more than BENCHMARK_THRESHOLD (0.5 by default), set
+BENCHMARK_NO_COMPARE=1 to skip this comparison. A batched compare_est run with many
+replications covers the stacked solve of the normal equations. Set
+BENCHMARK_UPDATE=1 to overwrite the baseline with the current measurements.
+"""
+
+import json
+import os
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.epp_final_project.analysis.model import (
+    _covariance,
+    _error_terms,
+    _est_one_way,
+    _est_OLS,
+    _est_two_way,
+    _panel_frame,
+    _xpanel,
+    compare_est,
+)
+from src.epp_final_project.analysis.transform import (
+    _transform_one_way,
+    _transform_two_way,
+)
+from src.epp_final_project.config import BLD
+
+BASELINE = Path(__file__).with_name("baseline.json")
+RESULTS = BLD / "benchmarks" / "results.json"
+THRESHOLD = float(os.environ.get("BENCHMARK_THRESHOLD", "0.5"))
+COMPARE = not os.environ.get("BENCHMARK_NO_COMPARE") and not os.environ.get(
+    "BENCHMARK_UPDATE"
+)
+BASELINE_METRICS = ("relative_seconds", "peak_memory_mb")
+MAX_EXPONENT = 1.5
+MIN_TIME = 0.2
+MAX_REPEAT = 1000
+
+SWEEPS = {
+    "n_obs": [(n_obs, 20, 6) for n_obs in (250, 500, 1000, 2000)],
+    "t_per": [(500, t_per, 6) for t_per in (10, 20, 40, 80)],
+    "n_params": [(500, 20, n_params) for n_params in (3, 6, 12)],
+}
+BATCHED = {"n_sim": 2000, "n_obs": 100, "t_per": 20, "batch_size": 500}
+
+measurements = {}
+
+
+def _panel(n_obs, t_per, n_params):
+    rng = np.random.default_rng(925408)
+    mean = np.zeros(n_params)
+    cov = _covariance(rng, n_params)
+    x_initial = rng.multivariate_normal(mean, cov, size=n_obs)
+    x_time = rng.multivariate_normal(mean, cov, size=t_per)
+    x_panel = _xpanel(x_initial, x_time, t_per, rng, mean, cov, n_obs, 0.25)
+    true_params = np.ones(n_params)
+    error_args = (rng, n_obs, t_per, 0.4, 0.4, n_params, true_params, 0.3)
+    y_it = _error_terms(x_panel, x_initial, x_time, *error_args)
+    return {
+        "rng": rng,
+        "mean": mean,
+        "cov": cov,
+        "x_initial": x_initial,
+        "x_time": x_time,
+        "x_panel": x_panel,
+        "error_args": error_args,
+        "y_long": pd.DataFrame(y_it),
+        "x_long": _panel_frame(x_panel),
+    }
+
+
+def _case(name, n_obs, t_per, n_params):
+    data = _panel(n_obs, t_per, n_params)
+    x_panel, x_initial, x_time = data["x_panel"], data["x_initial"], data["x_time"]
+    x_values = x_panel.reshape(-1, n_params)
+    y_long, x_long = data["y_long"], data["x_long"]
+    cases = {
+        "xpanel": lambda: _xpanel(
+            x_initial,
+            x_time,
+            t_per,
+            data["rng"],
+            data["mean"],
+            data["cov"],
+            n_obs,
+            0.25,
+        ),
+        "error_terms": lambda: _error_terms(
+            x_panel,
+            x_initial,
+            x_time,
+            *data["error_args"],
+        ),
+        "transform_one_way": lambda: _transform_one_way(x_values, n_obs, t_per),
+        "transform_two_way": lambda: _transform_two_way(x_values, n_obs, t_per),
+        "est_OLS": lambda: _est_OLS(y_long, x_long, n_params),
+        "est_one_way": lambda: _est_one_way(y_long, x_long, n_obs, t_per, n_params),
+        "est_two_way": lambda: _est_two_way(y_long, x_long, n_obs, t_per, n_params),
+        "compare_est": lambda: compare_est(
+            n_sim=10,
+            n_obs=n_obs,
+            t_per=t_per,
+            true_params=np.ones(n_params),
+            batch_size=10,
+        ),
+    }
+    return cases[name]
+
+
+def _measure(func):
+    func()
+    times = []
+    while sum(times) < MIN_TIME and len(times) < MAX_REPEAT:
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": min(times), "peak_memory_mb": peak / 2**20}
+
+
+def _reference_kernel():
+    rng = np.random.default_rng(0)
+    a = rng.normal(size=(200_000, 6))
+    return lambda: (a.T @ a, a.mean(axis=0))
+
+
+def _regressions(key, result, baseline):
+    regressions = []
+    for metric in BASELINE_METRICS:
+        value, reference = result[metric], baseline.get(key, {}).get(metric)
+        if reference is not None and value > (1 + THRESHOLD) * reference:
+            regressions.append(f"{key} {metric}: {value:.4g} > {reference:.4g}")
+    return regressions
+
+
+@pytest.fixture(scope="module")
+def reference_seconds():
+    return _measure(_reference_kernel())["seconds"]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _record():
+    yield
+    RESULTS.parent.mkdir(parents=True, exist_ok=True)
+    RESULTS.write_text(json.dumps(measurements, indent=2, sort_keys=True))
+    if os.environ.get("BENCHMARK_UPDATE"):
+        baseline = {
+            key: {metric: result[metric] for metric in BASELINE_METRICS}
+            for key, result in measurements.items()
+        }
+        BASELINE.write_text(json.dumps(baseline, indent=2, sort_keys=True))
+
+
+@pytest.mark.benchmark()
+@pytest.mark.parametrize("sweep", SWEEPS)
+@pytest.mark.parametrize(
+    "name",
+    [
+        "xpanel",
+        "error_terms",
+        "transform_one_way",
+        "transform_two_way",
+        "est_OLS",
+        "est_one_way",
+        "est_two_way",
+        "compare_est",
+    ],
+)
+def test_benchmark(name, sweep, reference_seconds):
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    regressions = []
+    sizes, seconds = [], []
+    for n_obs, t_per, n_params in SWEEPS[sweep]:
+        key = f"{name}[n_obs={n_obs},t_per={t_per},n_params={n_params}]"
+        result = _measure(_case(name, n_obs, t_per, n_params))
+        result["relative_seconds"] = result["seconds"] / reference_seconds
+        measurements[key] = result
+        sizes.append(n_obs * t_per)
+        seconds.append(result["seconds"])
+        regressions += _regressions(key, result, baseline)
+
+    if sweep != "n_params":
+        exponent = np.polyfit(np.log(sizes), np.log(seconds), 1)[0]
+        assert exponent <= MAX_EXPONENT, f"time grows as (NT)^{exponent:.2f}"
+    if COMPARE:
+        assert not regressions, "\n".join(regressions)
+
+
+@pytest.mark.benchmark()
+def test_benchmark_batched(reference_seconds):
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    key = "compare_est_batched[{}]".format(
+        ",".join(f"{name}={value}" for name, value in BATCHED.items())
+    )
+    result = _measure(lambda: compare_est(**BATCHED, true_params=np.ones(6)))
+    result["relative_seconds"] = result["seconds"] / reference_seconds
+    measurements[key] = result
+    regressions = _regressions(key, result, baseline)
+    if COMPARE:
+        assert not regressions, "\n".join(regressions)
@@ -0,0 +1 @@
+"""Tests for the final module."""
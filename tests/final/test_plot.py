@@ -0,0 +1,50 @@
+"""Tests for the plots."""
+
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import gaussian_kde
+
+from src.epp_final_project.final.plot import (
+    _binned_kde,
+    _kde_grid,
+    plotting_monte_carlo,
+)
+
+mpl.use("Agg")
+
+
+# ===============================================
+# FIXTURES
+# ===============================================
+@pytest.fixture()
+def data():
+    rng = np.random.default_rng(925408)
+    return pd.DataFrame(
+        {"beta_OLS": rng.normal(5, 1, 2000), "beta_two_way": rng.gamma(4, 1, 2000)},
+    )
+
+
+# ================================================
+# TESTS
+# ================================================
+@pytest.mark.parametrize("column", ["beta_OLS", "beta_two_way"])
+def test_binned_kde_matches_scipy(data, column):
+    values = data[column].to_numpy()
+    grid = _kde_grid(values)
+    expected = gaussian_kde(values)(grid)
+    assert np.abs(_binned_kde(values, grid) - expected).max() < 1e-3 * expected.max()
+
+
+def test_binned_engine_plots_every_column(data):
+    ax = plotting_monte_carlo(data, ["beta_OLS", "beta_two_way"], ["a", "b"], "binned")
+    assert len(ax.get_lines()) == 3
+    assert [text.get_text() for text in ax.get_legend().get_texts()] == ["a", "b"]
+    plt.close(ax.figure)
+
+
+def test_unknown_engine(data):
+    with pytest.raises(ValueError, match="engine must be in"):
+        plotting_monte_carlo(data, ["beta_OLS"], ["a"], "exact")
@@ -0,0 +1,75 @@
+"""Tests for the rendering of the figures."""
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.epp_final_project.analysis.storage import read_results, write_results
+from src.epp_final_project.final.render import render_figures
+
+ESTIMATORS = ["OLS", "one_way", "two_way", "unit_trend"]
+
+
+# ===============================================
+# FIXTURES
+# ===============================================
+@pytest.fixture()
+def families(tmp_path):
+    rng = np.random.default_rng(925408)
+    families = {}
+    columns = [f"beta_{name}" for name in ESTIMATORS]
+    for family in ("c_unit", "c_time"):
+        panels = []
+        for value in range(3):
+            results = tmp_path / f"{family}_{value}.npy"
+            write_results(
+                pd.DataFrame(rng.normal(size=(50, len(columns))), columns=columns),
+                results,
+            )
+            panels.append(
+                {
+                    "title": f"{family}={value}",
+                    "depends_on": results,
+                    "produces": tmp_path / f"{family}_{value}.png",
+                },
+            )
+        families[family] = {
+            "panels": panels,
+            "produces": tmp_path / f"{family}.png",
+            "estimators": ESTIMATORS,
+            "engine": "binned",
+        }
+    return families
+
+
+# ================================================
+# TESTS
+# ================================================
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_render_figures(families, n_jobs):
+    open_figures = plt.get_fignums()
+    report = render_figures(families, n_jobs=n_jobs)
+    assert list(report.index) == ["c_unit", "c_time"]
+    assert (report["seconds"] > 0).all()
+    for family in families.values():
+        assert family["produces"].exists()
+        assert all(panel["produces"].exists() for panel in family["panels"])
+    assert plt.get_fignums() == open_figures
+
+
+def test_render_without_unit_trends(families):
+    family = {**families["c_unit"], "estimators": ["OLS", "one_way", "two_way"]}
+    for panel in family["panels"]:
+        path = panel["depends_on"]
+        write_results(read_results(path).drop(columns="beta_unit_trend"), path)
+    report = render_figures({"c_unit": family})
+    assert list(report.index) == ["c_unit"]
+    assert family["produces"].exists()
+
+
+def test_render_memory_per_family(families):
+    # The memory of the calling process must not be reported for the families
+    ballast = np.ones(2**25)
+    report = render_figures(families, n_jobs=1)
+    assert (report["peak_memory_mb"] < ballast.nbytes / 2**20).all()